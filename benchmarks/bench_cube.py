@@ -0,0 +1,79 @@
+"""Requêtes d'agrégation : cube précalculé contre groupby pandas sur le dataset.
+
+Chaque requête est chronométrée sur le cube (rechauffement.cube, déjà
+chargé) et recalculée par groupby sur le dataset en mémoire ; les deux
+résultats doivent être égaux. La construction du cube et la relecture du
+.npz sont mesurées à part.
+
+    python -m benchmarks.bench_cube [--repeat 200]
+"""
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+
+from rechauffement import cube, data
+
+
+def timed(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    return result, statistics.median(durations)
+
+
+def weighted(frame):
+    return (frame["YANOT"] * frame["population"]).sum() / frame["population"].sum()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    dataset = data.load_dataset(columns=cube.COLUMNS)
+    europe = dataset[dataset["Continent_FR"] == "Europe"]
+    window = dataset[dataset["YEAR"].between(1980, 2000) & dataset["Continent_FR"].isin(["Afrique", "Europe"])]
+    countries = ["France", "Allemagne", "Espagne", "Italie"]
+    queries = {
+        "moyenne YAVGT par continent": (
+            lambda: cube.by_continent("YAVGT", "mean"),
+            lambda: dataset.groupby(["YEAR", "Continent_FR"], observed=True)["YAVGT"].mean().unstack()),
+        "maximum YANOT Europe": (
+            lambda: cube.by_continent("YANOT", "max", ["Europe"])["Europe"],
+            lambda: europe.groupby("YEAR")["YANOT"].max()),
+        "anomalie pondérée monde": (
+            lambda: cube.total("YANOT", "weighted"),
+            lambda: dataset.groupby("YEAR")[["YANOT", "population"]].apply(weighted)),
+        "anomalie pondérée 2 continents 1980-2000": (
+            lambda: cube.total("YANOT", "weighted", ["Afrique", "Europe"], (1980, 2000)),
+            lambda: window.groupby("YEAR")[["YANOT", "population"]].apply(weighted)),
+        "séries de 4 pays": (
+            lambda: cube.by_country("YAVGT", countries),
+            lambda: dataset[dataset["Name_FR"].isin(countries)].pivot_table(
+                index="YEAR", columns="Name_FR", values="YAVGT", observed=True)[countries]),
+    }
+
+    path = cube.cube_path()
+    _, build_seconds = timed(lambda: cube.build(dataset), 5)
+    _, read_seconds = timed(lambda: dict(np.load(path)), 5)
+    print(f"construction du cube : {build_seconds * 1000:.1f} ms, relecture du .npz : {read_seconds * 1000:.1f} ms "
+          f"({os.path.getsize(path) / 1e3:.0f} ko)")
+    print(f"{'requête':<42} {'cube':>10} {'groupby':>10}")
+    identical = True
+    for label, (query, reference) in queries.items():
+        result, cube_seconds = timed(query, args.repeat)
+        expected, pandas_seconds = timed(reference, max(1, args.repeat // 10))
+        same = np.allclose(np.asarray(result, dtype="float64"), np.asarray(expected, dtype="float64"), rtol=1e-5)
+        identical &= same
+        print(f"{label:<42} {cube_seconds * 1e6:>7.0f} µs {pandas_seconds * 1e6:>7.0f} µs"
+              f"{'' if same else '  RÉSULTATS DIFFÉRENTS'}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
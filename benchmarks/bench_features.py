@@ -0,0 +1,63 @@
+"""Colonnes dérivées : ajout incrémental d'années contre reconstruction complète.
+
+Le dataset est tronqué de ses --years dernières années, dérivé, puis
+complété par append_years ; le résultat doit être identique à derive() sur
+le dataset complet. --scale duplique les pays (codes fictifs) pour mesurer
+le comportement sur un tableau plus grand. Les écarts avec les colonnes
+du fichier d'origine sont également résumés.
+
+    python -m benchmarks.bench_features [--years 1] [--scale 1] [--repeat 20]
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from rechauffement import data, features
+
+
+def timed(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    return result, statistics.median(durations)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=1, help="années ajoutées")
+    parser.add_argument("--scale", type=int, default=1, help="facteur de duplication des pays")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    original = data.read_dataset_csv()
+    dataset = pd.concat([original.assign(Code_ISO=original["Code_ISO"].astype("int32") + 1000 * copy)
+                         for copy in range(args.scale)], ignore_index=True)
+    last = int(dataset["YEAR"].max()) - args.years
+    history = features.derive(dataset[dataset["YEAR"] <= last])
+    new_rows = dataset.loc[dataset["YEAR"] > last].drop(columns=features.DERIVED_COLUMNS)
+
+    full, full_seconds = timed(lambda: features.derive(dataset), args.repeat)
+    appended, append_seconds = timed(lambda: features.append_years(history, new_rows), args.repeat)
+    full = full.reset_index(drop=True)
+    identical = all(np.array_equal(appended[column], full[column], equal_nan=True)
+                    for column in features.DERIVED_COLUMNS)
+    print(f"{len(dataset)} lignes, {dataset['Code_ISO'].nunique()} pays, {len(new_rows)} lignes ajoutées")
+    print(f"reconstruction complète : {full_seconds * 1000:.1f} ms")
+    print(f"ajout incrémental       : {append_seconds * 1000:.1f} ms (x{full_seconds / append_seconds:.1f})")
+    print(f"résultats identiques : {'oui' if identical else 'NON'}")
+
+    print("écarts avec le fichier d'origine (lignes différant de plus de 0,01) :")
+    derived = features.derive(original)
+    for column in features.DERIVED_COLUMNS:
+        gap = (derived[column] - original[column]).abs()
+        print(f"  {column:<9} {int((gap > 0.011).sum()):6d} lignes, écart max {gap.max():.2f}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
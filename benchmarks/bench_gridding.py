@@ -0,0 +1,113 @@
+"""Grilles d'anomalies à 1200 km : durée de chaque étape sur un jeu synthétique de taille réelle.
+
+Un fichier GHCN-M v4 synthétique (générateur de benchmarks.bench_stations,
+enregistrements de 5 à 170 ans, grilles à partir de 1880) et son
+inventaire sont générés dans un répertoire temporaire ; les stations d'un
+même code FIPS sont regroupées autour d'un centre tiré au hasard, ce qui
+laisse des zones sans station comme sur les continents réels.
+
+Sont chronométrés : le calcul des anomalies des stations, la construction
+du BallTree et des poids, l'interpolation de toutes les années, puis la
+relecture d'une grille enregistrée et son recalcul seul (poids relus). Quelques mailles sont recalculées par
+force brute (distance haversine à toutes les stations) pour vérifier les
+grilles.
+
+    python -m benchmarks.bench_gridding [--stations 22141] [--resolution 2] [--workers 1]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_stations import SEED, generate
+from rechauffement import gridding, stations
+
+CHECKED_CELLS = 200
+
+
+def write_inventory(path, source, seed=SEED):
+    """Inventaire (.inv) des stations de source, regroupées par code FIPS ; renvoie le nombre de stations."""
+    rng = np.random.default_rng(seed)
+    ids = np.unique(np.concatenate([block["ids"] for block in stations.read_blocks(source)]))
+    codes, country = np.unique(ids.astype("S2"), return_inverse=True)
+    center_lats = np.degrees(np.arcsin(rng.uniform(-0.9, 0.95, size=len(codes))))
+    center_lons = rng.uniform(-180, 180, size=len(codes))
+    lats = np.clip(center_lats[country] + rng.normal(0, 4, size=len(ids)), -89.9, 89.9)
+    lons = (center_lons[country] + rng.normal(0, 6, size=len(ids)) + 180) % 360 - 180
+    with open(path, "w", encoding="ascii") as f:
+        for station, lat, lon in zip(ids, lats, lons):
+            f.write(f"{station.decode()} {lat:8.4f} {lon:9.4f}  100.0 STATION {station.decode()}\n")
+    return len(ids)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * gridding.EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def brute_force(located, year_index, cells, resolution):
+    """Valeurs des mailles cells (indices à plat) recalculées par distance à toutes les stations."""
+    lats, lons = gridding.grid_centers(resolution)
+    values = located["anomalies"][:, year_index]
+    present = ~np.isnan(values)
+    result = np.full(len(cells), np.nan)
+    for i, cell in enumerate(cells):
+        distance = haversine_km(lats[cell // len(lons)], lons[cell % len(lons)], located["lats"], located["lons"])
+        weight = np.where((distance <= gridding.RADIUS_KM) & present, 1 - distance / gridding.RADIUS_KM, 0)
+        if weight.sum() > 0:
+            result[i] = (weight * np.nan_to_num(values)).sum() / weight.sum()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=22141)
+    parser.add_argument("--max-years", type=int, default=170, help="durée maximale d'enregistrement des stations")
+    parser.add_argument("--resolution", type=float, default=gridding.RESOLUTION)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Anomalies et grilles enregistrées dans le répertoire temporaire
+        gridding.CACHE_DIR = os.path.join(directory, "grids")
+        source = os.path.join(directory, "v4.mean_synthetique.dat")
+        inventory = os.path.join(directory, "v4.inv")
+        start = time.perf_counter()
+        rows = generate(source, args.stations, max_years=args.max_years)
+        count = write_inventory(inventory, source)
+        print(f"fichier synthétique : {rows} lignes, {count} stations, {os.path.getsize(source) / 1e6:.0f} Mo "
+              f"(généré en {time.perf_counter() - start:.1f} s)")
+
+        report = gridding.build(source, inventory, resolution=args.resolution, workers=args.workers)
+        years = report["years"]
+        print(f"anomalies des stations : {report['read_seconds']:.1f} s ({report['stations']} stations retenues, "
+              f"{years[0]}-{years[1]})")
+        print(f"BallTree et poids : {report['tree_seconds']:.2f} s ({report['weights']} poids, {report['cells']} mailles)")
+        print(f"interpolation de {years[1] - years[0] + 1} années : {report['grid_seconds']:.2f} s, "
+              f"total {report['seconds']:.1f} s")
+        start = time.perf_counter()
+        report = gridding.build(source, inventory, resolution=args.resolution, workers=args.workers)
+        print(f"second calcul (anomalies relues du cache) : {time.perf_counter() - start:.1f} s")
+        start = time.perf_counter()
+        grid = gridding.grid(years[1], source, inventory, args.resolution)
+        print(f"relecture de la grille {years[1]} : {(time.perf_counter() - start) * 1000:.1f} ms")
+        os.remove(gridding.grid_path(report["key"], years[1]))
+        start = time.perf_counter()
+        grid = gridding.grid(years[1], source, inventory, args.resolution)
+        print(f"recalcul de la grille {years[1]} (poids relus du cache) : {time.perf_counter() - start:.2f} s")
+
+        located = gridding._located(source, inventory, args.workers, stations.CHUNK_LINES)
+        rng = np.random.default_rng(SEED)
+        cells = rng.choice(grid.size, size=CHECKED_CELLS, replace=False)
+        expected = brute_force(located, len(located["years"]) - 1, cells, args.resolution)
+        same = np.allclose(grid.ravel()[cells], expected, rtol=1e-4, atol=1e-2, equal_nan=True)
+        print(f"{CHECKED_CELLS} mailles recalculées par force brute : "
+              f"{'identiques' if same else 'RÉSULTATS DIFFÉRENTS'} ({np.isnan(expected).sum()} sans station)")
+        return 0 if same else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
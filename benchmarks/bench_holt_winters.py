@@ -0,0 +1,64 @@
+"""Holt-Winters vectorisé contre statsmodels sur tout dataset.csv.
+
+Valide les prévisions du moteur vectorisé contre ExponentialSmoothing
+(écart relatif, et somme des carrés des erreurs quand elles divergent : les
+deux optimiseurs peuvent trouver des optima locaux différents) et mesure
+l'accélération.
+
+    python -m benchmarks.bench_holt_winters [--rtol 0.01]
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+from rechauffement import data, forecast, holt_winters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rtol", type=float, default=0.01, help="tolérance relative sur les prévisions")
+    args = parser.parse_args(argv)
+
+    series = data.country_series()
+    countries = [country for country in series if (series[country] > 0).all()]
+    params = forecast.MODELS["holt_winters"]
+
+    start = time.perf_counter()
+    reference, reference_sse = [], []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for country in countries:
+            hw_fit = ExponentialSmoothing(series[country], **params).fit()
+            reference.append(hw_fit.forecast(forecast.FORECAST_STEPS).to_numpy())
+            reference_sse.append(hw_fit.sse)
+    statsmodels_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_fit = holt_winters.fit(np.vstack([series[country].to_numpy() for country in countries]))
+    predicted = holt_winters.predict(batch_fit, forecast.FORECAST_STEPS)
+    batch_seconds = time.perf_counter() - start
+
+    reference = np.vstack(reference)
+    gap = (np.abs(predicted - reference) / np.abs(reference)).max(axis=1)
+    within = gap <= args.rtol
+    sse_ratio = batch_fit.sse / np.array(reference_sse)
+    print(f"{len(countries)} pays, {reference.shape[1]} années de prévision")
+    print(f"statsmodels : {statsmodels_seconds:.2f} s, vectorisé : {batch_seconds:.2f} s "
+          f"({batch_fit.iterations} itérations BFGS), accélération x{statsmodels_seconds / batch_seconds:.1f}")
+    print(f"écart relatif max par pays : médiane {np.median(gap):.1e}, 90e centile {np.percentile(gap, 90):.1e}, "
+          f"max {gap.max():.1e}")
+    print(f"prévisions à {args.rtol:.0%} près : {within.sum()}/{len(countries)} pays")
+    divergent = ~within
+    if divergent.any():
+        no_worse = (sse_ratio[divergent] <= 1.01).sum()
+        print(f"pays hors tolérance dont l'ajustement est au moins aussi bon (SSE <= 1,01 x statsmodels) : "
+              f"{no_worse}/{divergent.sum()}")
+        for index in np.flatnonzero(divergent & (sse_ratio > 1.01)):
+            print(f"  {countries[index]:<30} écart {gap[index]:.1%}, SSE x{sse_ratio[index]:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Poids des images de ressources/ par page de presentation.py, avant et après optimisation.
+
+Les appels st.image(images.resolve(...)) et lazy_image(...) sont extraits
+par analyse syntaxique, page par page (branches « if page == sections[i] »).
+Avant : fichiers d'origine, tous téléchargés à l'affichage de la page.
+Après : variantes du manifeste (python -m rechauffement.images) ; les images
+différées (popovers, expanders fermés) ne sont téléchargées qu'à leur
+ouverture et sont comptées à part. Les médias distants ne sont pas inclus.
+
+    python -m benchmarks.bench_images
+"""
+import argparse
+import ast
+import os
+
+from rechauffement import images
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "presentation.py")
+
+
+def _literal(node):
+    return node.value if isinstance(node, ast.Constant) else None
+
+
+def image_calls(tree):
+    """(chemin, largeur, différée) de chaque image locale affichée sous tree."""
+    calls = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        name = ast.unparse(node.func)
+        if name == "images.resolve" and node.args:
+            lazy = False
+        elif name == "lazy_image" and node.args:
+            lazy = True
+        else:
+            continue
+        path = _literal(node.args[0])
+        width = _literal(node.args[1]) if len(node.args) > 1 else images.DEFAULT_WIDTH
+        if path is not None:
+            calls.append((path, width, lazy))
+    return calls
+
+
+def pages(path=SCRIPT):
+    """Numéro de page (None pour les éléments communs) -> appels d'images."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    result = {None: []}
+    for node in tree.body:
+        test = ast.unparse(node.test) if isinstance(node, ast.If) else ""
+        if test.startswith("page == sections["):
+            result[int(test.split("[")[1].rstrip("]"))] = image_calls(node)
+        elif not isinstance(node, ast.FunctionDef):
+            result[None].extend(image_calls(node))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args(argv)
+    if not images.manifest():
+        print("manifeste absent : lancer d'abord python -m rechauffement.images")
+        return 1
+
+    print(f"{'page':<8} {'images':>6} {'avant':>10} {'après':>10} {'différé':>10}")
+    totals = [0, 0, 0]
+    for page, calls in pages().items():
+        before = eager = deferred = 0
+        for path, width, lazy in calls:
+            before += os.path.getsize(os.path.join(ROOT, path))
+            size = images.variant(path, width)["bytes"]
+            if lazy:
+                deferred += size
+            else:
+                eager += size
+        label = "commun" if page is None else str(page)
+        print(f"{label:<8} {len(calls):>6} {before / 1e3:>8.0f} ko {eager / 1e3:>7.0f} ko {deferred / 1e3:>7.0f} ko")
+        for index, value in enumerate((before, eager, deferred)):
+            totals[index] += value
+    before, eager, deferred = totals
+    print(f"total : {before / 1e6:.2f} Mo -> {eager / 1e6:.2f} Mo à l'affichage des pages "
+          f"({eager / before - 1:+.0%}), {deferred / 1e6:.2f} Mo à l'ouverture des popovers et expanders "
+          f"(poids total {(eager + deferred) / before - 1:+.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+"""Anomalies par rapport à une période de référence quelconque : sommes cumulées du cube contre groupby.
+
+Pour chaque période, les moyennes de référence des pays sont lues dans les
+sommes cumulées du cube (rechauffement.cube.reference_means, deux accès par
+pays) puis recalculées par filtre et groupby sur le dataset en mémoire ; de
+même pour les séries d'anomalies de chaque statistique (STATS du cube) par
+continent et pour le monde. Les résultats doivent être égaux.
+
+    python -m benchmarks.bench_reference [--repeat 200]
+"""
+import argparse
+
+import numpy as np
+
+from rechauffement import cube, data
+from benchmarks.bench_cube import timed
+
+PERIODS = [(1951, 1980), (1961, 1990), (1991, 2020), (1950, 2022), (2010, 2012)]
+
+
+def reference_groupby(dataset, reference):
+    return dataset[dataset["YEAR"].between(*reference)].groupby("Name_FR", observed=True)["YAVGT"].mean()
+
+
+def anomalies_groupby(dataset, reference, stat, by=("YEAR",)):
+    """Statistique stat des anomalies par rapport à reference, par groupby sur by."""
+    frame = dataset.assign(YANOT=dataset["YAVGT"] - dataset["Name_FR"].map(reference_groupby(dataset, reference)).astype("float64"))
+    frame = frame.dropna(subset=["YANOT"])
+    keys = [frame[column] for column in by]
+    if stat == "weighted":
+        frame = frame.dropna(subset=["population"])
+        keys = [frame[column] for column in by]
+        result = (frame["YANOT"] * frame["population"]).groupby(keys, observed=True).sum() / \
+            frame["population"].groupby(keys, observed=True).sum()
+    else:
+        result = frame["YANOT"].groupby(keys, observed=True).agg(stat)
+    return result.unstack() if len(by) > 1 else result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    dataset = data.load_dataset(columns=cube.COLUMNS)
+    countries = cube.load()["countries"]
+    print(f"{'période':<11} {'requête':<32} {'cube':>10} {'groupby':>10}")
+    identical = True
+    for reference in PERIODS:
+        queries = {
+            "moyennes de référence": (
+                lambda: cube.reference_means(reference),
+                lambda: reference_groupby(dataset, reference).reindex(countries)),
+        }
+        for stat in cube.STATS:
+            queries[f"anomalie {stat} monde"] = (
+                lambda stat=stat: cube.total("YANOT", stat, reference=reference),
+                lambda stat=stat: anomalies_groupby(dataset, reference, stat))
+            queries[f"anomalie {stat} par continent"] = (
+                lambda stat=stat: cube.by_continent("YANOT", stat, reference=reference),
+                lambda stat=stat: anomalies_groupby(dataset, reference, stat, ("YEAR", "Continent_FR")))
+        for label, (query, expected_query) in queries.items():
+            result, cube_seconds = timed(query, args.repeat)
+            expected, pandas_seconds = timed(expected_query, max(1, args.repeat // 10))
+            same = np.allclose(np.asarray(result, dtype="float64"), np.asarray(expected, dtype="float64"),
+                               rtol=1e-5, atol=1e-3, equal_nan=True)
+            identical &= same
+            print(f"{reference[0]}-{reference[1]:<6} {label:<32} {cube_seconds * 1e6:>7.0f} µs "
+                  f"{pandas_seconds * 1e6:>7.0f} µs{'' if same else '  RÉSULTATS DIFFÉRENTS'}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
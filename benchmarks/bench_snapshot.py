@@ -0,0 +1,76 @@
+"""Compare le chargement de dataset.csv : CSV vs instantané Feather projeté en mémoire.
+
+Chaque mesure est faite dans un processus neuf (démarrage à froid) ;
+on relève la durée du chargement et l'augmentation de la mémoire résidente.
+
+    python -m benchmarks.bench_snapshot [--repeat 5]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from rechauffement import data, snapshot
+
+# Code exécuté dans le sous-processus : importe pandas/pyarrow avant la
+# mesure pour ne chronométrer que la lecture.
+PROBE = """
+import json, resource, time
+import pandas, pyarrow.feather
+from rechauffement import data, snapshot
+
+def rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+columns = {columns!r}
+before = rss_kb()
+start = time.perf_counter()
+if {mode!r} == "csv":
+    frame = data.read_dataset_csv()
+    if columns:
+        frame = frame[columns]
+else:
+    frame = snapshot.read_snapshot(data.DATASET_PATH, columns)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "rss_kb": rss_kb() - before, "shape": frame.shape}}))
+"""
+
+CASES = [
+    ("csv", None),
+    ("snapshot", None),
+    ("csv", ["Name_EN", "YEAR", "YAVGT"]),
+    ("snapshot", ["Name_EN", "YEAR", "YAVGT"]),
+]
+
+
+def measure(mode, columns):
+    code = PROBE.format(mode=mode, columns=columns)
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="nombre de processus par cas")
+    args = parser.parse_args(argv)
+
+    snapshot.build_all()
+    print(f"{'chemin':<10} {'colonnes':<22} {'durée médiane':>14} {'RSS médian':>12}")
+    for mode, columns in CASES:
+        runs = [measure(mode, columns) for _ in range(args.repeat)]
+        seconds = statistics.median(run["seconds"] for run in runs)
+        rss_mb = statistics.median(run["rss_kb"] for run in runs) / 1024
+        label = "toutes" if columns is None else ", ".join(columns)
+        print(f"{mode:<10} {label:<22} {seconds * 1000:>11.1f} ms {rss_mb:>9.1f} Mo")
+
+
+if __name__ == "__main__":
+    main()
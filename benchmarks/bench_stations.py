@@ -0,0 +1,136 @@
+"""Ingestion des stations GISS v4 : débit et mémoire sur un fichier synthétique de taille réelle.
+
+Le fichier brut n'étant pas distribué avec le dépôt, un fichier au format
+GHCN-M v4 est généré dans un répertoire temporaire : 22 141 stations
+réparties sur les pays de ressources/fips_iso.csv (et quelques codes FIPS
+sans correspondance), durées d'enregistrement de 5 à 120 ans (environ
+1,27 million de lignes, comme le fichier d'origine), 8 % de valeurs
+manquantes et quelques valeurs rejetées par le contrôle qualité.
+
+rechauffement.stations est chronométré pour chaque nombre de processus
+demandé. Sur un extrait, le résultat est comparé à un calcul de référence
+(lecture complète par pandas.read_fwf, filtre et moyennes par groupby).
+
+    python -m benchmarks.bench_stations [--stations 22141] [--workers 1 2 4]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from rechauffement import stations
+
+SEED = 42
+UNMAPPED = ["XX", "YY"]
+
+
+def _write_int(lines, column, width, values):
+    """Écrit values cadrés à droite sur width colonnes à partir de column."""
+    magnitude = np.abs(values)
+    for position in range(column + width - 1, column - 1, -1):
+        digit = magnitude % 10
+        written = (magnitude > 0) | (position == column + width - 1)
+        lines[written, position] = ord("0") + digit[written]
+        magnitude //= 10
+    # Signe devant le premier chiffre
+    digits = np.maximum(np.floor(np.log10(np.maximum(np.abs(values), 1))).astype(int) + 1, 1)
+    negative = values < 0
+    lines[negative, column + width - 1 - digits[negative]] = ord("-")
+
+
+def generate(path, count, seed=SEED, batch=2000, max_years=120):
+    """Écrit un fichier GHCN-M v4 synthétique de count stations (5 à max_years années) ; renvoie le nombre de lignes."""
+    rng = np.random.default_rng(seed)
+    codes = sorted(stations.read_fips()) + UNMAPPED
+    station_codes = np.sort(rng.choice(codes, size=count))
+    baseline = {code: rng.uniform(-500, 2800) for code in codes}
+    rows = 0
+    with open(path, "wb") as f:
+        for first in range(0, count, batch):
+            chunk = station_codes[first:first + batch]
+            lengths = rng.integers(5, max_years + 1, size=len(chunk))
+            ends = rng.integers(1990, 2025, size=len(chunk))
+            owner = np.repeat(np.arange(len(chunk)), lengths)
+            years = ends[owner] - lengths[owner] + 1 + (np.arange(len(owner)) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+            lines = np.full((len(owner), stations.LINE_LENGTH), ord(" "), dtype="uint8")
+            lines[:, -1] = ord("\n")
+            ids = np.array([f"{code}{first + i:09d}".encode() for i, code in enumerate(chunk)], dtype="S11")
+            lines[:, :11] = ids[owner].view("uint8").reshape(-1, 11)
+            _write_int(lines, 11, 4, years)
+            lines[:, 15:19] = np.frombuffer(stations.ELEMENT, dtype="uint8")
+            base = np.array([baseline[code] for code in chunk])[owner]
+            season = 800 * np.cos(2 * np.pi * (np.arange(12) - 6.5) / 12)
+            values = np.round(base[:, None] + season + rng.normal(0, 150, size=(len(owner), 12))).astype(int)
+            values[rng.random(values.shape) < 0.08] = stations.MISSING
+            for month in range(12):
+                _write_int(lines, 19 + 8 * month, 5, values[:, month])
+            lines[rng.random(len(owner)) < 0.002, stations.QC_COLUMNS[0]] = ord("O")
+            f.write(lines.tobytes())
+            rows += len(lines)
+    return rows
+
+
+def reference(path, min_years=stations.MIN_YEARS, min_months=stations.MIN_MONTHS):
+    """Calcul de référence : lecture complète puis groupby."""
+    colspecs = [(0, 11), (11, 15), (15, 19)]
+    names = ["ID", "YEAR", "ELEMENT"]
+    for month in range(12):
+        colspecs += [(19 + 8 * month, 24 + 8 * month), (25 + 8 * month, 26 + 8 * month)]
+        names += [f"VALUE{month}", f"QC{month}"]
+    frame = pd.read_fwf(path, colspecs=colspecs, names=names, header=None, dtype={name: str for name in names})
+    values = frame[[f"VALUE{month}" for month in range(12)]].astype("float64")
+    qc = frame[[f"QC{month}" for month in range(12)]].notna().to_numpy()
+    values = values.mask((values == stations.MISSING).to_numpy() | qc)
+    values.columns = range(12)
+    frame = pd.concat([frame[["ID", "YEAR"]], values], axis=1)
+    frame["YEAR"] = frame["YEAR"].astype(int)
+    frame = frame[values.notna().any(axis=1)]
+    frame = frame[frame.groupby("ID")["YEAR"].transform("size") >= min_years]
+    frame["ISO_2"] = frame["ID"].str[:2].map(stations.read_fips())
+    codes = stations.country_codes()
+    frame = frame[frame["ISO_2"].isin(list(codes))]
+    monthly = frame.groupby(["ISO_2", "YEAR"])[list(range(12))].mean()
+    monthly = monthly[monthly.notna().sum(axis=1) >= min_months]
+    result = pd.DataFrame({"Code_ISO": monthly.index.get_level_values("ISO_2").map(codes),
+                           "YEAR": monthly.index.get_level_values("YEAR"),
+                           "YAVGT": monthly.mean(axis=1).round(2).to_numpy()})
+    return result.sort_values(["Code_ISO", "YEAR"], ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=22141)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count()}))
+    parser.add_argument("--check-stations", type=int, default=500, help="stations de l'extrait vérifié")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        sample = os.path.join(directory, "extrait.dat")
+        generate(sample, args.check_stations)
+        table, _ = stations.ingest(sample, workers=1)
+        expected = reference(sample)
+        # Ordre de sommation différent : un arrondi au centième peut différer d'une unité
+        pd.testing.assert_frame_equal(table[["Code_ISO", "YEAR", "YAVGT"]], expected, check_dtype=False,
+                                      check_exact=False, rtol=0, atol=0.0101)
+        print(f"extrait de {args.check_stations} stations identique au calcul de référence ({len(table)} années-pays)")
+
+        path = os.path.join(directory, "v4.mean_synthetique.dat")
+        start = time.perf_counter()
+        rows = generate(path, args.stations)
+        print(f"fichier synthétique : {rows} lignes, {os.path.getsize(path) / 1e6:.0f} Mo "
+              f"(généré en {time.perf_counter() - start:.1f} s)")
+        print(f"{'processus':>9} {'durée':>8} {'lignes/s':>12} {'Mo/s':>7} {'mémoire max':>12}")
+        for workers in args.workers:
+            table, report = stations.ingest(path, workers=workers)
+            memory = "-" if report["max_rss_mb"] is None else f"{report['max_rss_mb']:.0f} Mo"
+            print(f"{workers:>9} {report['seconds']:>6.1f} s {report['rows_per_second']:>12,.0f} "
+                  f"{report['mb_per_second']:>7.1f} {memory:>12}".replace(",", " "))
+        print(f"{report['retained_stations']}/{report['stations']} stations retenues, "
+              f"{len(table)} années-pays, FIPS sans correspondance : {report['unmapped_fips']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare les ajustements SARIMAX à froid et à chaud lors de l'ajout d'une année.
+
+Pour chaque pays, warm_forecast est d'abord appelé sans la dernière année,
+ce qui amorce un cache de paramètres de départ temporaire (état « avant
+mise à jour »), puis la prévision sur la série complète est calculée :
+  - à froid : forecast_sarimax, optimisation depuis les valeurs par défaut ;
+  - à chaud : warm_forecast, qui repart des paramètres amorcés (chemin de
+    forecast() et du calcul par lots).
+
+    python -m benchmarks.bench_warm_start [--countries 20]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from rechauffement import data, forecast
+from rechauffement.cache import ForecastCache
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--countries", type=int, default=None, help="limiter aux N premiers pays")
+    args = parser.parse_args(argv)
+
+    params = forecast.MODELS["sarimax"]
+    series = data.country_series()
+    countries = list(series)[:args.countries]
+    durations = {"froid": [], "chaud": []}
+    deviations = []
+    with tempfile.TemporaryDirectory() as directory:
+        start_cache = ForecastCache(directory)
+        for country in countries:
+            full = series[country]
+            forecast.warm_forecast(country, full.iloc[:-1], "sarimax", start_cache=start_cache)
+            cold, cold_seconds = timed(forecast.forecast_sarimax, full, **params)
+            warm, warm_seconds = timed(forecast.warm_forecast, country, full, "sarimax", start_cache=start_cache)
+            durations["froid"].append(cold_seconds)
+            durations["chaud"].append(warm_seconds)
+            reference = cold["mean"].to_numpy()
+            deviations.append((np.abs(warm["mean"].to_numpy() - reference) / np.abs(reference)).max())
+
+    print(f"{len(countries)} pays, SARIMAX{params['order']}x{params['seasonal_order']}")
+    print(f"{'mode':<6} {'durée méd.':>11} {'durée totale':>13}")
+    for name, seconds in durations.items():
+        print(f"{name:<6} {statistics.median(seconds) * 1000:>8.1f} ms {sum(seconds):>11.2f} s")
+    print(f"écart relatif max des prévisions (chaud vs froid) : {max(deviations):.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Profil d'import (python -X importtime) du démarrage de presentation.py.
+
+Les imports de presentation.py sont extraits par analyse syntaxique : ceux
+du niveau module (payés à chaque démarrage), ceux placés dans une branche
+de page (payés à la première visite de la page) et ceux différés dans les
+fonctions des modules rechauffement utilisés (payés au premier appel, par
+exemple statsmodels au premier ajustement). Chaque ensemble est importé
+dans un interpréteur neuf ; le temps cumulé est comparé au profil de
+référence enregistré dans benchmarks/results/importtime.json.
+
+    python -m benchmarks.importtime            # compare à la référence
+    python -m benchmarks.importtime --save     # met à jour la référence
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "presentation.py")
+BASELINE = os.path.join(ROOT, "benchmarks", "results", "importtime.json")
+# Écart relatif au-delà duquel un temps d'import est signalé comme régression
+TOLERANCE = 0.20
+
+
+def script_imports(path=SCRIPT):
+    """Instructions d'import (source) du niveau module et des branches de page."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    startup, pages = [], []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            startup.append(ast.unparse(node))
+        elif isinstance(node, ast.If):
+            pages.extend(ast.unparse(child) for child in ast.walk(node)
+                         if isinstance(child, (ast.Import, ast.ImportFrom)))
+    return startup, pages
+
+
+def deferred_imports(statements):
+    """Imports placés dans les fonctions des modules rechauffement importés par statements."""
+    deferred = []
+    for statement in statements:
+        for node in ast.walk(ast.parse(statement)):
+            if isinstance(node, ast.ImportFrom) and node.module == "rechauffement":
+                names = [f"rechauffement.{alias.name}" for alias in node.names]
+            elif isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names if alias.name.startswith("rechauffement.")]
+            else:
+                continue
+            for name in names:
+                path = os.path.join(ROOT, *name.split(".")) + ".py"
+                if not os.path.exists(path):
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    tree = ast.parse(f.read())
+                for function in ast.walk(tree):
+                    if isinstance(function, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        deferred.extend(ast.unparse(child) for child in ast.walk(function)
+                                        if isinstance(child, (ast.Import, ast.ImportFrom)))
+    return list(dict.fromkeys(deferred))
+
+
+def profile(statements, repeat):
+    """Temps cumulé médian (ms) et détail par module de premier niveau."""
+    totals, modules = [], {}
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "\n".join(statements)],
+                                cwd=ROOT, capture_output=True, text=True, check=True)
+        run = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line.split("|")
+            if not name.startswith("  "):  # module importé directement (premier niveau)
+                run[name.strip()] = int(cumulative) / 1000
+        totals.append(sum(run.values()))
+        for name, milliseconds in run.items():
+            modules.setdefault(name, []).append(milliseconds)
+    return {"total_ms": statistics.median(totals),
+            "modules": {name: statistics.median(values) for name, values in modules.items()}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="interpréteurs lancés par mesure")
+    parser.add_argument("--save", action="store_true", help="enregistre le profil comme référence")
+    parser.add_argument("--top", type=int, default=8, help="modules les plus coûteux affichés")
+    args = parser.parse_args(argv)
+
+    startup, pages = script_imports()
+    profiles = {"démarrage": profile(startup, args.repeat),
+                "toutes les pages": profile(startup + pages, args.repeat),
+                "premiers appels": profile(startup + pages + deferred_imports(startup + pages), args.repeat)}
+    baseline = {}
+    if os.path.exists(BASELINE) and not args.save:
+        with open(BASELINE, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    regressions = 0
+    for case, result in profiles.items():
+        line = f"{case:<17} {result['total_ms']:8.0f} ms"
+        if case in baseline:
+            reference = baseline[case]["total_ms"]
+            change = result["total_ms"] / reference - 1
+            line += f"  (référence {reference:.0f} ms, {change:+.0%})"
+            if change > TOLERANCE:
+                line += "  RÉGRESSION"
+                regressions += 1
+        print(line)
+        for name, milliseconds in sorted(result["modules"].items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {name:<40} {milliseconds:8.1f} ms")
+
+    if args.save:
+        os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump(profiles, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"référence écrite : {BASELINE}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Test de charge de l'API des prévisions (latences p50/p99 et requêtes/s).
+
+Sans --url, un serveur est démarré dans le processus sur un port libre.
+Les pays demandés sont d'abord calculés une fois (préchauffage) : la mesure
+porte sur le service de résultats en cache, cas nominal de l'API.
+
+    python -m benchmarks.load_test [--concurrency 8] [--requests 2000] [--batch 1]
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from rechauffement import api, data
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="URL de base d'un serveur déjà lancé (ex. http://127.0.0.1:8000)")
+    parser.add_argument("--concurrency", type=int, default=8, help="clients simultanés")
+    parser.add_argument("--requests", type=int, default=2000, help="nombre total de requêtes")
+    parser.add_argument("--batch", type=int, default=1, help="pays par requête")
+    parser.add_argument("--countries", type=int, default=20, help="taille du jeu de pays tirés au hasard")
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = api.make_server(port=0, quiet=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+    rng = random.Random(0)
+    countries = rng.sample(list(data.countries_list()), args.countries)
+    urls = [f"{base_url}/forecast?" + urlencode({"country": rng.sample(countries, args.batch)}, doseq=True)
+            for _ in range(args.requests)]
+
+    start = time.perf_counter()
+    with urlopen(f"{base_url}/forecast?" + urlencode({"country": countries}, doseq=True)) as response:
+        json.load(response)
+    print(f"préchauffage de {len(countries)} pays : {time.perf_counter() - start:.1f} s")
+
+    def fetch(url):
+        started = time.perf_counter()
+        with urlopen(url) as response:
+            response.read()
+        return time.perf_counter() - started
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = list(pool.map(fetch, urls))
+    elapsed = time.perf_counter() - start
+    if server is not None:
+        server.shutdown()
+
+    print(f"{args.requests} requêtes ({args.batch} pays/requête), {args.concurrency} clients")
+    print(f"p50 {percentile(latencies, 0.50) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms, "
+          f"moyenne {statistics.mean(latencies) * 1000:.1f} ms")
+    print(f"débit : {args.requests / elapsed:.0f} requêtes/s")
+
+
+if __name__ == "__main__":
+    main()
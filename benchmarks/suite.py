@@ -0,0 +1,204 @@
+"""Suite de benchmarks : chargement, filtre par pays, ajustements et rendu des pages.
+
+Sur le modèle de pytest-benchmark : chaque cas est exécuté un nombre fixe
+de tours après un tour de préchauffage, et ses statistiques (min, max,
+moyenne, écart-type, médiane) sont enregistrées en JSON dans
+benchmarks/results/suite/ (un fichier numéroté par exécution). --compare
+compare les médianes à une exécution précédente (la dernière par défaut) et
+signale les régressions de plus de TOLERANCE.
+
+Cas mesurés :
+  - chargement de dataset.csv à froid (data.load_dataset dans un processus
+    neuf, instantané compris), relecture directe du CSV et accès mémorisé ;
+  - filtre Name_EN des pays représentatifs (masque booléen et séries indexées) ;
+  - ajustements SARIMAX et Holt-Winters des pays représentatifs ;
+  - rendu sans navigateur de chaque page (streamlit.testing AppTest).
+
+    python -m benchmarks.suite [--filter rendu] [--compare [RUN.json]] [--no-save]
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "presentation.py")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results", "suite")
+# Écart relatif des médianes au-delà duquel un cas est signalé comme régression
+TOLERANCE = 0.20
+COUNTRIES = ["France", "United States", "Brazil", "India", "Australia"]
+
+# Code exécuté dans un processus neuf : pandas est importé avant la mesure
+# pour ne chronométrer que le chargement.
+COLD_PROBE = """
+import time
+import pandas
+from rechauffement import data
+start = time.perf_counter()
+data.load_dataset()
+print(time.perf_counter() - start)
+"""
+
+
+def timer(function):
+    """Échantillon chronométrant un appel de function."""
+    def sample():
+        start = time.perf_counter()
+        function()
+        return time.perf_counter() - start
+    return sample
+
+
+def cold_load():
+    result = subprocess.run([sys.executable, "-c", COLD_PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def page_render(index):
+    """Échantillon : rendu de la page sections[index] dans une session neuve (hors démarrage de la session)."""
+    from streamlit.testing.v1 import AppTest
+
+    def sample():
+        app = AppTest.from_file(SCRIPT, default_timeout=600)
+        app.run()
+        radio = app.sidebar.radio[0].set_value(app.sidebar.radio[0].options[index])
+        start = time.perf_counter()
+        radio.run()
+        seconds = time.perf_counter() - start
+        if app.exception:
+            raise RuntimeError(f"page {index} : {app.exception[0].message}")
+        return seconds
+    return sample
+
+
+def sections(path=SCRIPT):
+    """Titres des pages, lus dans le script sans l'exécuter."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and [ast.unparse(target) for target in node.targets] == ["sections"]:
+            return ast.literal_eval(node.value)
+    raise ValueError(f"liste sections introuvable dans {path}")
+
+
+def cases():
+    """(groupe, nom, échantillon, tours) de tous les cas de la suite."""
+    from rechauffement import data, forecast
+
+    dataset = data.load_dataset()
+    series = data.country_series()
+    result = [
+        ("chargement", "load_dataset à froid (processus neuf)", cold_load, 5),
+        ("chargement", "dataset.csv relu (cache disque chaud)", timer(data.read_dataset_csv), 10),
+        ("chargement", "dataset mémorisé (load_dataset)", timer(data.load_dataset), 1000),
+        ("filtre Name_EN", f"masque booléen ({len(COUNTRIES)} pays)",
+         timer(lambda: [dataset[dataset["Name_EN"] == country] for country in COUNTRIES]), 100),
+        ("filtre Name_EN", f"séries indexées ({len(COUNTRIES)} pays)",
+         timer(lambda: [data.country_series()[country] for country in COUNTRIES]), 1000),
+    ]
+    for model, name in (("sarimax", "SARIMAX"), ("holt_winters", "Holt-Winters")):
+        for country in COUNTRIES:
+            result.append(("ajustement", f"{name} {country}",
+                           timer(lambda s=series[country], m=model: forecast.compute_forecast(s, m)), 3))
+    for index, section in enumerate(sections()):
+        result.append(("rendu", f"page {index} : {section}", page_render(index), 3))
+    return result
+
+
+def duration(seconds):
+    return f"{seconds * 1e6:7.1f} µs" if seconds < 1e-3 else f"{seconds * 1e3:7.1f} ms"
+
+
+def measure(sample, rounds, warmup=1):
+    """Statistiques (secondes) de rounds appels de sample après warmup appels ignorés."""
+    for _ in range(warmup):
+        sample()
+    durations = [sample() for _ in range(rounds)]
+    return {"min": min(durations), "max": max(durations), "mean": statistics.mean(durations),
+            "stddev": statistics.stdev(durations) if rounds > 1 else 0.0,
+            "median": statistics.median(durations), "rounds": rounds}
+
+
+def machine_info():
+    commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                           capture_output=True, text=True)
+    return ({"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+            {"id": commit.stdout.strip() or None, "dirty": bool(dirty.stdout.strip())})
+
+
+def saved_runs():
+    """Exécutions enregistrées, de la plus ancienne à la plus récente."""
+    return sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")))
+
+
+def save(run):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    previous = saved_runs()
+    number = int(os.path.basename(previous[-1]).split("_")[0]) + 1 if previous else 1
+    commit = (run["commit_info"]["id"] or "sans-commit")[:8]
+    path = os.path.join(RESULTS_DIR, f"{number:04d}_{commit}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    return path
+
+
+def compare(run, reference):
+    """Affiche l'évolution des médianes ; renvoie le nombre de régressions."""
+    before = {(b["group"], b["name"]): b["stats"]["median"] for b in reference["benchmarks"]}
+    regressions = 0
+    print(f"comparaison avec {reference['datetime']} ({(reference['commit_info']['id'] or '?')[:8]}) :")
+    for benchmark in run["benchmarks"]:
+        key = (benchmark["group"], benchmark["name"])
+        if key not in before:
+            continue
+        change = benchmark["stats"]["median"] / before[key] - 1
+        flag = "  RÉGRESSION" if change > TOLERANCE else ""
+        regressions += bool(flag)
+        print(f"  {benchmark['group']:<15} {benchmark['name']:<45} {change:+7.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", help="ne lancer que les cas dont le groupe ou le nom contient ce texte")
+    parser.add_argument("--compare", nargs="?", const="", metavar="RUN.json",
+                        help="compare à une exécution enregistrée (la dernière par défaut)")
+    parser.add_argument("--no-save", action="store_true", help="n'enregistre pas les résultats")
+    args = parser.parse_args(argv)
+
+    reference = None
+    if args.compare is not None:
+        path = args.compare or (saved_runs() or [None])[-1]
+        if path is None:
+            parser.error("aucune exécution enregistrée à comparer")
+        with open(path, encoding="utf-8") as f:
+            reference = json.load(f)
+
+    machine, commit = machine_info()
+    run = {"machine_info": machine, "commit_info": commit,
+           "datetime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "benchmarks": []}
+    print(f"{'groupe':<15} {'cas':<45} {'médiane':>10} {'min':>10} {'écart-type':>10} {'tours':>5}")
+    for group, name, sample, rounds in cases():
+        if args.filter and args.filter not in group and args.filter not in name:
+            continue
+        stats = measure(sample, rounds)
+        run["benchmarks"].append({"group": group, "name": name, "stats": stats})
+        print(f"{group:<15} {name:<45} {duration(stats['median'])} {duration(stats['min'])} "
+              f"{duration(stats['stddev'])} {rounds:>5}")
+
+    if not args.no_save:
+        print(f"résultats écrits : {save(run)}")
+    regressions = compare(run, reference) if reference is not None else 0
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,20 +1,29 @@
 import streamlit as st
 import streamlit.components.v1 as components
 import pandas as pd
-import matplotlib.pyplot as plt
-from statsmodels.tsa.statespace.sarimax import SARIMAX
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
-import plotly.graph_objects as go
 # Pour éviter d'avoir les messages warning
 import warnings
 warnings.filterwarnings('ignore')
+from rechauffement import assets, data, images, timing, world
 
-# Chargement des datasets et listes
-dataset = pd.read_csv('./ressources/dataset.csv', sep=";")
-monde = pd.read_csv("./ressources/MONDE.csv", sep=";").set_index('date')
+# Chronométrage de l'exécution (détail dans la barre latérale avec ?debug=1, exports : voir rechauffement.timing)
+timing.begin_run()
 
-continents_list = dataset['Continent_EN'].unique()
-countries_list = dataset['Name_EN'].unique()
+# Chargement des datasets et listes (lus une seule fois par processus)
+with timing.span("startup.data"):
+    monde = world.monde()
+
+    continents_list = data.continents_list()
+    countries_list = data.countries_list()
+
+
+def lazy_image(path, width=images.DEFAULT_WIDTH):
+    """Image optimisée téléchargée par le navigateur seulement à son affichage (popovers, expanders fermés)."""
+    tag = images.lazy_tag(path, width)
+    if tag is None:
+        st.image(path)
+    else:
+        st.markdown(tag, unsafe_allow_html=True)
 
 # Page config
 st.set_page_config(page_title="Rechauffement Planete - Sébastien Lagarde-Corrado et Damien Selosse", layout="wide")
@@ -27,6 +36,7 @@ sections=["Introduction",
         "Visualisation des données",
         "Modèles supervisés",
         "Modèles séries temporelles et prédictions",
+        "Simulation de scénarios",
         "Crédits"]
 
 
@@ -43,7 +53,7 @@ with st.sidebar:
         page=st.radio("** **", sections)    
     # Zone d'en-tête
     with st.container(border=True):
-        st.image("https://datascientest.com/wp-content/uploads/2022/03/logo-2021.png")
+        st.image(assets.resolve("https://datascientest.com/wp-content/uploads/2022/03/logo-2021.png"))
         st.markdown("""
             
             <div data-testid="stCaptionContainer" class="st-emotion-cache-1g1z3k2 e1nzilvr5">
@@ -54,7 +64,7 @@ with st.sidebar:
             </div>
             """,unsafe_allow_html=True)
         
-        IN="https://media.licdn.com/dms/image/v2/D4E0BAQFkiMXPKAXo0Q/company-logo_100_100/company-logo_100_100/0/1719404287274/linkedin_social_selling_logo?e=1733961600&v=beta&t=u98lpxNPMVejUKouuUlO1CPO1j892JKpjWYG7F4dVhw"
+        IN=assets.resolve("https://media.licdn.com/dms/image/v2/D4E0BAQFkiMXPKAXo0Q/company-logo_100_100/company-logo_100_100/0/1719404287274/linkedin_social_selling_logo?e=1733961600&v=beta&t=u98lpxNPMVejUKouuUlO1CPO1j892JKpjWYG7F4dVhw")
         autors1=st.columns((.5,.8,8))
         autors1[1].image(IN, width=20)
         autors1[2].markdown("[Sébastien Lagarde-Corrado](https://www.linkedin.com/in/slagardecorrado/)", unsafe_allow_html=True)
@@ -64,14 +74,17 @@ with st.sidebar:
     
     # Séparation illustrée
     #with st.container():
-        st.image("https://data.giss.nasa.gov/tmp/gistemp/NMAPS/tmp_GHCNv4_ERSSTv5_1200km_Anom_7_2024_2024_1951_1980_100_180_90_0_2_/amaps.png")
+        st.image(assets.resolve("https://data.giss.nasa.gov/tmp/gistemp/NMAPS/tmp_GHCNv4_ERSSTv5_1200km_Anom_7_2024_2024_1951_1980_100_180_90_0_2_/amaps.png"))
         col1,col2=st.columns((4.5,5.5))
         with col1:
             with st.popover("🔎 Zoom"):
-                st.image("https://data.giss.nasa.gov/tmp/gistemp/NMAPS/tmp_GHCNv4_ERSSTv5_1200km_Anom_7_2024_2024_1951_1980_100_180_90_0_2_/amaps.png")
+                st.image(assets.resolve("https://data.giss.nasa.gov/tmp/gistemp/NMAPS/tmp_GHCNv4_ERSSTv5_1200km_Anom_7_2024_2024_1951_1980_100_180_90_0_2_/amaps.png"))
         with col2:
             with st.popover("🎥  Évolution"):
-                st.video("https://data.giss.nasa.gov/gistemp/animations/TEMPANOMALY_05_2023_pdiff.mp4")
+                st.video(assets.resolve("https://data.giss.nasa.gov/gistemp/animations/TEMPANOMALY_05_2023_pdiff.mp4"))
+
+    # Détail des temps d'exécution, rempli en fin de script
+    debug_overlay = st.empty() if st.query_params.get("debug") == "1" else None
     
 
 #============
@@ -104,6 +117,9 @@ with st.container():
     st.divider()
 
 # INTRODUCTION
+# Une seule branche de page s'exécute : un span unique la couvre
+page_span = timing.span("page", page=page).start()
+
 if page == sections[0] :
     with st.container():
         st.header(f"{sections[0]}")
@@ -111,7 +127,7 @@ if page == sections[0] :
         with cols[0]:
             st.title("")
             #st.write("")
-            st.image("https://media.set.or.th/set/Images/2024/Jun/thailand-focus-2024-img-04.jpg")
+            st.image(assets.resolve("https://media.set.or.th/set/Images/2024/Jun/thailand-focus-2024-img-04.jpg"))
         with cols[1]:
             intro_tabs = st.tabs(["Contexte général",
                             "Du point de vue technique",
@@ -159,6 +175,8 @@ if page == sections[0] :
         
 # DONNEES COLLECTE DESCRIPTION
 if page == sections[1] :
+    # Figures lues dans le cube d'agrégation (plotly importé seulement sur les pages qui l'utilisent)
+    from rechauffement import charts
     with st.container():
         st.header(f"{sections[1]}")
         st.subheader("Jeux de données")
@@ -175,13 +193,13 @@ if page == sections[1] :
                     st.write("Moyennes de températures (mensuelle, saisonnière ou annuelle) mondiales ou par hémisphère ou par zone, de 1880 à aujourd'hui.")
                     st.write("✅ précision chronologique importante (échelle mensuelle) et grande période couverte (1880-2024)")
                     st.write("❌ précision géographique faible (échelle zonale)")
-                    st.image("./ressources/GHCN.png")
+                    lazy_image("./ressources/GHCN.png")
             with sub_cols_i[1]:
                 with st.popover("Températures de surface (satellites Atmospheric Infra-Red Sounder - AIRS, v5 - v6 et v7)"):
                         st.write("Moyennes de températures (mensuelle, saisonnière ou annuelle) mondiales ou par hémisphère ou par zone, de 2002 à aujourd'hui.")
                         st.write("✅ précision chronologique importante (échelle mensuelle)")
                         st.write("❌ précision géographique faible (échelle zonale) et peu d’antériorité chronologique (2002-2024)")
-                        st.image("./ressources/AirV6.png")
+                        lazy_image("./ressources/AirV6.png")
                         st.write("Ici on peut déjà observer des écarts jusqu’à + 0,3°C alors que la période de référence appartient à l’ère post-industrielle. \n"
                                 "Les différentes versions, v5, v6 et v7 nous donnent des résultats différents mais la tendance reste la même : "
                                 "augmentation des anomalies de températures avec une accélération depuis 2014 en dépit des épisodes Niña sur la période.")
@@ -189,7 +207,7 @@ if page == sections[1] :
                 with st.popover("Anomalies climatiques mensuelles moyennes par coordonnées GPS de 1961 à 2010"):
                     st.write("✅ précision chronologique importante (échelle mensuelle) et géographique importante (échelle GPS)")
                     st.write("❌ période trop restreinte et manque d’actualité (1961-2010)")                    
-                    st.image("./ressources/GISTEMPU.png")
+                    lazy_image("./ressources/GISTEMPU.png")
                     
             st.markdown("""2️⃣ <b>Données mondiales CO2 et gaz à effet de serre (Our World in Data CO2 and Greenhouse Gas Emissions dataset)</b>
                         - (Source: https://github.com/owid/co2-dat)
@@ -249,7 +267,7 @@ if page == sections[1] :
             with st.popover("plus..."):
                 st.write("Petit dataset 66 lignes x 3 colonnes")
                 st.write("✅ Précision géographique faible (échelle mondiale) et chronologique réduite (échelle annuelle) : de 1959 à 2023")
-                st.image("./ressources/Co2Atm.png")
+                lazy_image("./ressources/Co2Atm.png")
 
 
         st.subheader("Analyse des jeux de données")
@@ -281,13 +299,13 @@ if page == sections[1] :
                     cols = st.columns(3)
                     with cols[0]:
                         st.write("a) le nombre de stations dont la durée d'enregistrement est d'au moins N années en fonction de N")
-                        st.image("https://data.giss.nasa.gov/gistemp/station_data_v4_globe/station_record_length.png")
+                        st.image(assets.resolve("https://data.giss.nasa.gov/gistemp/station_data_v4_globe/station_record_length.png"))
                     with cols[1]:
                         st.write("b) le nombre de stations de reporting en fonction du temps")
-                        st.image("https://data.giss.nasa.gov/gistemp/station_data_v4_globe/number_of_stations.png")
+                        st.image(assets.resolve("https://data.giss.nasa.gov/gistemp/station_data_v4_globe/number_of_stations.png"))
                     with cols[2]:
                         st.write("c) le pourcentage de la superficie hémisphérique située à moins de 1 200 km d'une station de déclaration.")
-                        st.image("https://data.giss.nasa.gov/gistemp/station_data_v4_globe/coverage.png")
+                        st.image(assets.resolve("https://data.giss.nasa.gov/gistemp/station_data_v4_globe/coverage.png"))
                 st.write("")
             st.write("")
             
@@ -302,7 +320,7 @@ if page == sections[1] :
                 st.write("")
             with cols_analyse_T2[1]:
                 with st.popover("➕"): #Distribution du nombre de stations météorologiques par pays"):
-                    st.image("./ressources/DistribTStations.png")
+                    lazy_image("./ressources/DistribTStations.png")
                     st.write("Pour 25% des pays, il y existe au-moins 3 stations, 50% des pays disposent de 1 à 10 stations et 75% des pays disposent de 1 à 29 stations d’enregistrement météorologique. Pour des raisons de visibilité, le graphe ne figure pas les pays de plus de 400 stations.")
             st.write("")
             
@@ -318,14 +336,14 @@ if page == sections[1] :
                 with st.popover("➕"): #Distribution des années d'enregistrement des stations météorologiques"):
                     sub_cols = st.columns(2)
                     with sub_cols[0]:
-                        st.image("./ressources/DistribTY.png")
+                        lazy_image("./ressources/DistribTY.png")
                         st.markdown("""
                             <div style="text-align: justify;">
                             Si le nombre de pays participant aux mesures de températures augmente régulièrement entre les années 1880 et 1950, ce n’est qu’à partir de ces années que le nombre de pays impliqués a rapidement atteint son maximum et s’est stabilisé depuis.
                             </div>
                             """, unsafe_allow_html=True)
                     with sub_cols[1]:
-                        st.image("./ressources/DistribTYC.png")
+                        lazy_image("./ressources/DistribTYC.png")
                         st.markdown("""
                             <div style="text-align: justify;">
                             Pour la majorité des pays (75%), les données d’enregistrement des températures s’étalent sur 76 à 137 années (médiane 105 années). 
@@ -347,8 +365,8 @@ if page == sections[1] :
                 st.write("")
             with cols_analyse_T4[1]:
                 with st.popover("➕"): #Distribution mensuelle des enregistrements des stations météorologiques"):
-                    st.image("./ressources/DistribTMNan.png")
-                    st.image("./ressources/DistribTM.png")
+                    lazy_image("./ressources/DistribTMNan.png")
+                    lazy_image("./ressources/DistribTM.png")
                     st.write("Le graphique montre une répartition des températures homogène sur l’ensemble des mois de l’année, avec une température médiane autour de 20°C. Néanmoins, les températures des mois «chauds» sont plus homogènes et concentrées entre 15 et 25°C, alors que les températures des mois «froids» sont plus hétérogènes selon les pays.")
             st.write("")
             
@@ -369,11 +387,11 @@ if page == sections[1] :
                 with st.popover("➕"): #Distribution mensuelle des enregistrements des stations météorologiques"):
                     sub_cols = st.columns(2)
                     with sub_cols[0]:
-                        st.image("https://data.giss.nasa.gov/gistemp/faq/merra2_seas_anom.png")
+                        st.image(assets.resolve("https://data.giss.nasa.gov/gistemp/faq/merra2_seas_anom.png"))
                     with sub_cols[1]:
                         st.write("Les anomalies de températures par rapport au cycle saisonnier 1980-2015 dans MERRA2. Selon le cycle saisonnier de la température moyenne mondiale, en moyenne, juillet et août sont environ 3,6 °C plus chauds que décembre et janvier. "
                             "Ainsi, un réchauffement de +1°C en décembre serait exceptionnellement chaud pour ce mois, alors qu'il ne serait pas significatif en juillet.")
-                    st.image("./ressources/WYAVGT.png")
+                    lazy_image("./ressources/WYAVGT.png")
             st.write("")
 
             cols_analyse_T6 = st.columns((9,.5,.5))
@@ -386,10 +404,12 @@ if page == sections[1] :
                     """, unsafe_allow_html=True)
             with cols_analyse_T6[1]:
                 with st.popover("➕"): #Évolutions de température moyenne par pays"):
-                    st.image("./ressources/YAVGT_Europe.png")
+                    st.plotly_chart(charts.countries_figure(["France", "Allemagne", "Autriche", "Belgique", "Espagne",
+                                                             "Finlande", "Grèce", "Irlande", "Italie", "Luxembourg",
+                                                             "Pays-Bas", "Portugal"]), width=900)
             with cols_analyse_T6[2]:
                 with st.popover("➕"): #Évolutions de température moyenne par continent"):
-                    st.image("./ressources/YAVGT_Continents.png")
+                    st.plotly_chart(charts.continents_figure(), width=900)
             st.write("")
         
             cols_analyse_T7 = st.columns((9,1))
@@ -402,7 +422,7 @@ if page == sections[1] :
                     """, unsafe_allow_html=True)
             with cols_analyse_T7[1]:
                 with st.popover("➕"): #Température de référence moyenne par pays"):
-                    st.image("./ressources/WREFT.png")
+                    lazy_image("./ressources/WREFT.png")
             st.write("")
 
             cols_analyse_T8 = st.columns((9,1))
@@ -415,8 +435,8 @@ if page == sections[1] :
                     """, unsafe_allow_html=True)
             with cols_analyse_T8[1]:
                 with st.popover("➕"): #Température de référence moyenne par pays"):
-                    st.image("./ressources/WYANOT1.png")
-                    st.image("./ressources/WYANOT2.png")
+                    st.plotly_chart(charts.anomaly_figure(), width=900)
+                    lazy_image("./ressources/WYANOT2.png")
             st.write("")
 
             cols_analyse_T9 = st.columns((9,1))
@@ -428,9 +448,9 @@ if page == sections[1] :
                     """, unsafe_allow_html=True)
             with cols_analyse_T9[1]:
                 with st.popover("➕"): #Antarctique"):
-                    st.image("./ressources/Antar01.png")
-                    st.image("./ressources/Antar02.png")
-                    st.image("./ressources/Antar03.png")
+                    lazy_image("./ressources/Antar01.png")
+                    lazy_image("./ressources/Antar02.png")
+                    lazy_image("./ressources/Antar03.png")
             st.write("")
 
 
@@ -455,10 +475,10 @@ if page == sections[1] :
                     """, unsafe_allow_html=True)
             with cols_analyse_C1[1]:
                 with st.popover("➕"): #Taux de Nan initial"):
-                    st.image("./ressources/CO2_Nan00a.png")
+                    lazy_image("./ressources/CO2_Nan00a.png")
             with cols_analyse_C1[2]:
                 with st.popover("➕"): #Taux de Nan corrigé"):
-                    st.image("./ressources/CO2_Nan00b.png")
+                    lazy_image("./ressources/CO2_Nan00b.png")
             st.write("")
 
             cols_analyse_C2 = st.columns((9,1))
@@ -472,11 +492,11 @@ if page == sections[1] :
                 with st.popover("➕"): #Taux de Nan selon les années"):
                     sub_cols=st.columns(3)
                     with sub_cols[0]:
-                        st.image("./ressources/CO2_Nan01.png")
+                        lazy_image("./ressources/CO2_Nan01.png")
                     with sub_cols[1]:
-                        st.image("./ressources/CO2_Nan02.png")
+                        lazy_image("./ressources/CO2_Nan02.png")
                     with sub_cols[2]:
-                        st.image("./ressources/CO2_Nan03.png")
+                        lazy_image("./ressources/CO2_Nan03.png")
             st.write("")
 
             cols_analyse_C3 = st.columns((9,1))
@@ -492,9 +512,9 @@ if page == sections[1] :
             with cols_analyse_C3[1]:
                 with st.popover("➕"): #Distribution Avant et après transformation Robustscaler"):
                     st.write("Distribution des variables AVANT transformation")
-                    st.image("./ressources/CO2_Distrib01.png")
+                    lazy_image("./ressources/CO2_Distrib01.png")
                     st.write("Distribution des variables APRÈS transformation")
-                    st.image("./ressources/CO2_Distrib02.png")
+                    lazy_image("./ressources/CO2_Distrib02.png")
             st.write("")
 
             cols_analyse_C4 = st.columns((9,.5,.5))
@@ -511,17 +531,17 @@ if page == sections[1] :
                     st.write("Détermination des courbes de tendance")
                     sub_cols=st.columns(2)
                     with sub_cols[0]:
-                        st.image("./ressources/Meth1_monde01.png")
-                        st.image("./ressources/Meth1_monde03.png")
+                        lazy_image("./ressources/Meth1_monde01.png")
+                        lazy_image("./ressources/Meth1_monde03.png")
                     with sub_cols[1]:
-                        st.image("./ressources/Meth1_monde02.png")
-                        st.image("./ressources/Meth1_monde03.png")
+                        lazy_image("./ressources/Meth1_monde02.png")
+                        lazy_image("./ressources/Meth1_monde03.png")
             with cols_analyse_C4[2]:
                 with st.popover("➕"): #Correction exemples"):
                     st.write("Exemples de données complétées")
-                    st.image("./ressources/Meth1_corr01.png")
-                    st.image("./ressources/Meth1_corr02.png")
-                    st.image("./ressources/Meth1_corr03.png")
+                    lazy_image("./ressources/Meth1_corr01.png")
+                    lazy_image("./ressources/Meth1_corr02.png")
+                    lazy_image("./ressources/Meth1_corr03.png")
             st.write("")
 
             cols_analyse_C5 = st.columns((9,.5,.5))
@@ -544,12 +564,12 @@ if page == sections[1] :
             with cols_analyse_C5[1]:
                 with st.popover("➕"): #Illustration complétion"):
                     st.write("Méthode de complétion par phases successives")
-                    st.image("./ressources/CO2_FillNan01.png")
+                    lazy_image("./ressources/CO2_FillNan01.png")
             with cols_analyse_C5[2]:
                 with st.popover("➕"): #Illustration autres méthodes"):
                     st.write("Comparaison avec autres méthodes")
-                    st.image("./ressources/CO2_FillNan02.png")
-                    st.image("./ressources/CO2_FillNan03.png")
+                    lazy_image("./ressources/CO2_FillNan02.png")
+                    lazy_image("./ressources/CO2_FillNan03.png")
             st.write("")
 
 
@@ -653,31 +673,31 @@ if page == sections[2] :
             st.markdown("""
             <b>Distribution de la variable cible</b>
             """, unsafe_allow_html=True)
-            st.image("./ressources/Distrib_Target.png")
+            lazy_image("./ressources/Distrib_Target.png")
 
             st.markdown("""
             <b>Interactions de la variable cible avec les autres variables</b>
             """, unsafe_allow_html=True)
             with st.popover("➕"): #Interactions"):
-                st.image("./ressources/TargetInteractions.png")
+                lazy_image("./ressources/TargetInteractions.png")
 
             st.markdown("""
             <b>Matrices de corrélation</b>
             """, unsafe_allow_html=True)
             Mat_cols = st.columns(2)
             with Mat_cols[0]:
-                st.image("./ressources/MatCorr01.png")
+                lazy_image("./ressources/MatCorr01.png")
             with Mat_cols[1]:
-                st.image("./ressources/MatCorr02.png")
+                lazy_image("./ressources/MatCorr02.png")
 
             st.markdown("""
             <b>Analyse en composantes principales (ACP)</b>
             """, unsafe_allow_html=True)
             Mat_cols = st.columns(2)
             with Mat_cols[0]:
-                st.image("./ressources/ACP01.png")
+                lazy_image("./ressources/ACP01.png")
             with Mat_cols[1]:
-                st.image("./ressources/ACP02.png")
+                lazy_image("./ressources/ACP02.png")
 
             st.write("")
             
@@ -686,183 +706,262 @@ if page == sections[2] :
 if page == sections[3] :
     with st.container():
         st.header(f"{sections[3]}")
-        st.image("https://www.nasa.gov/wp-content/uploads/2024/06/maytemp-line-big.gif")
+        st.image(assets.resolve("https://www.nasa.gov/wp-content/uploads/2024/06/maytemp-line-big.gif"))
+
+        # Agrégats lus dans le cube précalculé (rechauffement.cube) : chaque filtre est instantané
+        from rechauffement import charts, cube, features
+        st.subheader("Températures par continent et par pays")
+        cube_arrays = cube.load()
+        cube_continents = cube_arrays["continents"].tolist()
+        first_year, last_year = int(cube_arrays["years"][0]), int(cube_arrays["years"][-1])
+        cols_filters = st.columns((3,3,4))
+        with cols_filters[0]:
+            measure = st.radio("Mesure", cube.MEASURES, format_func=charts.MEASURE_LABELS.get, horizontal=True)
+            stat = st.selectbox("Agrégation des pays d'un continent", cube.STATS, format_func=charts.STAT_LABELS.get)
+        with cols_filters[1]:
+            selected_continents = st.multiselect("Continents", cube_continents, default=cube_continents)
+        with cols_filters[2]:
+            years = st.slider("Années", first_year, last_year, (first_year, last_year))
+            # Moyenne de référence lue dans les sommes cumulées du cube : toute période est instantanée
+            reference = st.slider("Période de référence des anomalies", first_year, last_year, features.REFERENCE_PERIOD)
+            reference = None if reference == features.REFERENCE_PERIOD else reference
+        if selected_continents:
+            cols_charts = st.columns(2)
+            with cols_charts[0]:
+                st.plotly_chart(charts.continents_figure(measure, stat, selected_continents, years, reference))
+            with cols_charts[1]:
+                st.plotly_chart(charts.anomaly_figure("weighted" if stat in ("min", "max") else stat,
+                                                      selected_continents, years, reference))
+            available = cube.countries_of(selected_continents)
+            selected_countries = st.multiselect("Pays", available,
+                                                default=[c for c in ("France", "Allemagne", "Espagne", "Italie")
+                                                         if c in available])
+            if selected_countries:
+                st.plotly_chart(charts.countries_figure(selected_countries, measure, years, reference))
+            st.caption(f"Les données commencent en {first_year} : la période préindustrielle 1850-1900 évoquée en introduction "
+                       "n'est pas disponible comme référence.")
+        else:
+            st.info("Sélectionnez au moins un continent.")
 
 # MODELES SUPERVISES
 if page == sections[4] :
+    # scikit-learn et plotly importés seulement sur cette page
+    import plotly.graph_objects as go
+    from rechauffement import supervised
     with st.container():
         st.header(f"{sections[4]}")
 
-        models_list=["Régression linéaire",
-                    "Régression par arbres décisionnels",
-                    "Régression Lasso",
-                    "Régression ElasticNet",]
-
-        st.write("Compte tenu du caractère continu de notre variable cible, les modèles de régression sont les mieux indiqués.")        
-        selected_model = st.selectbox("Sélectionnez un modèle", models_list)
-        if selected_model==models_list[0]:
-            st.subheader("Modèle de régression linéaire")
-            cols_model1 = st.columns((2,2,6))
-            with cols_model1[0]:
-                st.write("La performance du Modèle pour le set de Training")
-                st.write("l'erreur RMSE est ",0.3938966928393961)
-                st.write("l'erreur MAE est ",0.26540326184951857)
-                st.write("le score R2 est ",0.7822704129630749)
-            with cols_model1[1]:
-                st.write("La performance du Modèle pour le set de Test")
-                st.write("l'erreur RMSE est ",0.3792660596186801)
-                st.write("l'erreur MAE est ",0.27306251902447154)
-                st.write("le score R2 est ",0.8396576193597625)
-            with cols_model1[2]:
-                st.image("./ressources/Model01.png")
-        st.write("")
-
-        if selected_model==models_list[1]:
-            st.subheader("Modèle de Regression par arbres décisionnels")
-            cols_model2 = st.columns((4,6))
-            with cols_model2[0]:
-                sub_cols = st.columns(2)
-                with sub_cols[0]:
-                    st.write("La performance du Modèle pour le set de Training")
-                    st.write("l'erreur RMSE est ",3.0084421802235703e-17)
-                    st.write("l'erreur MAE est ",6.412281420128555e-18)
-                    st.write("le score R2 est ",1.0)
-                with sub_cols[1]:
-                    st.write("La performance du Modèle pour le set de Test")
-                    st.write("l'erreur RMSE est ",0.8325213156963459)
-                    st.write("l'erreur MAE est ",0.5818021529324424)
-                    st.write("le score R2 est ",0.22740642527833843)
-                st.subheader("Importance des variables")
-                st.image("./ressources/Model02b.png")
-            with cols_model2[1]:
-                st.image("./ressources/Model02a.png")
-
-
-
-        if selected_model==models_list[2]:
-            st.subheader("Modèle de Regression Lasso")
-            cols_model1 = st.columns((2,2,6))
-            with cols_model1[0]:
-                st.write("La performance du Modèle pour le set de Training")
-                st.write("l'erreur RMSE est ",0.39753930452815345)
-                st.write("l'erreur MAE est ",0.26802089381505256)
-                st.write("le score R2 est ",0.7782248267889735)
-                st.write("Meilleur paramètre alpha sur jeu d'entrainement: {'alpha': ",1e-05,"}")
-            with cols_model1[1]:
-                st.write("La performance du Modèle pour le set de Test")
-                st.write("l'erreur RMSE est ",0.38026193184820367)
-                st.write("l'erreur MAE est ",0.2720336769464201)
-                st.write("le score R2 est ",0.8388144636719062)
-                st.write("Meilleur paramètre alpha sur jeu de test: {'alpha': ",1e-05,"}")
-            with cols_model1[2]:
-                st.image("./ressources/Model03.png")
-            
-
-        if selected_model==models_list[3]:
-            st.subheader("Modèle de Regression ElasticNet")
-            cols_model1 = st.columns((2,2,6))
-            with cols_model1[0]:
-                st.write("La performance du Modèle pour le set de Training")
-                st.write("l'erreur RMSE est ",0.39751820415704603)
-                st.write("l'erreur MAE est ",0.26802950055347224)
-                st.write("le score R2 est ",0.7782483686839001)
-                st.write("Meilleurs paramètres sur jeu d'entrainement: {'alpha': ",1e-05," 'l1_ratio': ",0.1,"}")
-            with cols_model1[1]:
-                st.write("La performance du Modèle pour le set de Test")
-                st.write("l'erreur RMSE est ",0.3802528740381691)
-                st.write("l'erreur MAE est ",0.2721035778453997)
-                st.write("le score R2 est ",0.8388221424346626)
-                st.write("Meilleur paramètre alpha sur jeu de test: {'alpha': ",1e-05," 'l1_ratio': ",1.0,"}")
-            with cols_model1[2]:
-                st.image("./ressources/Model04.png")
+        st.write("Compte tenu du caractère continu de notre variable cible, les modèles de régression sont les mieux indiqués.")
+        selected_model = st.selectbox("Sélectionnez un modèle", list(supervised.MODELS))
+        with st.spinner("Entraînement des modèles (grille d'hyperparamètres par validation croisée)..."):
+            results = supervised.train_all()
+        result = results[selected_model]
+
+        st.subheader(f"Modèle de {selected_model[0].lower()}{selected_model[1:]}")
+        cols_model = st.columns((2,2,6))
+        for col, split, label in ((cols_model[0], "train", "Training"), (cols_model[1], "test", "Test")):
+            with col:
+                st.write(f"La performance du Modèle pour le set de {label}")
+                st.write("l'erreur RMSE est ",result[split]["RMSE"])
+                st.write("l'erreur MAE est ",result[split]["MAE"])
+                st.write("le score R2 est ",result[split]["R2"])
+        with cols_model[0]:
+            if result["best_params"]:
+                st.write("Meilleurs paramètres (validation croisée sur le jeu d'entraînement) :", result["best_params"])
+        with cols_model[2]:
+            predictions = result["predictions"]
+            bounds = [predictions.min().min(), predictions.max().max()]
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(x=predictions["Valeurs réelles"], y=predictions["Prédictions"], mode="markers",
+                                     marker=dict(size=4, opacity=0.5), name="Jeu de test"))
+            fig.add_trace(go.Scatter(x=bounds, y=bounds, mode="lines", line=dict(color="red"), name="Prédiction parfaite"))
+            fig.update_layout(title="Prédictions contre valeurs réelles (jeu de test)",
+                              xaxis_title="YANOT réel (mis à l'échelle)", yaxis_title="YANOT prédit (mis à l'échelle)")
+            st.plotly_chart(fig)
+
+        weights = result["weights"]
+        title = "Importance des variables" if selected_model == "Régression par arbres décisionnels" else "Coefficients des variables"
+        st.subheader(title)
+        st.bar_chart(weights.iloc[::-1], horizontal=True)
+        st.caption(f"Variables : {', '.join(supervised.FEATURES)} ; cible : {supervised.TARGET}. "
+                   f"Entraînement {supervised.FIRST_YEAR}-{supervised.SPLIT_YEAR}, test {supervised.SPLIT_YEAR + 1}-{supervised.LAST_YEAR}.")
 
 
 # SERIES TEMPORELLES
 if page == sections[5] :
-
-    def prediction_temperature(country):
-        # 2. Copier la colonne "YEAR" en "date"
-        dataset['date'] = dataset['YEAR']
-        dataset['YEAR'] = pd.to_datetime(dataset['date'], format='%Y')
-        # 3. Changer son format pour "%Y"
-        dataset['date'] = pd.to_datetime(dataset['date'], format='%Y')
-        # 4. Filtrer pour ne retenir que le pays choisi
-        df_country = dataset[dataset['Name_EN'] == country]
-        # 5. Passer la "date" en index
-        df_country.set_index('date', inplace=True)
-        # 6. Ne garder que quelques colonnes
-        df_country = df_country[['YEAR', 'YAVGT', 'Name_EN']]
-
-        # 7. Modèle SARIMAX
-        model_sarimax = SARIMAX(df_country['YAVGT'], order=(1, 1, 1), seasonal_order=(0, 1, 1, 5))
-        sarimax_fit = model_sarimax.fit(disp=False)
-        sarimax_forecast = sarimax_fit.get_forecast(steps=10)
-        sarimax_pred = sarimax_forecast.predicted_mean
-
-        # 7. Modèle Holt-Winters
-        model_hw = ExponentialSmoothing(df_country['YAVGT'], trend='mul', seasonal='mul', seasonal_periods=5)
-        hw_fit = model_hw.fit()
-        hw_forecast = hw_fit.forecast(steps=10)
-
-        # Créer un graphique interactif avec Plotly
-        fig = go.Figure()
-
-        # Températures réelles
-        fig.add_trace(go.Scatter(x=df_country.index, y=df_country['YAVGT'], mode='lines', name='Températures Réelles', line=dict(color='blue')))
-
-        # Prévisions SARIMAX
-        future_dates = pd.date_range(start=df_country.index[-1] + pd.DateOffset(years=1), periods=10, freq='YE')
-        fig.add_trace(go.Scatter(x=future_dates, y=sarimax_pred, mode='lines', name='Prévisions SARIMAX', line=dict(color='orange')))
-
-        # Prévisions Holt-Winters
-        fig.add_trace(go.Scatter(x=future_dates, y=hw_forecast, mode='lines', name='Prévisions Holt-Winters', line=dict(color='green')))
-
-        # Mise à jour du layout
-        fig.update_layout(title=f'Prévisions de Températures pour {country}',
-                          xaxis_title='Année',
-                          yaxis_title='Température (°C)',
-                          legend=dict(x=0, y=1))
-
-        # Afficher le graphique dans Streamlit
-        st.plotly_chart(fig)
+    # Dépendances lourdes (plotly, statsmodels via rechauffement.forecast) importées seulement sur cette page
+    from rechauffement import backtest, charts, forecast, jobs
+
+    def prediction_temperature(country, futures):
+        # Prévisions calculées en arrière-plan (voir rechauffement.jobs)
+        failed = {model: future.exception() for model, future in futures.items() if future.exception() is not None}
+        for model, error in failed.items():
+            st.warning(f"Le modèle {model} n'a pas pu être ajusté pour {country} : {error}")
+
+        # Figure mémorisée par pays et version des prévisions (voir rechauffement.charts)
+        with timing.span("prediction.results"):
+            predictions = {model: future.result() for model, future in futures.items() if model not in failed}
+        with timing.span("prediction.figure"):
+            fig = charts.forecast_figure(country, predictions)
+
+        # Afficher le graphique dans Streamlit (sérialisation de la figure comprise)
+        with timing.span("prediction.render"):
+            st.plotly_chart(fig)
+        cache_stats = forecast.forecast_cache.stats()
+        st.caption(f"Cache des prévisions : {cache_stats['memory_hits'] + cache_stats['disk_hits']} succès "
+                   f"(mémoire {cache_stats['memory_hits']}, disque {cache_stats['disk_hits']}), "
+                   f"{cache_stats['misses']} échecs")
+
+    # Tant que les ajustements tournent, seul ce fragment est réexécuté (toutes les 0,5 s)
+    @st.fragment(run_every=0.5)
+    def forecast_progress(country):
+        futures = jobs.submit_all(country)
+        done = sum(future.done() for future in futures.values())
+        if done == len(futures):
+            st.rerun()
+        st.progress(done / len(futures), text=f"Ajustement des modèles pour {country}... ({done}/{len(futures)})")
 
     with st.container():
         st.markdown("## Prevision")
         # Sélection du pays à partir de la liste déroulante
         selected_country = st.selectbox('Sélectionnez un pays', countries_list)
         if st.button('Exécuter la prévision'):
-            prediction_temperature(selected_country)
+            st.session_state['forecast_country'] = selected_country
+        if st.session_state.get('forecast_country') == selected_country:
+            futures = jobs.submit_all(selected_country)
+            if all(future.done() for future in futures.values()):
+                prediction_temperature(selected_country, futures)
+            else:
+                forecast_progress(selected_country)
+
+        st.markdown("## Comparaison de pays")
+        compare_all = st.checkbox("Comparer tous les pays")
+        compared = countries_list if compare_all else st.multiselect("Sélectionnez des pays à comparer", countries_list)
+        if compared:
+            st.plotly_chart(charts.comparison_figure(compared))
+            if len(compared) > charts.WEBGL_TRACES:
+                st.caption(f"{len(compared)} pays : rendu WebGL, séries réduites à "
+                           f"{charts.points_per_trace(len(compared))} points chacune (LTTB).")
         #HWMonde = "./ressources/Holt-Winters-MONDE.png"
         #SARIMAXMonde = "./ressources/SARIMAX-MONDE.png"   
 
         st.header(f"{sections[5]}")
         st.markdown("Sélection du modèle et validation par la **RMSE**. D’abord testée sur un pays (la France) puis validées par la moyenne des températures mondiale.")
         st.dataframe(monde.head(5))
-        st.image("./ressources/decomposition.png",
+        st.image(images.resolve("./ressources/decomposition.png"),
                 caption='Les différentes tentatives de décomposition de la série temporelle ont permis de montrer une tendance de type “multiplicative” et une saisonnalité de 5 ans.',)#                use_column_width=True)
         st.markdown("#### Cette approche a été validée par l'autocorrélation.")
-        st.image("./ressources/autocorrélation.png",
+        st.image(images.resolve("./ressources/autocorrélation.png"),
                 caption='L autocorrélation a confirmé nos choix en multiplicatif et en saisonnalité',)#                use_column_width=True)
         st.markdown("#### Deux modèles se sont dégagés par leur performance SARIMAX HoltWinters")
-        st.image("./ressources/RMSE.png",
+        st.image(images.resolve("./ressources/RMSE.png"),
                 caption='Performance des modèles sur les moyennes annuelles modiales ',)#                use_column_width=True)
+        st.markdown("#### Validation glissante sur le monde et sur chaque pays")
+        results = backtest.load_results()
+        if results is None:
+            st.info("Aucun résultat de backtest : lancer `python -m rechauffement.backtest`.")
+        else:
+            table, report = results
+            ranking = backtest.summary(table).drop(columns="model")
+            ranking.columns = ["Configuration", "Séries évaluées", "Rang moyen", "RMSE médiane", "MAE médiane",
+                               "RMSE monde", "Abandons", "Retenue"]
+            st.dataframe(ranking, hide_index=True,
+                         column_config={column: st.column_config.NumberColumn(format="%.1f")
+                                        for column in ("Rang moyen", "RMSE médiane", "MAE médiane", "RMSE monde")})
+            st.caption(f"{report['series']} séries, {report['configs']} configurations, origines "
+                       f"{', '.join(map(str, report['origins']))} et horizon de {report['horizon']} ans ; "
+                       f"erreurs en centièmes de °C. {report['fits']} ajustements en {report['wall_clock']:.0f} s "
+                       f"sur {report['workers']} processus ({report['fits_per_second']:.1f} ajustements/s), "
+                       f"{report['abandoned']} couples série-configuration abandonnés (échec ou ajustement trop lent).")
+            with st.expander("Détail par série"):
+                backtest_series = st.selectbox("Série", list(dict.fromkeys(table["series"])))
+                st.dataframe(table.loc[table["series"] == backtest_series,
+                                       ["label", "origins", "status", "rmse", "mae", "seconds"]],
+                             hide_index=True)
         st.markdown("#### Avantages et inconvénients pour chaque modèle :")
         st.markdown("- Interprétabilité du SARIMAX (nombreuses valeurs d’évaluation dans result.summary\n- Holt-Winters donne plus d’importance aux toutes dernières valeurs observées dans la série temporelle.")
         st.markdown("Le choix est fait de garder l'exécution de ces deux modèles avec un Trend Multiplicatif et une saisonnalité de 5 ans. En assumant que SARIMAX sous-évalue légèrement et que Holt-Winters surévalue légèrement. C'est un peu comme garder un intervale de confiance de 15% entre les deux prévisions ")
         
 
 
-# REMERCIEMENTS
+# SCENARIOS D'EMISSIONS
 if page == sections[6] :
+    # Modèle linéaire précalculé (rechauffement.scenarios) : un curseur ne coûte qu'un produit matriciel
+    from rechauffement import charts, scenarios
     with st.container():
         st.header(f"{sections[6]}")
+        st.write("Que serait devenue l'anomalie de température si les émissions avaient suivi une autre trajectoire ? "
+                 "Les curseurs modifient progressivement les émissions à partir de l'année de départ ; "
+                 "les anomalies sont recalculées par un modèle linéaire ajusté sur "
+                 f"{scenarios.FIRST_YEAR}-{scenarios.LAST_YEAR}.")
+        scenario_model = scenarios.model()
+        cols_scope = st.columns((2,5,3))
+        with cols_scope[0]:
+            scope = st.radio("Périmètre", ["Monde", "Continents", "Pays"])
+        with cols_scope[1]:
+            if scope == "Continents":
+                scenario_continents = sorted(set(scenario_model["continents"]))
+                chosen = st.multiselect("Continents", scenario_continents, default=["Europe"])
+                scenario_countries = scenarios.countries_of(chosen)
+                scenario_title = ", ".join(chosen)
+            elif scope == "Pays":
+                scenario_countries = st.multiselect("Pays", scenario_model["countries"].tolist(), default=["France"])
+                scenario_title = ", ".join(scenario_countries[:5]) + ("..." if len(scenario_countries) > 5 else "")
+            else:
+                scenario_countries = None
+                scenario_title = "Monde"
+        with cols_scope[2]:
+            start_year = st.slider("Année de départ", scenarios.FIRST_YEAR, scenarios.LAST_YEAR - 1, 2000)
+        driver_labels = {"co2": "Émissions de CO2", "methane": "Émissions de méthane",
+                         "total_ghg": "Émissions de gaz à effet de serre (total)", "AtmCO2": "CO2 atmosphérique"}
+        cols_sliders = st.columns(len(scenarios.DRIVERS))
+        factors = {}
+        for col, driver in zip(cols_sliders, scenarios.DRIVERS):
+            with col:
+                factors[driver] = 1 + st.slider(f"{driver_labels[driver]} (%)", -100, 100, 0, step=5, key=f"scenario_{driver}") / 100
+        st.caption("Le total des gaz à effet de serre comprend déjà le CO2 et le méthane : modifier l'un ou les autres. "
+                   "Les émissions modifiées changent aussi le CO2 atmosphérique, donc tous les pays.")
+
+        if scenario_countries == []:
+            st.info("Sélectionnez au moins un continent ou un pays.")
+        else:
+            scenario_span = timing.span("scenario.simulate").start()
+            baseline, scenario = scenarios.simulate(factors, scenario_countries, start_year)
+            baseline_series = scenarios.region_frame(baseline, scenario_countries)
+            scenario_series = scenarios.region_frame(scenario, scenario_countries)
+            elapsed = scenario_span.stop()
+            delta = (scenario_series - baseline_series) / 100
+            cols_metrics = st.columns(3)
+            cols_metrics[0].metric(f"Anomalie {scenarios.LAST_YEAR} (modèle)", f"{baseline_series.iloc[-1] / 100:+.2f} °C")
+            cols_metrics[1].metric(f"Anomalie {scenarios.LAST_YEAR} (scénario)", f"{scenario_series.iloc[-1] / 100:+.2f} °C",
+                                   f"{delta.iloc[-1]:+.3f} °C", delta_color="inverse")
+            cols_metrics[2].metric(f"Écart moyen {start_year}-{scenarios.LAST_YEAR}",
+                                   f"{delta.loc[start_year:].mean():+.3f} °C")
+            observed_series = scenarios.region_frame(scenario_model["observed"], scenario_countries)
+            st.plotly_chart(charts.scenario_figure(baseline_series, scenario_series, observed_series, scenario_title))
+            st.subheader(f"Pays les plus touchés en {scenarios.LAST_YEAR}")
+            affected = pd.DataFrame({"Pays": scenario_model["countries"], "Continent": scenario_model["continents"],
+                                     "Modèle (°C)": baseline[:, -1] / 100, "Scénario (°C)": scenario[:, -1] / 100})
+            affected["Écart (°C)"] = affected["Scénario (°C)"] - affected["Modèle (°C)"]
+            affected = affected.dropna().reindex(affected["Écart (°C)"].abs().sort_values(ascending=False).index).head(10)
+            st.dataframe(affected, hide_index=True,
+                         column_config={column: st.column_config.NumberColumn(format="%+.3f")
+                                        for column in ("Modèle (°C)", "Scénario (°C)", "Écart (°C)")})
+            st.caption(f"Calcul du scénario : {elapsed * 1000:.1f} ms. Erreur du modèle sur les années observées "
+                       f"(RMSE) : {scenario_model['rmse'] / 100:.2f} °C. Modèle de corrélation, pas de simulation "
+                       "physique du climat : les écarts indiquent un ordre de grandeur.")
+
+# REMERCIEMENTS
+if page == sections[7] :
+    with st.container():
+        st.header(f"{sections[7]}")
         st.subheader("Les auteurs")
         # Les auteurs
         cols = st.columns(2)
         with cols[0]:
             sub_cols=st.columns((1,3))
             with sub_cols[0]:
-                st.image("./ressources/Sebastien.jpg")#, width=200)
+                st.image(images.resolve("./ressources/Sebastien.jpg", 320))#, width=200)
             with sub_cols[1]:
                 st.subheader("Sébastien LAGARDE-CORRADO")
                 st.caption("Chargé d’études RH - CHU de Bordeaux")
@@ -875,7 +974,7 @@ if page == sections[6] :
         with cols[1]:
             sub_cols=st.columns((1,3))
             with sub_cols[0]:
-                st.image("./ressources/Damien.png")
+                st.image(images.resolve("./ressources/Damien.png", 320))
             with sub_cols[1]:
                 st.subheader("Damien SELOSSE")
                 st.caption("Direction de projet innovation - 109 l’innovation dans les veines")
@@ -887,3 +986,20 @@ if page == sections[6] :
     st.markdown("Nous vous remerçions pour toute l'aide que vous nous avez apportée durant notre formation, et en particulier **Yohan Cohen** notre tuteur.")
     st.markdown("Nous avons également une pensée particulière pour **Jérémy Bazille** (CHU d'Amiens) qui a été à nos côtés au démarrage du projet ; son évolution professionnelle ne lui ayant pas permis de le poursuivre et le finaliser avec nous.")
     st.divider()
+
+
+# CHRONOMÉTRAGE
+page_span.stop()
+run_timing = timing.end_run()
+if debug_overlay is not None:
+    with debug_overlay.container(border=True):
+        st.markdown("**⏱️ Temps d'exécution**")
+        st.caption(f"Dernière exécution : {run_timing['seconds'] * 1000:.0f} ms")
+        timing_columns = {"section": "Section", "ms": st.column_config.NumberColumn("ms", format="%.1f"),
+                          "part": st.column_config.ProgressColumn("Part", min_value=0, max_value=1, format="percent")}
+        st.dataframe(pd.DataFrame(timing.breakdown(run_timing)), hide_index=True, column_config=timing_columns)
+        background = timing.recent()
+        if background:
+            st.caption("Derniers calculs en arrière-plan (prévisions)")
+            st.dataframe(pd.DataFrame(timing.breakdown({"spans": background})).drop(columns="part"),
+                         hide_index=True, column_config=timing_columns)
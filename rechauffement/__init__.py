@@ -0,0 +1 @@
+"""Code métier de l'application Rechauffement-planete (données, modèles)."""
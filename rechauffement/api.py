@@ -0,0 +1,162 @@
+"""API HTTP/JSON locale des prévisions de températures.
+
+Les réponses viennent du cache des prévisions ou des résultats pré-calculés
+par rechauffement.batch ; un pays absent des deux est ajusté à la demande
+(puis mis en cache).
+
+    python -m rechauffement.api [--host 127.0.0.1] [--port 8000]
+
+Points d'accès :
+    GET  /countries
+    GET  /forecast?country=France&steps=10[&model=sarimax]
+    GET  /forecast?country=France&country=Spain       (plusieurs pays)
+    POST /forecast  {"countries": ["France", "Spain"], "steps": 10, "models": ["sarimax"]}
+"""
+import argparse
+import json
+import math
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from rechauffement import data, forecast
+
+MAX_STEPS = 50
+
+
+class RequestError(ValueError):
+    """Requête invalide, renvoyée au client avec le statut 400."""
+
+
+def _records(prediction):
+    return [{"date": date.strftime("%Y-%m-%d"),
+             **{column: None if math.isnan(value) else value for column, value in row.items()}}
+            for date, row in zip(prediction.index, prediction.to_dict("records"))]
+
+
+def _strings(values, name):
+    """values si c'est une liste de chaînes (None : liste vide), RequestError sinon."""
+    if values is None:
+        return []
+    if not isinstance(values, (list, tuple)) or not all(isinstance(value, str) for value in values):
+        raise RequestError(f"{name} doit être une liste de chaînes")
+    return list(values)
+
+
+def forecast_payload(countries, steps=forecast.FORECAST_STEPS, models=None):
+    """Corps de réponse JSON des prévisions de countries pour models (tous par défaut)."""
+    countries = _strings(countries, "countries")
+    models = _strings(models, "models") or list(forecast.MODELS)
+    unknown = [model for model in models if model not in forecast.MODELS]
+    if unknown:
+        raise RequestError(f"modèle(s) inconnu(s) : {', '.join(unknown)}")
+    if not 1 <= steps <= MAX_STEPS:
+        raise RequestError(f"steps doit être compris entre 1 et {MAX_STEPS}")
+    series = data.country_series()
+    unknown = [country for country in countries if country not in series]
+    if unknown:
+        raise RequestError(f"pays inconnu(s) : {', '.join(unknown)}")
+    if not countries:
+        raise RequestError("au moins un pays est requis (paramètre country)")
+
+    results = {}
+    for country in countries:
+        forecasts, errors = {}, {}
+        for model in models:
+            try:
+                forecasts[model] = _records(forecast.forecast(country, model, steps))
+            except Exception as exc:  # un ajustement impossible n'invalide pas la requête
+                errors[model] = f"{type(exc).__name__}: {exc}"
+        results[country] = {"forecasts": forecasts, "errors": errors}
+    return {"steps": steps, "models": models, "results": results}
+
+
+def _int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RequestError(f"{name} doit être un entier") from None
+
+
+class ForecastHandler(BaseHTTPRequestHandler):
+    server_version = "RechauffementAPI/1.0"
+    quiet = False
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, build):
+        try:
+            self._send(HTTPStatus.OK, build())
+        except RequestError as exc:
+            self._send(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+        except Exception as exc:  # toujours une réponse JSON, jamais une connexion coupée
+            self.log_error("erreur interne : %r", exc)
+            self._send(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"erreur interne : {type(exc).__name__}"})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/countries":
+            self._dispatch(lambda: {"countries": list(data.countries_list())})
+        elif url.path == "/forecast":
+            self._dispatch(lambda: forecast_payload(
+                query.get("country", []),
+                _int(query.get("steps", [forecast.FORECAST_STEPS])[0], "steps"),
+                query.get("model")))
+        else:
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"chemin inconnu : {url.path}"})
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/forecast":
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"chemin inconnu : {self.path}"})
+            return
+
+        def build():
+            length = _int(self.headers.get("Content-Length", 0), "Content-Length")
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError as exc:
+                raise RequestError(f"JSON invalide : {exc}") from None
+            if not isinstance(body, dict):
+                raise RequestError("le corps doit être un objet JSON")
+            return forecast_payload(body.get("countries", []),
+                                    _int(body.get("steps", forecast.FORECAST_STEPS), "steps"),
+                                    body.get("models"))
+
+        self._dispatch(build)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(host="127.0.0.1", port=8000, quiet=False):
+    """Serveur HTTP multi-thread prêt à servir (serve_forever)."""
+    handler = type("Handler", (ForecastHandler,), {"quiet": quiet})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sert les prévisions de températures en HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--quiet", action="store_true", help="ne pas journaliser chaque requête")
+    args = parser.parse_args(argv)
+    server = make_server(args.host, args.port, args.quiet)
+    print(f"API des prévisions sur http://{args.host}:{server.server_port}/forecast?country=France")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
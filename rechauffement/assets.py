@@ -0,0 +1,155 @@
+"""Cache local des images et vidéos distantes affichées par l'application.
+
+Les médias (cartes et graphiques NASA/GISS, logos, illustrations) sont
+téléchargés une fois, en parallèle, lors de la construction de
+l'environnement :
+
+    python -m rechauffement.assets [--force]
+
+Chaque fichier est rangé sous le nom de l'empreinte SHA-256 de son contenu
+dans ressources/cache/assets/ ; index.json associe chaque URL à son fichier.
+resolve(url) renvoie le chemin local quand il existe : Streamlit sert alors
+le fichier depuis le même serveur, à une URL /media/ dérivée du contenu. En
+l'absence de copie locale (hors ligne, téléchargement en échec), l'URL
+d'origine est renvoyée telle quelle.
+"""
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+from rechauffement import data
+
+ASSETS_DIR = os.path.join(data.CACHE_DIR, "assets")
+INDEX_PATH = os.path.join(ASSETS_DIR, "index.json")
+TIMEOUT = 30
+WORKERS = 8
+USER_AGENT = "Mozilla/5.0 (compatible; Rechauffement-planete)"
+
+URLS = [
+    "https://data.giss.nasa.gov/tmp/gistemp/NMAPS/"
+    "tmp_GHCNv4_ERSSTv5_1200km_Anom_7_2024_2024_1951_1980_100_180_90_0_2_/amaps.png",
+    "https://data.giss.nasa.gov/gistemp/animations/TEMPANOMALY_05_2023_pdiff.mp4",
+    "https://data.giss.nasa.gov/gistemp/station_data_v4_globe/station_record_length.png",
+    "https://data.giss.nasa.gov/gistemp/station_data_v4_globe/number_of_stations.png",
+    "https://data.giss.nasa.gov/gistemp/station_data_v4_globe/coverage.png",
+    "https://data.giss.nasa.gov/gistemp/faq/merra2_seas_anom.png",
+    "https://www.nasa.gov/wp-content/uploads/2024/06/maytemp-line-big.gif",
+    "https://datascientest.com/wp-content/uploads/2022/03/logo-2021.png",
+    "https://media.set.or.th/set/Images/2024/Jun/thailand-focus-2024-img-04.jpg",
+    "https://media.licdn.com/dms/image/v2/D4E0BAQFkiMXPKAXo0Q/company-logo_100_100/company-logo_100_100/0/"
+    "1719404287274/linkedin_social_selling_logo?e=1733961600&v=beta&t=u98lpxNPMVejUKouuUlO1CPO1j892JKpjWYG7F4dVhw",
+]
+
+
+def _read_index():
+    with open(INDEX_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def index():
+    """URL -> entrée du cache ({"file", "sha256", "content_type", "size", "fetched"})."""
+    try:
+        return data.cached(("assets", INDEX_PATH), INDEX_PATH, _read_index)
+    except (OSError, ValueError):
+        return {}
+
+
+def resolve(url):
+    """Chemin local de url si elle est en cache, sinon url elle-même."""
+    entry = index().get(url)
+    if entry is not None:
+        path = os.path.join(ASSETS_DIR, entry["file"])
+        if os.path.exists(path):
+            return path
+    return url
+
+
+def _extension(url, content_type):
+    extension = os.path.splitext(urlsplit(url).path)[1].lower()
+    if not extension and content_type:
+        extension = mimetypes.guess_extension(content_type.split(";")[0].strip()) or ""
+    return extension
+
+
+def fetch(url):
+    """Télécharge url dans le cache ; renvoie son entrée d'index."""
+    request = Request(url, headers={"User-Agent": USER_AGENT})
+    digest = hashlib.sha256()
+    os.makedirs(ASSETS_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=ASSETS_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f, urlopen(request, timeout=TIMEOUT) as response:
+            content_type = response.headers.get_content_type()
+            for block in iter(lambda: response.read(1 << 16), b""):
+                digest.update(block)
+                f.write(block)
+            size = f.tell()
+        name = digest.hexdigest() + _extension(url, content_type)
+        os.replace(tmp_path, os.path.join(ASSETS_DIR, name))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return {"file": name, "sha256": digest.hexdigest(), "content_type": content_type,
+            "size": size, "fetched": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+
+
+def _write_index(entries):
+    os.makedirs(ASSETS_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=ASSETS_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, INDEX_PATH)
+
+
+def prefetch(urls=URLS, force=False, workers=WORKERS):
+    """Télécharge en parallèle les URLs absentes du cache ; renvoie {url: erreur} des échecs.
+
+    Une URL en échec conserve sa copie précédente éventuelle.
+    """
+    entries = dict(index())
+    missing = [url for url in dict.fromkeys(urls)
+               if force or url not in entries or not os.path.exists(os.path.join(ASSETS_DIR, entries[url]["file"]))]
+    errors = {}
+
+    def attempt(url):
+        try:
+            return url, fetch(url), None
+        except (OSError, ValueError) as exc:  # URLError, HTTPError et délais dépassés sont des OSError
+            return url, None, exc
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for url, entry, error in pool.map(attempt, missing):
+            if error is None:
+                entries[url] = entry
+            else:
+                errors[url] = error
+    if missing:
+        _write_index(entries)
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Télécharge les médias distants dans le cache local.")
+    parser.add_argument("--force", action="store_true", help="retélécharge même les médias déjà en cache")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="téléchargements simultanés")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    errors = prefetch(force=args.force, workers=args.workers)
+    entries = index()
+    cached = [url for url in URLS if url in entries]
+    print(f"{len(cached)}/{len(URLS)} médias en cache ({sum(entries[url]['size'] for url in cached) / 1e6:.1f} Mo) "
+          f"en {time.perf_counter() - start:.1f} s : {ASSETS_DIR}")
+    for url, error in errors.items():
+        print(f"  échec {url} : {error}")
+    # Hors ligne, l'application reste utilisable avec les URLs d'origine : pas de code d'erreur
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Validation glissante (rolling origin) des modèles de séries temporelles.
+
+Chaque configuration de la grille (ordres SARIMAX, périodes saisonnières,
+modes de tendance et de saisonnalité Holt-Winters) est ajustée sur la série
+mondiale et sur chaque pays, pour plusieurs origines : les données jusqu'à
+l'année d'origine servent à l'ajustement, les HORIZON années suivantes à
+l'évaluation (RMSE et MAE sur l'ensemble des origines).
+
+Les couples (série, configuration) sont répartis sur un pool de processus.
+Une configuration est abandonnée pour une série dès qu'un ajustement échoue
+(par exemple Holt-Winters multiplicatif sur des températures négatives),
+produit une prévision non finie ou dépasse MAX_SECONDS : les origines
+restantes ne sont pas ajustées. La limite est appliquée pendant
+l'ajustement (minuterie SIGALRM dans le processus de calcul, qui
+l'interrompt) ; sans minuterie (Windows, thread secondaire), elle n'est
+vérifiée qu'une fois l'ajustement terminé. Le tableau des résultats est écrit dans
+ressources/cache/backtest.feather, lu par la page « Modèles séries
+temporelles », avec le débit obtenu (ajustements par seconde) :
+
+    python -m rechauffement.backtest [--workers N] [--country France] [--origins 2004 2008 2012]
+"""
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from rechauffement import data, forecast, world
+
+RESULTS_PATH = os.path.join(data.CACHE_DIR, "backtest.feather")
+REPORT_PATH = os.path.join(data.CACHE_DIR, "backtest.json")
+WORLD = "Monde"
+
+ORIGINS = (2004, 2008, 2012)
+HORIZON = 10
+ORDERS = ((1, 1, 1), (0, 1, 1))
+SEASONAL_PERIODS = (3, 5, 7, 11)
+HW_MODES = (("add", "add"), ("add", "mul"), ("mul", "add"), ("mul", "mul"))
+# Durée au-delà de laquelle un ajustement est jugé trop lent (secondes)
+MAX_SECONDS = 2.0
+SARIMAX_MAXITER = 50
+
+
+def grid(orders=ORDERS, periods=SEASONAL_PERIODS, modes=HW_MODES):
+    """Configurations évaluées : (modèle, paramètres au format de forecast.MODELS)."""
+    configs = [("sarimax", {"order": order, "seasonal_order": (0, 1, 1, period)})
+               for order in orders for period in periods]
+    configs += [("holt_winters", {"trend": trend, "seasonal": seasonal, "seasonal_periods": period})
+                for trend, seasonal in modes for period in periods]
+    return configs
+
+
+def label(model, params):
+    """Libellé lisible d'une configuration."""
+    if model == "sarimax":
+        order, seasonal = params["order"], params["seasonal_order"]
+        return f"SARIMAX{tuple(order)}{tuple(seasonal)}".replace(" ", "")
+    return f"Holt-Winters {params['trend']}/{params['seasonal']} s={params['seasonal_periods']}"
+
+
+def series_set(countries=None):
+    """Série mondiale et séries des pays (tous par défaut), indexées par date."""
+    monde = world.monde()
+    series = {WORLD: pd.Series(monde["YAVGT_World"].to_numpy(), index=pd.to_datetime(monde.index), name="YAVGT")}
+    country_series = data.country_series()
+    for country in (country_series if countries is None else countries):
+        series[country] = country_series[country]
+    return series
+
+
+class FitTimeout(BaseException):
+    """Ajustement interrompu par la minuterie (BaseException : ne pas être absorbé par statsmodels)."""
+
+
+@contextmanager
+def _time_limit(seconds):
+    """Interrompt le bloc par FitTimeout au bout de seconds (si SIGALRM est utilisable ici)."""
+    if not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def expire(signum, frame):
+        raise FitTimeout
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _estimator(model):
+    """Classe statsmodels de model (importée hors de la minuterie : un import interrompu laisserait un module incomplet)."""
+    if model == "sarimax":
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+        return SARIMAX
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    return ExponentialSmoothing
+
+
+def _forecast_mean(model, values, steps, params):
+    estimator = _estimator(model)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if model == "sarimax":
+            return estimator(values, **params).fit(disp=False, maxiter=SARIMAX_MAXITER).forecast(steps)
+        return estimator(values, **params).fit().forecast(steps)
+
+
+def evaluate(name, values, years, model, params, origins=ORIGINS, horizon=HORIZON, max_seconds=MAX_SECONDS):
+    """Backtest d'une configuration sur une série ; renvoie la ligne de résultats."""
+    errors, status, fits = [], "ok", 0
+    start = time.perf_counter()
+    _estimator(model)
+    for origin in origins:
+        train, test = values[years <= origin], values[years > origin][:horizon]
+        if len(test) == 0:
+            continue
+        fit_start = time.perf_counter()
+        try:
+            with _time_limit(max_seconds):
+                mean = np.asarray(_forecast_mean(model, train, len(test), params))
+        except FitTimeout:
+            status = "abandon (ajustement lent)"
+            break
+        except Exception as exc:  # configuration inadaptée à la série : abandon
+            status = f"échec ({type(exc).__name__})"
+            break
+        fits += 1
+        if not np.isfinite(mean).all():
+            status = "échec (prévision non finie)"
+            break
+        errors.append(mean - test)
+        # Sans minuterie, la limite n'est vérifiée qu'après l'ajustement
+        if time.perf_counter() - fit_start > max_seconds:
+            status = "abandon (ajustement lent)"
+            break
+    complete = status == "ok" and len(errors) > 0
+    residuals = np.concatenate(errors) if complete else np.array([np.nan])
+    return {"series": name, "model": model, "label": label(model, params), "params": json.dumps(params),
+            "origins": len(errors), "fits": fits, "status": status,
+            "rmse": float(np.sqrt(np.mean(residuals ** 2))), "mae": float(np.mean(np.abs(residuals))),
+            "seconds": time.perf_counter() - start}
+
+
+def run(countries=None, configs=None, origins=ORIGINS, horizon=HORIZON, workers=None,
+        max_seconds=MAX_SECONDS, output=RESULTS_PATH, report_path=REPORT_PATH):
+    """Évalue la grille sur toutes les séries en parallèle ; écrit output et renvoie le rapport."""
+    configs = grid() if configs is None else configs
+    series = series_set(countries)
+    rows = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(evaluate, name, values.to_numpy(dtype="float64"), values.index.year.to_numpy(),
+                               model, params, tuple(origins), horizon, max_seconds)
+                   for name, values in series.items() for model, params in configs]
+        for future in as_completed(futures):
+            rows.append(future.result())
+    wall_clock = time.perf_counter() - start
+
+    table = pd.DataFrame(rows).sort_values(["series", "rmse"], ignore_index=True)
+    fits = int(table["fits"].sum())
+    report = {"series": len(series), "configs": len(configs), "origins": list(origins), "horizon": horizon,
+              "workers": workers or os.cpu_count(), "fits": fits, "wall_clock": wall_clock,
+              "fits_per_second": fits / wall_clock, "abandoned": int((table["status"] != "ok").sum()),
+              "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    table.to_feather(tmp_path)
+    os.replace(tmp_path, output)
+    tmp_path = f"{report_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, report_path)
+    return table, report
+
+
+def _read_results(path, report_path):
+    with open(report_path, encoding="utf-8") as f:
+        return pd.read_feather(path), json.load(f)
+
+
+def load_results(path=RESULTS_PATH, report_path=REPORT_PATH):
+    """(tableau des résultats, rapport) du dernier backtest, ou None s'il n'a pas été lancé."""
+    if not (os.path.exists(path) and os.path.exists(report_path)):
+        return None
+    return data.cached(("backtest", path), path, lambda: _read_results(path, report_path))
+
+
+def summary(table):
+    """Classement des configurations : rang moyen par série, RMSE médiane et RMSE sur la série mondiale."""
+    complete = table[table["status"] == "ok"]
+    ranked = complete.assign(rank=complete.groupby("series")["rmse"].rank())
+    result = ranked.groupby(["model", "label"]).agg(series=("series", "size"), rank=("rank", "mean"),
+                                                    rmse_median=("rmse", "median"), mae_median=("mae", "median"))
+    world_rmse = complete[complete["series"] == WORLD].set_index(["model", "label"])["rmse"]
+    result["rmse_world"] = world_rmse.reindex(result.index)
+    result["abandoned"] = table[table["status"] != "ok"].groupby(["model", "label"]).size().reindex(
+        result.index, fill_value=0)
+    retained = {label(model, params) for model, params in forecast.MODELS.items()}
+    result["retained"] = result.index.get_level_values("label").isin(retained)
+    return result.sort_values("rank").reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest glissant des configurations SARIMAX et Holt-Winters.")
+    parser.add_argument("--workers", type=int, default=None, help="nombre de processus (défaut : tous les cœurs)")
+    parser.add_argument("--country", action="append", help="limiter aux pays donnés, en plus du monde (répétable)")
+    parser.add_argument("--origins", type=int, nargs="+", default=list(ORIGINS), help="dernières années d'ajustement")
+    parser.add_argument("--horizon", type=int, default=HORIZON, help="années évaluées après chaque origine")
+    parser.add_argument("--periods", type=int, nargs="+", default=list(SEASONAL_PERIODS),
+                        help="périodes saisonnières évaluées")
+    parser.add_argument("--max-seconds", type=float, default=MAX_SECONDS, help="durée maximale d'un ajustement")
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.country or ()) - set(data.countries_list()))
+    if unknown:
+        parser.error(f"pays inconnus : {', '.join(unknown)}")
+    table, report = run(args.country, grid(periods=args.periods), args.origins, args.horizon, args.workers,
+                        args.max_seconds)
+    print(f"{report['series']} séries x {report['configs']} configurations, origines {report['origins']}, "
+          f"horizon {report['horizon']} ans")
+    print(f"{report['fits']} ajustements en {report['wall_clock']:.1f} s ({report['workers']} processus) : "
+          f"{report['fits_per_second']:.1f} ajustements/s ; {report['abandoned']} couples abandonnés")
+    print(summary(table).head(10).to_string(index=False, float_format="{:.1f}".format))
+    print(f"écrit : {RESULTS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Calcul par lots des prévisions SARIMAX et Holt-Winters de tous les pays.
+
+Les ajustements sont répartis sur un pool de processus (un pays par tâche).
+Les pays dont un ajustement échoue (par exemple Holt-Winters multiplicatif
+sur une série contenant des températures négatives) sont ignorés pour ce
+modèle. Le résultat est un unique fichier Feather que la page de prévision
+consulte par clé de cache :
+
+    python -m rechauffement.batch [--workers N] [--steps 10]
+"""
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from rechauffement import data, forecast
+
+COLUMNS = ["key", "country", "model", "date", "mean", "lower", "upper"]
+
+
+def fit_country(country, series, steps):
+    """Ajuste tous les modèles pour un pays ; renvoie (lignes, durées, erreurs)."""
+    rows, timings, errors = [], {}, {}
+    for model, params in forecast.MODELS.items():
+        start = time.perf_counter()
+        try:
+            prediction = forecast.warm_forecast(country, series, model, steps, params)
+        except Exception as exc:  # un pays en échec ne doit pas arrêter le lot
+            errors[model] = f"{type(exc).__name__}: {exc}"
+            continue
+        finally:
+            timings[model] = time.perf_counter() - start
+        prediction = prediction.rename_axis("date").reset_index()
+        prediction.insert(0, "key", forecast.forecast_key(country, model, series, steps, params))
+        prediction.insert(1, "country", country)
+        prediction.insert(2, "model", model)
+        rows.append(prediction)
+    return rows, timings, errors
+
+
+def run(countries=None, steps=forecast.FORECAST_STEPS, workers=None, output=forecast.PRECOMPUTED_PATH):
+    """Calcule les prévisions de countries (tous les pays par défaut) et écrit output."""
+    series = data.country_series()
+    countries = list(series) if countries is None else list(countries)
+    frames, timings, errors = [], {}, {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(fit_country, country, series[country], steps): country for country in countries}
+        for future in as_completed(futures):
+            country = futures[future]
+            rows, timings[country], country_errors = future.result()
+            frames.extend(rows)
+            if country_errors:
+                errors[country] = country_errors
+    wall_clock = time.perf_counter() - start
+
+    # Tous les ajustements en échec : tableau vide, les erreurs restent dans le rapport
+    table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    table.to_feather(tmp_path)
+    os.replace(tmp_path, output)
+    return {"wall_clock": wall_clock, "timings": timings, "errors": errors, "rows": len(table)}
+
+
+def print_report(report, slowest=5):
+    timings = report["timings"]
+    per_country = {country: sum(models.values()) for country, models in timings.items()}
+    print(f"{len(timings)} pays, {report['rows']} lignes de prévision écrites")
+    for model in forecast.MODELS:
+        durations = [models[model] for models in timings.values() if model in models]
+        if not durations:
+            continue
+        print(f"  {model:<13} médiane {statistics.median(durations):.3f} s, "
+              f"max {max(durations):.3f} s, cumul {sum(durations):.1f} s")
+    print("Pays les plus longs :")
+    for country in sorted(per_country, key=per_country.get, reverse=True)[:slowest]:
+        detail = ", ".join(f"{model} {seconds:.3f} s" for model, seconds in timings[country].items())
+        print(f"  {country:<30} {detail}")
+    if report["errors"]:
+        print(f"Ajustements en échec ({len(report['errors'])} pays) :")
+        for country, country_errors in sorted(report["errors"].items()):
+            for model, message in country_errors.items():
+                print(f"  {country:<30} {model:<13} {message}")
+    cpu_time = sum(per_country.values())
+    print(f"Durée totale : {report['wall_clock']:.1f} s (temps d'ajustement cumulé {cpu_time:.1f} s, "
+          f"accélération x{cpu_time / report['wall_clock']:.1f})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pré-calcule les prévisions de tous les pays.")
+    parser.add_argument("--workers", type=int, default=None, help="nombre de processus (défaut : tous les cœurs)")
+    parser.add_argument("--steps", type=int, default=forecast.FORECAST_STEPS, help="horizon de prévision en années")
+    parser.add_argument("--country", action="append", help="limiter le calcul à ce pays (répétable)")
+    parser.add_argument("--output", default=forecast.PRECOMPUTED_PATH, help="fichier Feather produit")
+    args = parser.parse_args(argv)
+    report = run(args.country, args.steps, args.workers, args.output)
+    print_report(report)
+    print(f"écrit : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
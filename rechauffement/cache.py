@@ -0,0 +1,145 @@
+"""Cache des prévisions à deux niveaux : LRU en mémoire puis fichiers sur disque.
+
+Le niveau mémoire est partagé par les sessions Streamlit du processus ; le
+niveau disque survit aux redémarrages. Les clés sont des empreintes SHA-1
+calculées par make_key à partir de tout ce qui détermine le résultat (pays,
+modèle, paramètres, données).
+
+Une clé périmée (données modifiées) n'est plus jamais lue mais reste sur
+disque : le niveau disque est donc plafonné à max_disk_bytes. Toutes les
+PRUNE_EVERY écritures, les fichiers les moins récemment utilisés (date de
+modification, rafraîchie à chaque lecture) sont supprimés jusqu'à repasser
+sous le plafond.
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+PRUNE_EVERY = 64
+
+
+def make_key(*parts):
+    """Empreinte stable d'éléments sérialisables en JSON (tuples compris)."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class ForecastCache:
+    """Cache clé -> valeur picklable, avec compteurs de succès et d'échecs."""
+
+    def __init__(self, directory, maxsize=256, max_disk_bytes=64 << 20):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # Élagage dès la première écriture du processus, puis toutes les PRUNE_EVERY
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pkl")
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def get(self, key, default=None, record_miss=True):
+        """Valeur associée à key (mémoire, puis disque), ou default.
+
+        record_miss=False ne compte pas l'échec, pour une consultation suivie
+        d'un calcul qui consultera lui-même le cache.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)  # fichier récemment utilisé : dernier à être élagué
+        except (OSError, pickle.UnpicklingError, EOFError):
+            if record_miss:
+                with self._lock:
+                    self.misses += 1
+            return default
+        with self._lock:
+            self.disk_hits += 1
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        """Enregistre value en mémoire et, si possible, sur disque."""
+        self._remember(key, value)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            return  # disque plein ou en lecture seule : le niveau mémoire suffit
+        with self._lock:
+            prune = self._writes % PRUNE_EVERY == 0
+            self._writes += 1
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Supprime les fichiers les moins récemment utilisés au-delà de max_disk_bytes.
+
+        Renvoie le nombre de fichiers supprimés.
+        """
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".pkl"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # supprimé entre-temps par un autre processus
+                files.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def get_or_compute(self, key, compute):
+        """Valeur en cache pour key, sinon compute() enregistré puis renvoyé."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        """Compteurs de succès (mémoire, disque), d'échecs et taille du niveau mémoire."""
+        with self._lock:
+            return {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits,
+                    "misses": self.misses, "size": len(self._memory)}
@@ -0,0 +1,196 @@
+"""Figures Plotly de l'application.
+
+Les figures sont construites une fois par version de leurs données et
+conservées sous forme JSON dans un ForecastCache (mémoire puis disque plafonné) :
+  - prévisions d'un pays : clé = pays + clés des prévisions affichées
+    (forecast.forecast_key, qui dépend des données et des paramètres) ;
+  - comparaison de pays : clé = pays + empreinte du dataset.
+
+Reconstruire une go.Figure depuis le JSON sans revalidation coûte environ
+1 ms, contre une dizaine pour la construction trace par trace.
+
+En mode comparaison, au-delà de WEBGL_TRACES pays les traces passent en
+Scattergl (rendu WebGL) et chaque série est réduite par LTTB (Largest
+Triangle Three Buckets) à MAX_POINTS / nombre de pays points (au moins
+MIN_POINTS).
+
+Les figures par continent, par pays et des anomalies annuelles sont lues
+dans le cube d'agrégation (rechauffement.cube) : assez rapides pour être
+reconstruites à chaque changement de filtre, elles ne sont pas mémorisées,
+pas plus que celle des scénarios d'émissions (rechauffement.scenarios).
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from rechauffement import cube, data, features, forecast
+from rechauffement.cache import ForecastCache, make_key
+
+# À incrémenter quand la construction des figures change (invalide le cache disque)
+FIGURE_VERSION = 2
+MAX_POINTS = 4000
+MIN_POINTS = 24
+WEBGL_TRACES = 10
+
+figure_cache = ForecastCache(os.path.join(data.CACHE_DIR, "figures"))
+
+MODEL_TRACES = {"sarimax": ("Prévisions SARIMAX", "orange"),
+                "holt_winters": ("Prévisions Holt-Winters", "green")}
+
+
+def to_figure(figure_json):
+    """go.Figure depuis un JSON produit par Figure.to_json, sans revalidation."""
+    import plotly.graph_objects as go
+
+    # _validate=False : le JSON vient de plotly lui-même, la revalidation est inutile
+    return go.Figure(json.loads(figure_json), _validate=False)
+
+
+def lttb(x, y, threshold):
+    """Indices des points conservés par Largest Triangle Three Buckets (extrémités incluses)."""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    # threshold - 2 seaux entre le premier et le dernier point
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Sommet C : moyenne du seau suivant (dernier point pour le dernier seau)
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        cx, cy = x[end:next_end].mean(), y[end:next_end].mean()
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end]) * (cy - ay))
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def _forecast_figure_json(country, predictions):
+    import plotly.graph_objects as go
+
+    series = data.country_series()[country]
+    fig = go.Figure()
+    # Séries et prévisions en centièmes de °C, comme le dataset
+    fig.add_trace(go.Scatter(x=series.index, y=series / 100, mode='lines', name='Températures Réelles',
+                             line=dict(color='blue')))
+    future_dates = pd.date_range(start=series.index[-1] + pd.DateOffset(years=1),
+                                 periods=forecast.FORECAST_STEPS, freq='YE')
+    for model, (name, color) in MODEL_TRACES.items():
+        if model in predictions:
+            fig.add_trace(go.Scatter(x=future_dates, y=predictions[model]['mean'] / 100, mode='lines', name=name,
+                                     line=dict(color=color)))
+    fig.update_layout(title=f'Prévisions de Températures pour {country}',
+                      xaxis_title='Année',
+                      yaxis_title='Température (°C)',
+                      legend=dict(x=0, y=1))
+    return fig.to_json()
+
+
+def forecast_figure(country, predictions):
+    """Figure des températures (°C) de country et de ses prévisions (modèle -> DataFrame mean/lower/upper)."""
+    series = data.country_series()[country]
+    version = sorted(forecast.forecast_key(country, model, series) for model in predictions)
+    key = make_key("forecast_figure", FIGURE_VERSION, country, version)
+    return to_figure(figure_cache.get_or_compute(key, lambda: _forecast_figure_json(country, predictions)))
+
+
+def points_per_trace(count, max_points=MAX_POINTS):
+    """Points conservés par série quand count pays sont comparés (au moins MIN_POINTS)."""
+    return max(MIN_POINTS, max_points // count)
+
+
+def _comparison_figure_json(countries, max_points):
+    import plotly.graph_objects as go
+
+    all_series = data.country_series()
+    scatter = go.Scattergl if len(countries) > WEBGL_TRACES else go.Scatter
+    per_trace = points_per_trace(len(countries), max_points)
+    fig = go.Figure()
+    for country in countries:
+        series = all_series[country]
+        kept = lttb(series.index.year, series.to_numpy(), per_trace)
+        fig.add_trace(scatter(x=series.index[kept], y=series.iloc[kept] / 100, mode='lines', name=country,
+                              line=dict(width=1 if len(countries) > WEBGL_TRACES else 2)))
+    fig.update_layout(title='Comparaison des températures moyennes annuelles',
+                      xaxis_title='Année',
+                      yaxis_title='Température (°C)',
+                      showlegend=len(countries) <= WEBGL_TRACES)
+    return fig.to_json()
+
+
+def comparison_figure(countries, max_points=MAX_POINTS):
+    """Figure superposant les températures annuelles (°C) de countries."""
+    countries = list(countries)
+    key = make_key("comparison_figure", FIGURE_VERSION, countries, max_points, data.file_hash(data.DATASET_PATH))
+    return to_figure(figure_cache.get_or_compute(key, lambda: _comparison_figure_json(countries, max_points)))
+
+
+STAT_LABELS = {"mean": "moyenne", "min": "minimum", "max": "maximum", "weighted": "moyenne pondérée par la population"}
+MEASURE_LABELS = {"YAVGT": "Température moyenne", "YANOT": "Anomalie de température"}
+
+
+def _reference_label(reference):
+    first, last = features.REFERENCE_PERIOD if reference is None else reference
+    return f"{first}-{last}"
+
+
+def continents_figure(measure="YAVGT", stat="mean", continents=None, years=None, reference=None):
+    """Séries annuelles (°C) de la statistique stat de measure par continent (anomalies par rapport à reference)."""
+    import plotly.graph_objects as go
+
+    frame = cube.by_continent(measure, stat, continents, years, reference) / 100
+    fig = go.Figure([go.Scatter(x=frame.index, y=frame[name], mode='lines', name=name) for name in frame.columns])
+    fig.update_layout(title=f'{MEASURE_LABELS[measure]} par continent ({STAT_LABELS[stat]} des pays)',
+                      xaxis_title='Année',
+                      yaxis_title='Température (°C)' if measure == "YAVGT" else f'Écart à {_reference_label(reference)} (°C)')
+    return fig
+
+
+def countries_figure(countries, measure="YAVGT", years=None, reference=None):
+    """Séries annuelles (°C) de measure pour chaque pays de countries (anomalies par rapport à reference)."""
+    import plotly.graph_objects as go
+
+    frame = cube.by_country(measure, countries, years, reference) / 100
+    fig = go.Figure([go.Scatter(x=frame.index, y=frame[name], mode='lines', name=name) for name in frame.columns])
+    fig.update_layout(title=f'{MEASURE_LABELS[measure]} par pays',
+                      xaxis_title='Année',
+                      yaxis_title='Température (°C)' if measure == "YAVGT" else f'Écart à {_reference_label(reference)} (°C)')
+    return fig
+
+
+def anomaly_figure(stat="weighted", continents=None, years=None, reference=None):
+    """Anomalies annuelles (°C) par rapport à reference (1951-1980 par défaut) sur les continents sélectionnés (le monde par défaut)."""
+    import plotly.graph_objects as go
+
+    series = cube.total("YANOT", stat, continents, years, reference) / 100
+    fig = go.Figure(go.Bar(x=series.index, y=series, marker=dict(color=series, colorscale='RdBu_r', cmid=0, showscale=True,
+                                                                  colorbar=dict(title='°C'))))
+    fig.update_layout(title=f'Écarts annuels à la période de référence {_reference_label(reference)} ({STAT_LABELS[stat]})',
+                      xaxis_title='Année',
+                      yaxis_title='Écart (°C)')
+    return fig
+
+
+def scenario_figure(baseline, scenario, observed=None, title="Monde"):
+    """Anomalies annuelles (°C) de référence et du scénario (séries indexées par YEAR, centièmes de °C)."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    if observed is not None:
+        fig.add_trace(go.Scatter(x=observed.index, y=observed / 100, mode='markers', name='Observé',
+                                 marker=dict(color='grey', size=5)))
+    fig.add_trace(go.Scatter(x=baseline.index, y=baseline / 100, mode='lines', name='Modèle (émissions réelles)',
+                             line=dict(color='blue')))
+    fig.add_trace(go.Scatter(x=scenario.index, y=scenario / 100, mode='lines', name='Scénario',
+                             line=dict(color='red', dash='dash'), fill='tonexty'))
+    fig.update_layout(title=f'Anomalies simulées : {title}',
+                      xaxis_title='Année',
+                      yaxis_title='Écart (°C)')
+    return fig
@@ -0,0 +1,256 @@
+"""Cube d'agrégation précalculé (continent, pays, année) du dataset.
+
+Les températures YAVGT et les anomalies YANOT sont rangées dans des
+tableaux denses pays x année ; pour chaque continent et chaque année sont
+précalculés le nombre de valeurs, leur somme, leur minimum, leur maximum et
+les sommes pondérées par la population. Ces agrégats étant additifs (ou
+composables par min/max), toute sélection de continents se résout par une
+réduction sur quelques lignes, sans repasser par le dataset :
+
+  - by_continent : une série par continent ;
+  - total : une série pour l'ensemble des continents sélectionnés (le monde
+    par défaut) ;
+  - by_country : les séries de pays.
+
+Statistiques disponibles : "mean", "min", "max" et "weighted" (moyenne
+pondérée par la population).
+
+Les anomalies YANOT du dataset sont calculées sur la période de référence
+1951-1980. Pour une autre période, le cube porte les sommes cumulées de
+YAVGT (et les nombres de valeurs) de chaque pays le long des années : la
+moyenne de référence d'un pays sur n'importe quelle fenêtre se lit en deux
+accès (reference_means), sans repasser par les lignes du dataset. Les
+fonctions by_continent, total et by_country acceptent reference=(début,
+fin) pour YANOT. Le cube est enregistré en .npz compressé dans
+ressources/cache/cube/, sous l'empreinte du dataset :
+
+    python -m rechauffement.cube
+"""
+import argparse
+import os
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from rechauffement import data
+
+CACHE_DIR = os.path.join(data.CACHE_DIR, "cube")
+# À incrémenter quand le contenu du cube change (invalide les fichiers existants)
+CUBE_VERSION = 2
+
+MEASURES = ("YAVGT", "YANOT")
+STATS = ("mean", "min", "max", "weighted")
+COLUMNS = ["Name_FR", "Continent_FR", "YEAR", "population", *MEASURES]
+# Tableaux produits par build() et enregistrés dans le .npz
+ARRAYS = ("countries", "continents", "years", "country_continent", "values", "population",
+          "count", "total", "low", "high", "weighted_total", "weight", "prefix_sum", "prefix_count")
+
+
+def build(frame):
+    """Tableaux du cube à partir des colonnes COLUMNS du dataset."""
+    # Noms en chaînes de longueur fixe : un tableau d'objets ne se relit pas sans pickle
+    countries, first_rows, country_codes = np.unique(frame["Name_FR"].to_numpy(dtype=str),
+                                                     return_index=True, return_inverse=True)
+    years, year_codes = np.unique(frame["YEAR"].to_numpy(), return_inverse=True)
+    continents, continent_codes = np.unique(frame["Continent_FR"].to_numpy(dtype=str)[first_rows],
+                                            return_inverse=True)
+
+    shape = (len(countries), len(years))
+    values = np.full((len(MEASURES),) + shape, np.nan, dtype="float32")
+    for m, measure in enumerate(MEASURES):
+        values[m, country_codes, year_codes] = frame[measure].to_numpy()
+    population = np.full(shape, np.nan)
+    population[country_codes, year_codes] = frame["population"].to_numpy()
+
+    # Agrégats par continent : valeurs manquantes exclues (comptes et poids à 0)
+    aggregated = (len(MEASURES), len(continents), len(years))
+    count = np.zeros(aggregated, dtype="int32")
+    total = np.zeros(aggregated)
+    low = np.full(aggregated, np.nan, dtype="float32")
+    high = np.full(aggregated, np.nan, dtype="float32")
+    weighted_total = np.zeros(aggregated)
+    weight = np.zeros(aggregated)
+    for m in range(len(MEASURES)):
+        valid = ~np.isnan(values[m])
+        pop = np.where(valid & ~np.isnan(population), population, 0)
+        np.add.at(count[m], continent_codes, valid)
+        np.add.at(total[m], continent_codes, np.where(valid, values[m], 0))
+        np.fmin.at(low[m], continent_codes, values[m])
+        np.fmax.at(high[m], continent_codes, values[m])
+        np.add.at(weighted_total[m], continent_codes, np.where(valid, values[m], 0) * pop)
+        np.add.at(weight[m], continent_codes, pop)
+    # Sommes cumulées de YAVGT par pays : colonne j = années d'indice < j
+    yavgt = values[MEASURES.index("YAVGT")]
+    prefix_sum = np.zeros((len(countries), len(years) + 1))
+    prefix_count = np.zeros((len(countries), len(years) + 1), dtype="int32")
+    np.cumsum(np.nan_to_num(yavgt, nan=0.0), axis=1, dtype="float64", out=prefix_sum[:, 1:])
+    np.cumsum(~np.isnan(yavgt), axis=1, out=prefix_count[:, 1:])
+    return {"countries": countries, "continents": continents, "years": years.astype("int16"),
+            "country_continent": continent_codes.astype("int8"), "values": values, "population": population,
+            "count": count, "total": total, "low": low, "high": high,
+            "weighted_total": weighted_total, "weight": weight,
+            "prefix_sum": prefix_sum, "prefix_count": prefix_count}
+
+
+def cube_path(path=data.DATASET_PATH):
+    """Fichier .npz du cube de path (dépend du contenu du dataset)."""
+    return os.path.join(CACHE_DIR, f"v{CUBE_VERSION}-{data.file_hash(path)}.npz")
+
+
+def _load(path):
+    cache_path = cube_path(path)
+    try:
+        with np.load(cache_path) as stored:
+            arrays = {name: stored[name] for name in ARRAYS}
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        # Absent, tronqué (écriture interrompue) ou incomplet : reconstruit
+        arrays = build(data.load_dataset(path, COLUMNS))
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+            np.savez_compressed(tmp_path, **arrays)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # ressources/ en lecture seule : le cube reste en mémoire
+    arrays["country_index"] = {name: i for i, name in enumerate(arrays["countries"].tolist())}
+    arrays["continent_index"] = {name: i for i, name in enumerate(arrays["continents"].tolist())}
+    return arrays
+
+
+def load(path=data.DATASET_PATH):
+    """Tableaux du cube (construit une fois par version du dataset, puis relu depuis le .npz)."""
+    return data.cached(("cube", path), path, lambda: _load(path))
+
+
+def _years(cube, years):
+    if years is None:
+        return slice(None)
+    first, last = years
+    return slice(*np.searchsorted(cube["years"], (first, last + 1)))
+
+
+def _rows(index, names):
+    if names is None:
+        return slice(None)
+    return [index[name] for name in names]
+
+
+def _continent_stat(cube, measure, stat, rows, columns, reduce):
+    m = MEASURES.index(measure)
+
+    def part(name):
+        block = cube[name][m, rows, columns]
+        if not reduce:
+            return block
+        return {"low": np.fmin.reduce, "high": np.fmax.reduce}.get(name, np.sum)(block, axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if stat == "mean":
+            return part("total") / part("count")
+        if stat == "weighted":
+            return part("weighted_total") / part("weight")
+        if stat in ("min", "max"):
+            return part("low" if stat == "min" else "high")
+    raise ValueError(f"statistique inconnue : {stat!r} (attendu : {', '.join(STATS)})")
+
+
+def reference_means(reference, countries=None, path=data.DATASET_PATH):
+    """Moyenne de YAVGT de chaque pays sur les années reference = (début, fin) incluses (NaN sans valeur)."""
+    cube = load(path)
+    first, last = reference
+    if first > last:
+        raise ValueError(f"période de référence invalide : {first}-{last}")
+    start, end = np.searchsorted(cube["years"], (first, last + 1))
+    rows = _rows(cube["country_index"], countries)
+    count = cube["prefix_count"][rows, end] - cube["prefix_count"][rows, start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, (cube["prefix_sum"][rows, end] - cube["prefix_sum"][rows, start]) / count, np.nan)
+
+
+def _anomaly_stat(cube, reference, stat, continents, columns, reduce, path):
+    """Statistique stat des anomalies par rapport à reference, par continent (ou sur leur ensemble)."""
+    anomalies = cube["values"][MEASURES.index("YAVGT"), :, columns] - reference_means(reference, path=path)[:, None]
+    population = cube["population"][:, columns]
+    codes = np.arange(len(cube["continents"])) if continents is None else \
+        np.array([cube["continent_index"][name] for name in continents], dtype="int64")
+    # Matrice d'appartenance (groupes x pays) : un seul groupe quand reduce
+    members = cube["country_continent"][None, :] == codes[:, None]
+    if reduce:
+        members = members.any(axis=0, keepdims=True)
+    valid = ~np.isnan(anomalies)
+    # Produits en flottants : un produit de tableaux booléens resterait booléen (0/1)
+    weights = members.astype("float64")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if stat == "mean":
+            return (weights @ np.where(valid, anomalies, 0)) / (weights @ valid.astype("float64"))
+        if stat == "weighted":
+            pop = np.where(valid & ~np.isnan(population), population, 0)
+            return (weights @ (np.where(valid, anomalies, 0) * pop)) / (weights @ pop)
+        if stat in ("min", "max"):
+            reduce_function = np.fmin.reduce if stat == "min" else np.fmax.reduce
+            return np.stack([reduce_function(anomalies[group], axis=0) for group in members])
+    raise ValueError(f"statistique inconnue : {stat!r} (attendu : {', '.join(STATS)})")
+
+
+def by_continent(measure="YAVGT", stat="mean", continents=None, years=None, reference=None, path=data.DATASET_PATH):
+    """Séries annuelles par continent (colonnes) de la statistique stat de measure.
+
+    reference = (début, fin) : anomalies YANOT par rapport à cette période plutôt qu'à 1951-1980.
+    """
+    cube = load(path)
+    rows, columns = _rows(cube["continent_index"], continents), _years(cube, years)
+    if reference is not None and measure == "YANOT":
+        result = _anomaly_stat(cube, reference, stat, continents, columns, reduce=False, path=path)
+    else:
+        result = _continent_stat(cube, measure, stat, rows, columns, reduce=False)
+    names = cube["continents"][rows] if continents is None else list(continents)
+    return pd.DataFrame(result.T, index=pd.Index(cube["years"][columns], name="YEAR"), columns=names)
+
+
+def total(measure="YANOT", stat="weighted", continents=None, years=None, reference=None, path=data.DATASET_PATH):
+    """Série annuelle de la statistique stat de measure sur l'ensemble des continents sélectionnés."""
+    cube = load(path)
+    rows, columns = _rows(cube["continent_index"], continents), _years(cube, years)
+    if reference is not None and measure == "YANOT":
+        result = _anomaly_stat(cube, reference, stat, continents, columns, reduce=True, path=path)[0]
+    else:
+        result = _continent_stat(cube, measure, stat, rows, columns, reduce=True)
+    return pd.Series(result, index=pd.Index(cube["years"][columns], name="YEAR"), name=f"{measure} {stat}")
+
+
+def by_country(measure="YAVGT", countries=None, years=None, reference=None, path=data.DATASET_PATH):
+    """Séries annuelles de measure par pays (colonnes)."""
+    cube = load(path)
+    rows, columns = _rows(cube["country_index"], countries), _years(cube, years)
+    names = cube["countries"][rows] if countries is None else list(countries)
+    if reference is not None and measure == "YANOT":
+        block = cube["values"][MEASURES.index("YAVGT"), rows, columns] - \
+            reference_means(reference, countries, path)[:, None]
+    else:
+        block = cube["values"][MEASURES.index(measure), rows, columns]
+    return pd.DataFrame(block.T, index=pd.Index(cube["years"][columns], name="YEAR"), columns=names)
+
+
+def countries_of(continents, path=data.DATASET_PATH):
+    """Pays des continents donnés, par ordre alphabétique."""
+    cube = load(path)
+    codes = [cube["continent_index"][name] for name in continents]
+    return cube["countries"][np.isin(cube["country_continent"], codes)].tolist()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construit le cube d'agrégation du dataset.")
+    parser.add_argument("--dataset", default=data.DATASET_PATH, help="CSV du dataset")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    cube = load(args.dataset)
+    path = cube_path(args.dataset)
+    size = f"{os.path.getsize(path) / 1e3:.0f} ko" if os.path.exists(path) else "non enregistré"
+    print(f"{len(cube['continents'])} continents, {len(cube['countries'])} pays, {len(cube['years'])} années "
+          f"en {time.perf_counter() - start:.2f} s : {path} ({size})")
+
+
+if __name__ == "__main__":
+    main()
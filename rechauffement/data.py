@@ -0,0 +1,162 @@
+"""Chargement des jeux de données de l'application.
+
+Les CSV ne sont lus qu'une fois par processus, avec des types explicites.
+Le résultat est mémorisé au niveau du module : Streamlit conservant les
+modules importés d'une exécution à l'autre, il est partagé par toutes les
+sessions. Il n'est relu que si la signature du fichier (date de
+modification, taille) change.
+
+Quand un instantané colonnaire à jour existe (voir rechauffement.snapshot),
+il est lu à la place du CSV, en se limitant aux colonnes demandées.
+
+Les objets renvoyés sont partagés : ils ne doivent pas être modifiés.
+"""
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+from rechauffement import timing
+
+RESSOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ressources")
+CACHE_DIR = os.path.join(RESSOURCES_DIR, "cache")
+DATASET_PATH = os.path.join(RESSOURCES_DIR, "dataset.csv")
+MONDE_PATH = os.path.join(RESSOURCES_DIR, "MONDE.csv")
+
+CATEGORY_COLUMNS = ["ISO_2", "ISO_3", "Name_EN", "Name_FR", "Continent_EN", "Continent_FR"]
+MEASURE_COLUMNS = ["YAVGT", "REFT", "YANOT",
+                   "YAVGTp10", "YANOTp10", "YAVGT-10", "YANOT-10",
+                   "YAVGTp5", "YANOTp5", "YAVGT-5", "YANOT-5",
+                   "population", "gdp", "cement_co2", "co2", "coal_co2", "gas_co2",
+                   "methane", "nitrous_oxide", "oil_co2", "total_ghg",
+                   "total_ghg_excluding_lucf", "AtmCO2"]
+
+# Code_ISO et ISO_YEAR sont écrits en décimal ("4.00", "41950.0") : lus en
+# flottant puis convertis en entier après lecture.
+DATASET_DTYPES = {"Code_ISO": "float32", "YEAR": "int16", "ISO_YEAR": "float64",
+                  **{col: "category" for col in CATEGORY_COLUMNS},
+                  **{col: "float32" for col in MEASURE_COLUMNS}}
+MONDE_DTYPES = {"date": "str", "YAVGT_World": "float64", "YEAR": "str"}
+
+_cache = {}
+# _lock protège les dictionnaires ; chaque clé a son propre verrou de construction
+_lock = threading.RLock()
+_build_locks = {}
+
+
+def file_signature(path):
+    """Signature bon marché d'un fichier : (date de modification en ns, taille)."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_hash(path):
+    """Empreinte SHA-1 du contenu d'un fichier, recalculée seulement s'il change."""
+    return cached(("hash", path), path, lambda: _sha1(path))
+
+
+def _sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cached(key, path, build):
+    """Renvoie build() mémorisé sous key tant que la signature de path est inchangée.
+
+    build() s'exécute hors du verrou global : une construction lente (entraînement
+    des modèles, par exemple) ne bloque que les appels portant sur la même clé.
+    """
+    signature = file_signature(path)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        build_lock = _build_locks.setdefault(key, threading.RLock())
+    with build_lock:
+        # Construite entre-temps par un autre thread ?
+        with _lock:
+            entry = _cache.get(key)
+        if entry is None or entry[0] != signature:
+            entry = (signature, build())
+            with _lock:
+                _cache[key] = entry
+        return entry[1]
+
+
+def read_dataset_csv(path=DATASET_PATH):
+    """Lecture directe (sans cache) du CSV du dataset principal."""
+    dataset = pd.read_csv(path, sep=";", dtype=DATASET_DTYPES)
+    dataset["Code_ISO"] = dataset["Code_ISO"].astype("int16")
+    dataset["ISO_YEAR"] = dataset["ISO_YEAR"].astype("int32")
+    return dataset
+
+
+def read_monde_csv(path=MONDE_PATH):
+    """Lecture directe (sans cache) d'un CSV de série mondiale."""
+    return pd.read_csv(path, sep=";", dtype=MONDE_DTYPES).set_index("date")
+
+
+def _read_table(path, reader, columns):
+    # Import local : rechauffement.snapshot dépend de ce module
+    from rechauffement import snapshot
+
+    with timing.span("data.load", table=os.path.basename(path)):
+        frame = snapshot.read_snapshot(path, None if columns is None else list(columns))
+        if frame is not None:
+            return frame
+        if columns is not None:
+            return _load(path, reader)[list(columns)]
+        # Instantané absent ou périmé : lecture du CSV puis reconstruction de l'instantané
+        with timing.span("data.parse_csv", table=os.path.basename(path)):
+            frame = reader(path)
+        try:
+            snapshot.write_snapshot(path, frame)
+        except OSError:
+            pass  # ressources/ en lecture seule : on se contente du CSV
+        return frame
+
+
+def _load(path, reader, columns=None):
+    columns = None if columns is None else tuple(columns)
+    return cached(("table", path, columns), path, lambda: _read_table(path, reader, columns))
+
+
+def load_dataset(path=DATASET_PATH, columns=None):
+    """Dataset principal (une ligne par pays et par année), réduit à columns si fourni."""
+    return _load(path, read_dataset_csv, columns)
+
+
+def continents_list(path=DATASET_PATH):
+    """Continents dans leur ordre d'apparition dans le dataset."""
+    return cached(("continents", path), path,
+                   lambda: tuple(pd.unique(load_dataset(path, ["Continent_EN"])["Continent_EN"]).tolist()))
+
+
+def countries_list(path=DATASET_PATH):
+    """Pays (Name_EN) dans leur ordre d'apparition dans le dataset."""
+    return cached(("countries", path), path,
+                   lambda: tuple(pd.unique(load_dataset(path, ["Name_EN"])["Name_EN"]).tolist()))
+
+
+def _build_country_series(path):
+    frame = load_dataset(path, ["Name_EN", "YEAR", "YAVGT"]).sort_values(["Name_EN", "YEAR"])
+    dates = pd.to_datetime(frame["YEAR"], format="%Y")
+    values = frame["YAVGT"].to_numpy(dtype="float64")
+    series = {}
+    for country, positions in frame.groupby("Name_EN", observed=True, sort=False).indices.items():
+        index = pd.DatetimeIndex(dates.iloc[positions], freq="infer", name="date")
+        series[country] = pd.Series(values[positions], index=index, name="YAVGT")
+    return series
+
+
+def country_series(path=DATASET_PATH):
+    """Séries annuelles YAVGT par pays (Name_EN), indexées par date (1er janvier de YEAR).
+
+    L'index est construit une seule fois : obtenir la série d'un pays ne
+    coûte plus qu'une recherche dans un dictionnaire.
+    """
+    return cached(("country_series", path), path, lambda: _build_country_series(path))
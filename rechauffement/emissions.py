@@ -0,0 +1,250 @@
+"""Jointure des données d'émissions (Our World in Data) et du CO2 atmosphérique (NOAA) aux températures.
+
+Sources :
+  - owid-co2-data.csv (48 058 lignes x 79 colonnes) : seules les colonnes
+    iso_code, year et OWID_COLUMNS sont lues ; les regroupements (World,
+    continents, codes OWID_*) sont écartés ;
+  - co2_annmean_mlo.csv (NOAA, 66 lignes x 3 colonnes) : concentration
+    moyenne annuelle du CO2 atmosphérique, commune à tous les pays ;
+  - le tableau des températures (Code_ISO, ISO_3, YEAR, YAVGT... :
+    dataset.csv par défaut, dont les colonnes d'émissions sont ignorées).
+
+La jointure se fait par un seul index (ISO_3, year) des lignes OWID : les
+positions de toutes les lignes de températures y sont cherchées en une fois,
+puis toutes les colonnes sont prises par ces positions. Les pays sans
+aucune ligne OWID sont écartés.
+
+Les valeurs manquantes sont complétées par pays et par variable, pour
+toutes les séries à la fois (tableau variables x pays x années) :
+  1. trous entre deux années renseignées : interpolation linéaire ;
+  2. années postérieures à la dernière valeur : polynôme d'ordre 3 ajusté
+     par moindres carrés sur les années renseignées, raccordé à la dernière
+     valeur (pas de saut) ;
+  3. années antérieures à la première valeur : médiane de la série complétée ;
+  4. série entièrement vide : médiane des pays pour l'année.
+Les valeurs complétées restent positives (sauf SIGNED_COLUMNS). Le CO2 atmosphérique est complété par un
+polynôme d'ordre 2 ajusté sur les années mesurées.
+
+Chaque étape est mise en cache sous l'empreinte de ses sources, dans
+ressources/cache/emissions/ : le CSV OWID n'est relu que s'il change, et
+le tableau joint n'est recalculé que si l'une des trois sources change.
+
+    python -m rechauffement.emissions owid-co2-data.csv co2_annmean_mlo.csv [--output dataset.csv]
+"""
+import argparse
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from rechauffement import data
+from rechauffement.cache import make_key
+
+CACHE_DIR = os.path.join(data.CACHE_DIR, "emissions")
+# À incrémenter quand la jointure ou la complétion change (invalide le cache disque)
+EMISSIONS_VERSION = 1
+
+OWID_COLUMNS = ["population", "gdp", "cement_co2", "co2", "coal_co2", "gas_co2", "methane",
+                "nitrous_oxide", "oil_co2", "total_ghg", "total_ghg_excluding_lucf"]
+ATMOSPHERIC_COLUMN = "AtmCO2"
+EMISSION_COLUMNS = OWID_COLUMNS + [ATMOSPHERIC_COLUMN]
+# Seule colonne pouvant être négative (puits de carbone liés à l'usage des sols)
+SIGNED_COLUMNS = ["total_ghg"]
+# Degrés des polynômes de complétion (émissions par pays, CO2 atmosphérique)
+TREND_DEGREE = 3
+ATMOSPHERIC_DEGREE = 2
+
+
+def read_owid(path):
+    """Colonnes utiles du CSV OWID, pays seulement (code ISO à 3 lettres)."""
+    frame = pd.read_csv(path, usecols=["iso_code", "year", *OWID_COLUMNS],
+                        dtype={"iso_code": str, "year": "int16", **{column: "float64" for column in OWID_COLUMNS}})
+    countries = frame["iso_code"].str.fullmatch("[A-Z]{3}", na=False)
+    return frame.loc[countries].reset_index(drop=True)
+
+
+def read_atmospheric(path):
+    """Série annuelle du CO2 atmosphérique (ppm) indexée par année."""
+    frame = pd.read_csv(path, comment="#", usecols=["year", "mean"], dtype={"year": "int16", "mean": "float64"})
+    return frame.set_index("year")["mean"].rename(ATMOSPHERIC_COLUMN)
+
+
+def _stage_path(name, *parts):
+    return os.path.join(CACHE_DIR, f"{name}-{make_key(EMISSIONS_VERSION, *parts)}.feather")
+
+
+def _cached_frame(path, build):
+    """Table lue depuis path (Feather), ou construite par build() puis enregistrée."""
+    try:
+        return pd.read_feather(path), True
+    except (OSError, ValueError):
+        pass
+    frame = build()
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        frame.to_feather(tmp_path)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # ressources/ en lecture seule : la table reste en mémoire
+    return frame, False
+
+
+def owid_table(path):
+    """(table OWID réduite, relue du cache ?) ; le CSV n'est analysé que si son contenu change."""
+    return data.cached(("owid", path), path,
+                       lambda: _cached_frame(_stage_path("owid", data.file_hash(path)), lambda: read_owid(path)))
+
+
+def join(temperatures, owid):
+    """Colonnes OWID_COLUMNS alignées sur les lignes de temperatures (NaN sans correspondance).
+
+    Un seul index (ISO_3, year) sur owid ; toutes les lignes de temperatures
+    y sont cherchées en une opération.
+    """
+    index = pd.MultiIndex.from_arrays([owid["iso_code"], owid["year"]])
+    if not index.is_unique:
+        raise ValueError("lignes OWID en double pour un même (iso_code, year)")
+    keys = pd.MultiIndex.from_arrays([temperatures["ISO_3"].astype(str), temperatures["YEAR"].astype("int16")])
+    positions = index.get_indexer(keys)
+    values = owid[OWID_COLUMNS].to_numpy()[positions]
+    values[positions < 0] = np.nan
+    return values
+
+
+def _polynomial_fit(x, values, valid, degree):
+    """Coefficients par ligne (moindres carrés sur les points valides), degré réduit si trop peu de points."""
+    vander = np.vander(x, degree + 1, increasing=True)
+    weights = valid.astype("float64")
+    lhs = np.einsum("sy,yi,yj->sij", weights, vander, vander)
+    rhs = np.einsum("sy,yi->si", np.where(valid, values, 0), vander)
+    # Degrés non déterminés (moins de degree + 1 points) : coefficients annulés
+    points = valid.sum(axis=1)
+    usable = np.arange(degree + 1)[None, :] < np.maximum(points, 1)[:, None]
+    lhs = np.where(usable[:, :, None] & usable[:, None, :], lhs, np.eye(degree + 1))
+    rhs = np.where(usable, rhs, 0)
+    return np.linalg.solve(lhs + 1e-9 * np.eye(degree + 1), rhs[..., None])[..., 0], vander
+
+
+def fill_series(values, degree=TREND_DEGREE):
+    """Complète les NaN de chaque ligne de values (séries x années), années régulièrement espacées."""
+    values = np.array(values, dtype="float64")
+    count = values.shape[1]
+    valid = ~np.isnan(values)
+    position = np.arange(count)
+    previous = np.maximum.accumulate(np.where(valid, position, -1), axis=1)
+    following = np.minimum.accumulate(np.where(valid, position, count)[:, ::-1], axis=1)[:, ::-1]
+
+    # 1. Trous intérieurs : interpolation linéaire entre les valeurs voisines
+    inside = ~valid & (previous >= 0) & (following < count)
+    low = np.take_along_axis(values, np.clip(previous, 0, count - 1), axis=1)
+    high = np.take_along_axis(values, np.clip(following, 0, count - 1), axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        step = (position - previous) / (following - previous)
+    values[inside] = (low + step * (high - low))[inside]
+
+    # 2. Fin de série : tendance polynomiale raccordée à la dernière valeur
+    after = ~valid & (previous >= 0) & (following == count)
+    if after.any():
+        x = np.linspace(-1, 1, count)
+        coefficients, vander = _polynomial_fit(x, values, valid, degree)
+        trend = coefficients @ vander.T
+        last = np.take_along_axis(values, np.clip(previous, 0, count - 1), axis=1)
+        trend_at_last = np.take_along_axis(trend, np.clip(previous, 0, count - 1), axis=1)
+        values[after] = (trend - trend_at_last + last)[after]
+
+    # 3. Début de série : médiane de la série complétée
+    before = ~valid & (previous < 0) & (following < count)
+    rows = before.any(axis=1)
+    if rows.any():
+        median = np.nanmedian(values[rows], axis=1)
+        values[rows] = np.where(before[rows], median[:, None], values[rows])
+    return values
+
+
+def complete(temperatures, values):
+    """values (lignes de temperatures x OWID_COLUMNS) complétées par pays et par variable."""
+    codes, country = np.unique(temperatures["Code_ISO"].to_numpy(), return_inverse=True)
+    year = temperatures["YEAR"].to_numpy().astype("int64")
+    year -= year.min()
+    # Tableau dense variables x pays x années (années absentes du pays : NaN à compléter)
+    dense = np.full((values.shape[1], len(codes), year.max() + 1), np.nan)
+    dense[:, country, year] = values.T
+    filled = fill_series(dense.reshape(-1, dense.shape[2])).reshape(dense.shape)
+    # 4. Séries entièrement vides : médiane des pays pour l'année
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # variable absente de tous les pays une année
+        yearly_median = np.nanmedian(filled, axis=1, keepdims=True)
+    filled = np.where(np.isnan(filled), yearly_median, filled)
+    signed = np.isin(OWID_COLUMNS, SIGNED_COLUMNS)[:, None, None]
+    # Valeurs complétées : positives, sauf pour SIGNED_COLUMNS
+    filled = np.where(signed | ~np.isnan(dense), filled, np.clip(filled, 0, None))
+    return filled[:, country, year].T
+
+
+def atmospheric_values(series, years, degree=ATMOSPHERIC_DEGREE):
+    """CO2 atmosphérique des années years : mesures, complétées par un polynôme ajusté sur les mesures."""
+    measured = series.reindex(years).to_numpy(dtype="float64", copy=True)
+    missing = np.isnan(measured)
+    if missing.any():
+        center = series.index.to_numpy().mean()
+        trend = np.polynomial.Polynomial.fit(series.index.to_numpy() - center, series.to_numpy(), degree)
+        measured[missing] = trend(years[missing] - center)
+    return measured
+
+
+def build(temperatures, owid, atmospheric):
+    """Tableau des températures complété des colonnes EMISSION_COLUMNS (pays sans données OWID écartés)."""
+    temperatures = temperatures.drop(columns=[c for c in EMISSION_COLUMNS if c in temperatures])
+    known = temperatures["ISO_3"].astype(str).isin(set(owid["iso_code"]))
+    temperatures = temperatures.loc[known].reset_index(drop=True)
+    values = complete(temperatures, join(temperatures, owid))
+    result = temperatures.assign(**{column: values[:, i].astype("float32") for i, column in enumerate(OWID_COLUMNS)})
+    years = result["YEAR"].to_numpy().astype("int64")
+    unique_years, inverse = np.unique(years, return_inverse=True)
+    result[ATMOSPHERIC_COLUMN] = atmospheric_values(atmospheric, unique_years)[inverse].astype("float32")
+    return result
+
+
+def _build_from_paths(temperatures_path, owid_path, atmospheric_path):
+    owid, _ = owid_table(owid_path)
+    return build(data.read_dataset_csv(temperatures_path), owid, read_atmospheric(atmospheric_path))
+
+
+def load(owid_path, atmospheric_path, temperatures_path=data.DATASET_PATH):
+    """(tableau joint et complété, relu du cache ?), recalculé seulement si une source change."""
+    key = (data.file_hash(temperatures_path), data.file_hash(owid_path), data.file_hash(atmospheric_path))
+    return _cached_frame(_stage_path("dataset", *key),
+                         lambda: _build_from_paths(temperatures_path, owid_path, atmospheric_path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Joint les émissions OWID et le CO2 atmosphérique aux températures.")
+    parser.add_argument("owid", help="CSV Our World in Data (owid-co2-data.csv)")
+    parser.add_argument("atmospheric", help="CSV NOAA du CO2 atmosphérique annuel (year,mean,unc)")
+    parser.add_argument("--temperatures", default=data.DATASET_PATH, help="CSV des températures (séparateur ;)")
+    parser.add_argument("--output", default=os.path.join(CACHE_DIR, "dataset.csv"), help="CSV écrit")
+    args = parser.parse_args(argv)
+    for path in (args.owid, args.atmospheric, args.temperatures):
+        if not os.path.isfile(path):
+            parser.error(f"fichier introuvable : {path}")
+
+    start = time.perf_counter()
+    owid, owid_cached = owid_table(args.owid)
+    print(f"OWID : {len(owid)} lignes de pays, {len(OWID_COLUMNS)} colonnes "
+          f"({'cache' if owid_cached else 'CSV analysé'}, {time.perf_counter() - start:.2f} s)")
+    start = time.perf_counter()
+    frame, cached = load(args.owid, args.atmospheric, args.temperatures)
+    print(f"jointure : {len(frame)} lignes, {frame['Code_ISO'].nunique()} pays "
+          f"({'cache' if cached else 'calculée'}, {time.perf_counter() - start:.2f} s)")
+    reference = pd.read_csv(args.temperatures, sep=";", nrows=0).columns
+    columns = [column for column in reference if column in frame] + [c for c in frame if c not in reference]
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    frame[columns].to_csv(args.output, sep=";", index=False, float_format="%.2f")
+    print(f"écrit : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Colonnes dérivées des températures de dataset.csv.
+
+À partir de YAVGT (température moyenne annuelle, en centièmes de °C), par
+pays (Code_ISO) :
+  - REFT : moyenne de YAVGT sur la période de référence 1951-1980 ;
+  - YANOT : anomalie YAVGT - REFT, arrondie à l'unité ;
+  - YAVGTp{n} / YANOTp{n} : moyennes glissantes sur les n années se
+    terminant à l'année courante (n = 5 et 10) ;
+  - YAVGT-{n} / YANOT-{n} : valeur de la première année de cette fenêtre,
+    soit n - 1 ans plus tôt (convention du fichier d'origine).
+
+Les fenêtres sont calculées par sommes cumulées sur le tableau trié par
+(Code_ISO, YEAR), sans boucle par pays. Une fenêtre qui déborde avant la
+première année d'un pays ne peut pas être recalculée : la valeur existante
+est conservée (le fichier d'origine a été produit avec des années
+antérieures à 1950).
+
+Pour ajouter des années, append_years ne recalcule que les lignes nouvelles,
+à partir des n - 1 années qui les précèdent dans leur pays, et les insère
+sans retrier le tableau :
+
+    python -m rechauffement.features nouvelles_annees.csv [--output ressources/dataset.csv]
+
+Dans le fichier d'origine, YANOTp5/YANOTp10 reproduisent YAVGTp5/YAVGTp10
+et la première fenêtre complète de chaque pays inclut des valeurs du pays
+précédent ; --rebuild recalcule toutes les lignes pour obtenir des colonnes
+homogènes.
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from rechauffement import data
+
+REFERENCE_PERIOD = (1951, 1980)
+WINDOWS = (10, 5)
+DERIVED_COLUMNS = ["REFT", "YANOT"] + [f"{prefix}{suffix}{n}" for n in WINDOWS
+                                       for suffix in ("p", "-") for prefix in ("YAVGT", "YANOT")]
+
+
+def _positions(codes):
+    """Rang de chaque ligne dans son pays (codes triés)."""
+    index = np.arange(len(codes))
+    start = np.r_[True, codes[1:] != codes[:-1]]
+    return index - np.maximum.accumulate(np.where(start, index, 0))
+
+
+def _windows(values, codes, years, n):
+    """Moyennes glissantes et premières valeurs des fenêtres de n années (NaN si incomplètes)."""
+    complete = _positions(codes) >= n - 1
+    first = np.flatnonzero(complete) - (n - 1)
+    # Les années d'une fenêtre complète doivent être consécutives
+    complete[complete] = years[complete] - years[first] == n - 1
+    first = np.flatnonzero(complete) - (n - 1)
+    cumsum = np.r_[0.0, np.cumsum(values, dtype="float64")]
+    mean = np.full(len(values), np.nan)
+    head = np.full(len(values), np.nan)
+    mean[complete] = (cumsum[np.flatnonzero(complete) + 1] - cumsum[first]) / n
+    head[complete] = values[first]
+    return mean, head
+
+
+def reference(frame):
+    """REFT par Code_ISO : moyenne de YAVGT sur REFERENCE_PERIOD."""
+    period = frame["YEAR"].between(*REFERENCE_PERIOD)
+    return frame.loc[period].groupby("Code_ISO", observed=True)["YAVGT"].mean().round(2)
+
+
+def _derived(codes, years, yavgt, reft):
+    """Colonnes dérivées (tableaux) de lignes triées par (Code_ISO, YEAR)."""
+    derived = {"REFT": reft}
+    derived["YANOT"] = np.round(yavgt - reft)
+    for n in WINDOWS:
+        for prefix in ("YAVGT", "YANOT"):
+            mean, head = _windows(derived.get(prefix, yavgt), codes, years, n)
+            derived[f"{prefix}p{n}"] = np.round(mean, 2)
+            derived[f"{prefix}-{n}"] = head
+    return derived
+
+
+def derive(frame, reft=None):
+    """Copie de frame (Code_ISO, YEAR, YAVGT au minimum) complétée des colonnes dérivées.
+
+    reft (Series indexée par Code_ISO) évite de recalculer la référence, par
+    exemple quand frame ne couvre pas 1951-1980.
+    """
+    frame = frame.sort_values(["Code_ISO", "YEAR"], kind="stable")
+    if reft is None:
+        reft = reference(frame)
+    derived = _derived(frame["Code_ISO"].to_numpy(), frame["YEAR"].to_numpy(), frame["YAVGT"].to_numpy("float64"),
+                       frame["Code_ISO"].map(reft).to_numpy("float64"))
+
+    result = frame.copy()
+    for column, values in derived.items():
+        values = pd.Series(values, index=frame.index, dtype="float32")
+        if column in frame:
+            # Fenêtres incomplètes (début de série) : valeurs existantes conservées
+            values = values.fillna(frame[column])
+        result[column] = values
+    return result
+
+
+def append_years(frame, new_rows):
+    """frame complété des lignes new_rows, seules les nouvelles lignes étant recalculées.
+
+    frame doit être trié par (Code_ISO, YEAR) et porter les colonnes
+    dérivées ; les nouvelles années doivent suivre la dernière année connue
+    de leur pays et être postérieures à REFERENCE_PERIOD (sinon REFT
+    changerait et tout le pays serait à recalculer : utiliser derive).
+    Seules les max(WINDOWS) - 1 dernières lignes des pays concernés sont
+    lues (tableaux NumPy, sans tri ni filtre de frame) ; frame n'est recopié
+    qu'une fois, les nouvelles lignes insérées à la fin de leur pays.
+    """
+    if (new_rows["YEAR"] <= REFERENCE_PERIOD[1]).any():
+        raise ValueError(f"années antérieures à {REFERENCE_PERIOD[1] + 1} : utiliser derive()")
+    new_rows = new_rows.sort_values(["Code_ISO", "YEAR"], kind="stable", ignore_index=True)
+    codes, years = frame["Code_ISO"].to_numpy(), frame["YEAR"].to_numpy()
+    new_codes, new_years = new_rows["Code_ISO"].to_numpy(), new_rows["YEAR"].to_numpy()
+    countries, first_rows, counts = np.unique(new_codes, return_index=True, return_counts=True)
+    # Lignes de chaque pays concerné dans frame : [start, end)
+    start = np.searchsorted(codes, countries, side="left")
+    end = np.searchsorted(codes, countries, side="right")
+    known = end > start
+    if (known & (new_years[first_rows] <= years[np.maximum(end - 1, 0)])).any():
+        raise ValueError("années déjà présentes ou antérieures à la dernière année d'un pays : utiliser derive()")
+
+    # Contexte : les max(WINDOWS) - 1 dernières lignes de chaque pays concerné
+    first = np.maximum(start, end - (max(WINDOWS) - 1))
+    lengths = end - first
+    context = np.repeat(first - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    reft = np.where(known, frame["REFT"].to_numpy("float64")[np.maximum(end - 1, 0)], np.nan)
+    # Contexte puis nouvelles lignes de chaque pays (tri stable par pays)
+    merged = np.argsort(np.r_[codes[context], new_codes], kind="stable")
+    derived = _derived(np.r_[codes[context], new_codes][merged], np.r_[years[context], new_years][merged],
+                       np.r_[frame["YAVGT"].to_numpy("float64")[context],
+                             new_rows["YAVGT"].to_numpy("float64")][merged],
+                       np.r_[np.repeat(reft, lengths), np.repeat(reft, counts)][merged])
+    is_new = merged >= len(context)
+
+    tail = new_rows.copy()
+    for column, values in derived.items():
+        values = pd.Series(values[is_new], dtype="float32")
+        if column in new_rows:
+            values = values.fillna(new_rows[column])
+        tail[column] = values
+    tail = tail.reindex(columns=frame.columns)
+    # Insertion après la dernière ligne du pays (tail est trié comme new_rows)
+    positions = np.repeat(end, counts)
+    order = np.insert(np.arange(len(frame)), positions, np.arange(len(frame), len(frame) + len(tail)))
+    return pd.concat([frame, tail], ignore_index=True).take(order).reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ajoute des années à dataset.csv en calculant leurs colonnes dérivées.")
+    parser.add_argument("new_rows", help="CSV (séparateur ;) des nouvelles lignes : Code_ISO, YEAR, YAVGT, ...")
+    parser.add_argument("--dataset", default=data.DATASET_PATH)
+    parser.add_argument("--output", help="fichier écrit (par défaut : --dataset)")
+    parser.add_argument("--rebuild", action="store_true", help="recalcule aussi les lignes existantes")
+    args = parser.parse_args(argv)
+
+    dataset = data.read_dataset_csv(args.dataset)
+    new_rows = pd.read_csv(args.new_rows, sep=";")
+    # Colonnes descriptives (noms, continents) reprises de la dernière année connue du pays
+    known = dataset.drop_duplicates("Code_ISO", keep="last").set_index("Code_ISO")
+    for column in ["ISO_2", "ISO_3", "Name_EN", "Name_FR", "Continent_EN", "Continent_FR"]:
+        if column not in new_rows:
+            new_rows[column] = new_rows["Code_ISO"].map(known[column])
+    new_rows["ISO_YEAR"] = new_rows["Code_ISO"] * 10000 + new_rows["YEAR"]
+    if args.rebuild:
+        result = derive(pd.concat([dataset, new_rows], ignore_index=True)).reset_index(drop=True)
+    else:
+        result = append_years(dataset, new_rows)
+    result = result[dataset.columns]
+    output = args.output or args.dataset
+    result.to_csv(output, sep=";", index=False, float_format="%.2f")
+    print(f"{len(new_rows)} lignes ajoutées ({len(result)} au total) : {output}")
+
+
+if __name__ == "__main__":
+    main()
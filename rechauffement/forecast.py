@@ -0,0 +1,151 @@
+"""Prévisions de températures par pays (SARIMAX et Holt-Winters).
+
+La configuration des modèles est celle retenue sur la page « Modèles séries
+temporelles » : tendance multiplicative et saisonnalité de 5 ans. Chaque
+prévision est un DataFrame indexé par date avec les colonnes mean, lower et
+upper (intervalle de confiance à 95 %) ; les résultats sont mis en cache par
+pays, modèle, paramètres et empreinte des données. Les prévisions produites
+par le calcul par lots (rechauffement.batch) sont consultées avant tout
+nouvel ajustement.
+
+statsmodels n'est importé qu'au premier ajustement : calculer une clé ou
+lire une prévision en cache ne paie pas son coût d'import.
+"""
+import hashlib
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from rechauffement import data, timing
+from rechauffement.cache import ForecastCache, make_key
+
+FORECAST_STEPS = 10
+ALPHA = 0.05
+
+MODELS = {
+    "sarimax": {"order": (1, 1, 1), "seasonal_order": (0, 1, 1, 5)},
+    "holt_winters": {"trend": "mul", "seasonal": "mul", "seasonal_periods": 5},
+}
+
+# Nombre de trajectoires simulées pour l'intervalle de confiance Holt-Winters
+HW_SIMULATIONS = 1000
+
+forecast_cache = ForecastCache(os.path.join(data.CACHE_DIR, "forecasts"))
+# Derniers paramètres SARIMAX ajustés par pays, points de départ des ajustements suivants
+start_params_cache = ForecastCache(os.path.join(data.CACHE_DIR, "sarimax_start"))
+PRECOMPUTED_PATH = os.path.join(data.CACHE_DIR, "forecasts_batch.feather")
+
+
+def series_hash(series):
+    """Empreinte des valeurs et des dates d'une série."""
+    digest = hashlib.sha1(series.to_numpy(dtype="float64").tobytes())
+    digest.update(series.index.asi8.tobytes())
+    return digest.hexdigest()
+
+
+def fit_sarimax(series, start_params=None, **params):
+    """Ajuste SARIMAX sur series.
+
+    start_params (paramètres d'un ajustement précédent du même modèle) sert
+    de point de départ à l'optimiseur : quand une année de données est
+    ajoutée, l'optimum bouge peu et la convergence est bien plus rapide.
+    """
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return SARIMAX(series, **params).fit(start_params=start_params, disp=False)
+
+
+def sarimax_frame(sarimax_fit, steps=FORECAST_STEPS):
+    """Prévision d'un ajustement SARIMAX au format commun (mean, lower, upper)."""
+    prediction = sarimax_fit.get_forecast(steps=steps)
+    conf_int = prediction.conf_int(alpha=ALPHA)
+    return pd.DataFrame({"mean": prediction.predicted_mean,
+                         "lower": conf_int.iloc[:, 0],
+                         "upper": conf_int.iloc[:, 1]})
+
+
+def forecast_sarimax(series, steps=FORECAST_STEPS, start_params=None, **params):
+    return sarimax_frame(fit_sarimax(series, start_params, **params), steps)
+
+
+def forecast_holt_winters(series, steps=FORECAST_STEPS, **params):
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        hw_fit = ExponentialSmoothing(series, **params).fit()
+    mean = hw_fit.forecast(steps=steps)
+    # Pas d'intervalle analytique pour ce modèle : quantiles de trajectoires simulées
+    simulations = hw_fit.simulate(steps, repetitions=HW_SIMULATIONS, anchor="end", rng=np.random.default_rng(0))
+    return pd.DataFrame({"mean": mean,
+                         "lower": simulations.quantile(ALPHA / 2, axis=1),
+                         "upper": simulations.quantile(1 - ALPHA / 2, axis=1)})
+
+
+FORECASTERS = {"sarimax": forecast_sarimax, "holt_winters": forecast_holt_winters}
+
+
+def compute_forecast(series, model, steps=FORECAST_STEPS, params=None):
+    """Ajuste model sur series et renvoie la prévision, sans passer par le cache."""
+    params = MODELS[model] if params is None else params
+    return FORECASTERS[model](series, steps, **params)
+
+
+def forecast_key(country, model, series, steps=FORECAST_STEPS, params=None):
+    """Clé de cache d'une prévision (partagée avec le calcul par lots).
+
+    Les paramètres de départ de SARIMAX (voir warm_forecast) n'y figurent pas.
+    """
+    params = MODELS[model] if params is None else params
+    return make_key("forecast", country, model, params, steps, series_hash(series))
+
+
+def _read_precomputed(path):
+    table = pd.read_feather(path)
+    return {key: rows.set_index("date")[["mean", "lower", "upper"]]
+            for key, rows in table.groupby("key", sort=False)}
+
+
+def load_precomputed(path=PRECOMPUTED_PATH):
+    """Prévisions calculées par lots (rechauffement.batch), indexées par clé de cache."""
+    if not os.path.exists(path):
+        return {}
+    return data.cached(("precomputed", path), path, lambda: _read_precomputed(path))
+
+
+def warm_forecast(country, series, model, steps=FORECAST_STEPS, params=None, start_cache=start_params_cache):
+    """Comme compute_forecast, en démarrant SARIMAX des derniers paramètres connus pour ce pays.
+
+    Les paramètres ajustés sont conservés dans start_cache sans référence aux
+    données : après l'ajout d'une année, le nouvel ajustement repart d'eux.
+    Ils ne font pas partie de forecast_key : deux points de départ peuvent
+    donner des prévisions légèrement différentes (tolérance de l'optimiseur),
+    et le cache des prévisions sert la première calculée.
+    """
+    params = MODELS[model] if params is None else params
+    with timing.span("forecast.fit", model=model):
+        if model != "sarimax":
+            return compute_forecast(series, model, steps, params)
+        start_key = make_key("sarimax_start_params", country, params)
+        sarimax_fit = fit_sarimax(series, start_cache.get(start_key), **params)
+        start_cache.put(start_key, sarimax_fit.params.to_numpy())
+        return sarimax_frame(sarimax_fit, steps)
+
+
+def forecast(country, model, steps=FORECAST_STEPS, params=None, cache=forecast_cache):
+    """Prévision d'un pays du dataset : cache, puis résultat pré-calculé, puis ajustement."""
+    params = MODELS[model] if params is None else params
+    series = data.country_series()[country]
+    key = forecast_key(country, model, series, steps, params)
+
+    def compute():
+        precomputed = load_precomputed().get(key)
+        if precomputed is not None:
+            return precomputed
+        return warm_forecast(country, series, model, steps, params)
+
+    return cache.get_or_compute(key, compute)
@@ -0,0 +1,327 @@
+"""Anomalies des stations GISS v4 interpolées sur une grille latitude x longitude (rayon de 1200 km).
+
+Méthode inspirée de GISTEMP, simplifiée :
+  - anomalie annuelle de chaque station : écart de chaque mois à la moyenne
+    du même mois sur BASE_PERIOD (au moins MIN_BASE_YEARS années), moyenné
+    sur l'année (au moins MIN_MONTHS mois renseignés) ; les stations sans
+    climatologie sur BASE_PERIOD sont écartées ;
+  - valeur d'une maille : moyenne des anomalies des stations situées à
+    moins de RADIUS_KM de son centre, pondérée par 1 - distance / RADIUS_KM
+    (poids linéaire décroissant, comme GISTEMP), NaN sans station.
+
+Le fichier des stations est lu par rechauffement.stations.read_blocks,
+en tranches alignées sur les stations traitées en parallèle ; la
+matrice stations x années des anomalies est enregistrée (.npz) sous
+l'empreinte du fichier source. Les coordonnées viennent du fichier
+d'inventaire GHCN-M v4 (.inv : ID, latitude, longitude, ...).
+
+Les stations voisines de chaque maille sont cherchées une seule fois dans
+un BallTree (scikit-learn, distance haversine) ; les poids forment une
+matrice creuse mailles x stations, et les grilles de toutes les années sont
+deux produits de cette matrice par la matrice des anomalies. Chaque grille
+annuelle est enregistrée dans ressources/cache/grids/<empreinte>/<année>.npy
+(centièmes de °C, float32, latitudes du sud au nord), la matrice des poids
+dans weights.npz : calculer ensuite d'autres années (grid) ne reconstruit
+pas le BallTree.
+
+    python -m rechauffement.gridding v4.mean_GISS_homogenized.txt v4.inv [--resolution 2] [--years 1880 2023]
+
+
+Le pourcentage de la surface de chaque hémisphère à moins de RADIUS_KM
+d'une station renseignée (figure de couverture de GISTEMP) est affiché et
+enregistré dans le rapport grids/<empreinte>/report.json, complété à
+chaque calcul d'années supplémentaires.
+"""
+import argparse
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from rechauffement import data, stations
+from rechauffement.cache import make_key
+
+CACHE_DIR = os.path.join(data.CACHE_DIR, "grids")
+# À incrémenter quand le calcul des anomalies ou des grilles change (invalide les fichiers existants)
+GRID_VERSION = 1
+
+EARTH_RADIUS_KM = 6371.0
+RADIUS_KM = 1200.0
+RESOLUTION = 2.0  # degrés
+BASE_PERIOD = (1951, 1980)
+MIN_BASE_YEARS = 10
+MIN_MONTHS = 9
+FIRST_YEAR, LAST_YEAR = 1880, stations.LAST_YEAR
+
+
+def read_inventory(path):
+    """Coordonnées des stations (id en S11, lat, lon en degrés) d'un inventaire GHCN-M v4, triées par id."""
+    frame = pd.read_csv(path, sep=r"\s+", header=None, usecols=[0, 1, 2], names=["id", "lat", "lon"],
+                        dtype={"id": str, "lat": "float64", "lon": "float64"}, on_bad_lines="skip")
+    frame = frame.dropna().drop_duplicates("id").sort_values("id", ignore_index=True)
+    return pd.DataFrame({"id": frame["id"].to_numpy(dtype="S11"), "lat": frame["lat"], "lon": frame["lon"]})
+
+
+def _station_anomalies(path, start=0, end=None, chunk_lines=stations.CHUNK_LINES):
+    """Identifiants et anomalies annuelles (stations x années FIRST_YEAR-LAST_YEAR) d'une tranche de path."""
+    years_count = LAST_YEAR - FIRST_YEAR + 1
+    ids, blocks = [], []
+    dropped = 0
+    for block in stations.read_blocks(path, start, end, chunk_lines):
+        if not len(block["ids"]):
+            continue
+        first = np.r_[True, block["ids"][1:] != block["ids"][:-1]]
+        station = np.cumsum(first) - 1
+        count = int(first.sum())
+        values, years = block["values"], block["years"]
+        valid = ~np.isnan(values)
+        # Climatologie par (station, mois) sur la période de base
+        base = (years >= BASE_PERIOD[0]) & (years <= BASE_PERIOD[1])
+        cell = (station[base, None] * 12 + np.arange(12)).ravel()
+        sums = np.bincount(cell, weights=np.where(valid[base], values[base], 0).ravel(), minlength=count * 12)
+        counts = np.bincount(cell, weights=valid[base].ravel(), minlength=count * 12)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            climatology = np.where(counts >= MIN_BASE_YEARS, sums / counts, np.nan).reshape(count, 12)
+        monthly = values - climatology[station]
+        months = (~np.isnan(monthly)).sum(axis=1)
+        keep = (months >= MIN_MONTHS) & (years >= FIRST_YEAR) & (years <= LAST_YEAR)
+        annual = np.full((count, years_count), np.nan, dtype="float32")
+        annual[station[keep], years[keep] - FIRST_YEAR] = np.nanmean(monthly[keep], axis=1)
+        reporting = ~np.isnan(annual).all(axis=1)
+        dropped += int((~reporting).sum())
+        ids.append(block["ids"][first][reporting])
+        blocks.append(annual[reporting])
+    if not ids:
+        return np.array([], dtype="S11"), np.empty((0, years_count), dtype="float32"), dropped
+    return np.concatenate(ids), np.concatenate(blocks), dropped
+
+
+def station_anomalies(path, workers=None, chunk_lines=stations.CHUNK_LINES):
+    """(ids, années, anomalies stations x années en centièmes de °C, stations écartées) de path.
+
+    Le résultat est enregistré dans CACHE_DIR sous l'empreinte de path.
+    """
+    cache_path = os.path.join(CACHE_DIR, f"anomalies-v{GRID_VERSION}-{data.file_hash(path)}.npz")
+    try:
+        with np.load(cache_path) as stored:
+            return stored["ids"], stored["years"], stored["anomalies"], int(stored["dropped"])
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        pass
+    workers = workers or os.cpu_count()
+    slices = stations.partitions(path, 4 * workers if workers > 1 else 1)
+    if len(slices) == 1:
+        results = [_station_anomalies(path, *slices[0], chunk_lines)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_station_anomalies, path, begin, end, chunk_lines) for begin, end in slices]
+            results = [future.result() for future in futures]
+    ids = np.concatenate([result[0] for result in results])
+    anomalies = np.concatenate([result[1] for result in results])
+    dropped = sum(result[2] for result in results)
+    # Années sans aucune valeur retirées des bords
+    observed = np.flatnonzero(~np.isnan(anomalies).all(axis=0))
+    columns = slice(observed[0], observed[-1] + 1) if len(observed) else slice(0, 0)
+    years = np.arange(FIRST_YEAR, LAST_YEAR + 1)[columns]
+    anomalies = np.ascontiguousarray(anomalies[:, columns])
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, ids=ids, years=years, anomalies=anomalies, dropped=dropped)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # ressources/ en lecture seule : rien n'est enregistré
+    return ids, years, anomalies, dropped
+
+
+def grid_centers(resolution=RESOLUTION):
+    """Latitudes (sud -> nord) et longitudes (ouest -> est) des centres des mailles, en degrés."""
+    lats = np.arange(-90 + resolution / 2, 90, resolution)
+    lons = np.arange(-180 + resolution / 2, 180, resolution)
+    return lats, lons
+
+
+def weights(station_lats, station_lons, resolution=RESOLUTION, radius_km=RADIUS_KM):
+    """Matrice creuse (mailles x stations) des poids 1 - distance / radius_km des stations à moins de radius_km."""
+    from sklearn.neighbors import BallTree
+
+    lats, lons = grid_centers(resolution)
+    centers = np.radians(np.column_stack([np.repeat(lats, len(lons)), np.tile(lons, len(lats))]))
+    tree = BallTree(np.radians(np.column_stack([station_lats, station_lons])), metric="haversine")
+    neighbors, distances = tree.query_radius(centers, r=radius_km / EARTH_RADIUS_KM, return_distance=True)
+    lengths = np.fromiter(map(len, neighbors), dtype="int64", count=len(neighbors))
+    indptr = np.r_[0, np.cumsum(lengths)]
+    columns = np.concatenate(neighbors) if len(neighbors) else np.array([], dtype="int64")
+    values = 1 - np.concatenate(distances) * EARTH_RADIUS_KM / radius_km if len(distances) else np.array([])
+    return sparse.csr_matrix((values, columns, indptr), shape=(len(centers), len(station_lats)))
+
+
+def interpolate(matrix, anomalies):
+    """Grilles (mailles x années) : moyennes pondérées par matrix des anomalies (stations x années) renseignées."""
+    present = ~np.isnan(anomalies)
+    total = matrix @ np.where(present, anomalies, 0).astype("float64")
+    weight = matrix @ present.astype("float64")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(weight > 0, total / weight, np.nan).astype("float32")
+
+
+def coverage(grids, resolution=RESOLUTION):
+    """Part (0-1) de la surface des hémisphères nord et sud couverte par les grilles (années x lat x lon)."""
+    lats, _ = grid_centers(resolution)
+    area = np.cos(np.radians(lats))
+    covered = (~np.isnan(grids)).mean(axis=2) * area
+    north, south = lats > 0, lats < 0
+    return covered[:, north].sum(axis=1) / area[north].sum(), covered[:, south].sum(axis=1) / area[south].sum()
+
+
+def grid_key(path, inventory_path, resolution=RESOLUTION, radius_km=RADIUS_KM):
+    """Empreinte des grilles de path (dépend des fichiers et des paramètres)."""
+    return make_key(GRID_VERSION, data.file_hash(path), data.file_hash(inventory_path), resolution, radius_km)
+
+
+def grid_path(key, year):
+    return os.path.join(CACHE_DIR, key, f"{year}.npy")
+
+
+def _cached_weights(key, located, resolution, radius_km):
+    """weights() des stations de located, relue depuis grids/<key>/weights.npz si possible."""
+    path = os.path.join(CACHE_DIR, key, "weights.npz")
+    lats, lons = grid_centers(resolution)
+    try:
+        matrix = sparse.load_npz(path)
+        if matrix.shape == (len(lats) * len(lons), len(located["lats"])):
+            return matrix
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        pass
+    matrix = weights(located["lats"], located["lons"], resolution, radius_km)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    sparse.save_npz(tmp_path, matrix)
+    os.replace(tmp_path, path)
+    return matrix
+
+
+def _merged_report(path, report):
+    """report complété de la couverture des années d'un rapport précédent (path)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        return report
+    if previous.get("key") != report["key"]:
+        return report
+    for hemisphere in ("north", "south"):
+        report["coverage"][hemisphere] = dict(sorted({**previous["coverage"][hemisphere],
+                                                      **report["coverage"][hemisphere]}.items()))
+    years = list(report["coverage"]["north"])
+    report["years"] = [int(years[0]), int(years[-1])] if years else []
+    return report
+
+
+def _located(path, inventory_path, workers, chunk_lines):
+    """Anomalies des stations de path présentes dans l'inventaire, avec leurs coordonnées."""
+    ids, years, anomalies, dropped = station_anomalies(path, workers, chunk_lines)
+    inventory = read_inventory(inventory_path)
+    positions = np.searchsorted(inventory["id"].to_numpy(), ids).clip(max=max(len(inventory) - 1, 0))
+    found = inventory["id"].to_numpy()[positions] == ids if len(inventory) else np.zeros(len(ids), dtype=bool)
+    located = inventory.iloc[positions[found]]
+    return {"years": years, "anomalies": anomalies[found], "lats": located["lat"].to_numpy(),
+            "lons": located["lon"].to_numpy(), "dropped": dropped, "unlocated": int((~found).sum())}
+
+
+def build(path, inventory_path, years=None, resolution=RESOLUTION, radius_km=RADIUS_KM, workers=None,
+          chunk_lines=stations.CHUNK_LINES):
+    """Calcule et enregistre les grilles des années demandées (toutes par défaut) ; renvoie le rapport."""
+    start = time.perf_counter()
+    key = grid_key(path, inventory_path, resolution, radius_km)
+    located = _located(path, inventory_path, workers, chunk_lines)
+    read_seconds = time.perf_counter() - start
+    columns = np.ones(len(located["years"]), dtype=bool) if years is None else \
+        (located["years"] >= years[0]) & (located["years"] <= years[1])
+    selected_years = located["years"][columns]
+
+    os.makedirs(os.path.join(CACHE_DIR, key), exist_ok=True)
+    started = time.perf_counter()
+    matrix = _cached_weights(key, located, resolution, radius_km)
+    tree_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    lats, lons = grid_centers(resolution)
+    grids = interpolate(matrix, located["anomalies"][:, columns]).T.reshape(len(selected_years), len(lats), len(lons))
+    grid_seconds = time.perf_counter() - started
+
+    for year, grid in zip(selected_years, grids):
+        tmp_path = f"{grid_path(key, year)}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, grid)
+        os.replace(tmp_path, grid_path(key, year))
+    north, south = coverage(grids, resolution)
+    report = {"source": os.path.basename(path), "inventory": os.path.basename(inventory_path), "key": key,
+              "stations": len(located["lats"]), "dropped_stations": located["dropped"],
+              "unlocated_stations": located["unlocated"], "resolution": resolution, "radius_km": radius_km,
+              "cells": int(matrix.shape[0]), "weights": int(matrix.nnz),
+              "years": [int(selected_years[0]), int(selected_years[-1])] if len(selected_years) else [],
+              "computed": [int(selected_years[0]), int(selected_years[-1])] if len(selected_years) else [],
+              "coverage": {"north": dict(zip(map(str, selected_years.tolist()), np.round(north, 4).tolist())),
+                           "south": dict(zip(map(str, selected_years.tolist()), np.round(south, 4).tolist()))},
+              "read_seconds": read_seconds, "tree_seconds": tree_seconds, "grid_seconds": grid_seconds,
+              "seconds": time.perf_counter() - start,
+              "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+    # years : toutes les années enregistrées sous key ; computed : celles de cet appel
+    report_path = os.path.join(CACHE_DIR, key, "report.json")
+    report = _merged_report(report_path, report)
+    tmp_path = f"{report_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, report_path)
+    return report
+
+
+def grid(year, path, inventory_path, resolution=RESOLUTION, radius_km=RADIUS_KM, workers=None):
+    """Grille (lat x lon, centièmes de °C) de year, relue depuis le disque ou calculée puis enregistrée."""
+    cached_path = grid_path(grid_key(path, inventory_path, resolution, radius_km), year)
+    if not os.path.exists(cached_path):
+        build(path, inventory_path, (year, year), resolution, radius_km, workers)
+    if not os.path.exists(cached_path):
+        raise ValueError(f"aucune anomalie de station pour l'année {year}")
+    return np.load(cached_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grilles d'anomalies à partir des stations GISS v4 (rayon de 1200 km).")
+    parser.add_argument("source", help="fichier GHCN-M v4 / GISS v4 (.dat ou .txt, éventuellement .gz)")
+    parser.add_argument("inventory", help="inventaire des stations (.inv : ID, latitude, longitude, ...)")
+    parser.add_argument("--years", type=int, nargs=2, metavar=("DEBUT", "FIN"), help="années calculées (défaut : toutes)")
+    parser.add_argument("--resolution", type=float, default=RESOLUTION, help="taille des mailles (degrés)")
+    parser.add_argument("--radius", type=float, default=RADIUS_KM, help="rayon d'influence des stations (km)")
+    parser.add_argument("--workers", type=int, default=None, help="nombre de processus (défaut : tous les cœurs)")
+    parser.add_argument("--chunk-lines", type=int, default=stations.CHUNK_LINES, help="lignes lues par bloc")
+    args = parser.parse_args(argv)
+    for path in (args.source, args.inventory):
+        if not os.path.isfile(path):
+            parser.error(f"fichier introuvable : {path}")
+    if not 0 < args.resolution <= 30 or 180 % args.resolution or 360 % args.resolution:
+        parser.error("--resolution doit diviser 180 (degrés)")
+    if args.radius <= 0:
+        parser.error("--radius doit être positif")
+    if args.years and args.years[0] > args.years[1]:
+        parser.error("--years : DEBUT doit précéder FIN")
+
+    report = build(args.source, args.inventory, args.years, args.resolution, args.radius, args.workers,
+                   args.chunk_lines)
+    print(f"{report['stations']} stations localisées ({report['dropped_stations']} sans climatologie "
+          f"{BASE_PERIOD[0]}-{BASE_PERIOD[1]}, {report['unlocated_stations']} absentes de l'inventaire)")
+    print(f"lecture des stations : {report['read_seconds']:.1f} s, BallTree et poids : {report['tree_seconds']:.1f} s "
+          f"({report['weights']} poids pour {report['cells']} mailles), grilles : {report['grid_seconds']:.1f} s")
+    if report["computed"]:
+        first, last = report["computed"]
+        for year in sorted({first, (first + last) // 2, last}):
+            print(f"{year} : {report['coverage']['north'][str(year)]:.0%} de l'hémisphère nord et "
+                  f"{report['coverage']['south'][str(year)]:.0%} de l'hémisphère sud à moins de "
+                  f"{report['radius_km']:.0f} km d'une station")
+    print(f"grilles {report['computed']} enregistrées : {os.path.join(CACHE_DIR, report['key'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Holt-Winters vectorisé : ajustement simultané de tous les pays.
+
+Même modèle que ExponentialSmoothing(trend="mul", seasonal="mul",
+seasonal_periods=5) de statsmodels (paramètres et états initiaux estimés par
+moindres carrés), mais les récurrences de lissage sont calculées pour toutes
+les séries à la fois sur un tableau 2-D (pays x années) : la boucle Python
+ne porte que sur les ~73 années, plus sur les pays.
+
+L'optimisation est faite en parallèle pour chaque pays (BFGS par lot, avec
+gradients par différences finies et recherche linéaire propres à chaque
+pays), à partir des meilleurs points d'une grille sur (alpha, beta, gamma),
+comme le fait statsmodels. Les séries non strictement positives, pour
+lesquelles le modèle multiplicatif n'est pas défini, sont ignorées (NaN).
+"""
+import itertools
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from scipy.special import expit, logit
+
+from rechauffement import data, forecast
+
+SEASONAL_PERIODS = forecast.MODELS["holt_winters"]["seasonal_periods"]
+
+# Grille de départ (alpha, beta, gamma) et nombre de meilleurs points optimisés
+START_GRID = np.array(list(itertools.product([0.1, 0.3, 0.5, 0.7, 0.9],
+                                             [0.01, 0.1, 0.3, 0.5],
+                                             [0.01, 0.1, 0.3, 0.5, 0.8])))
+STARTS = 3
+
+
+class HoltWintersFit(NamedTuple):
+    """Paramètres et états finaux ajustés, une ligne par série (NaN si non ajustée)."""
+    alpha: np.ndarray
+    beta: np.ndarray
+    gamma: np.ndarray
+    level: np.ndarray
+    trend: np.ndarray
+    season: np.ndarray  # (séries, seasonal_periods) : derniers coefficients saisonniers
+    sse: np.ndarray
+    iterations: int
+
+
+def smooth(y, alpha, beta, gamma, level, trend, season):
+    """Récurrences multiplicatives (tendance et saisonnalité) sur toutes les lignes de y.
+
+    Renvoie les valeurs ajustées et les états (niveau, tendance, saisons) après
+    la dernière observation.
+    """
+    n_series, n_obs = y.shape
+    m = season.shape[1]
+    seasons = np.empty((n_series, n_obs + m))
+    seasons[:, :m] = season
+    fitted = np.empty_like(y)
+    for t in range(n_obs):
+        s = seasons[:, t]
+        trended = level * trend
+        fitted[:, t] = trended * s
+        new_level = alpha * y[:, t] / s + (1 - alpha) * trended
+        trend = beta * new_level / level + (1 - beta) * trend
+        seasons[:, t + m] = gamma * y[:, t] / trended + (1 - gamma) * s
+        level = new_level
+    return fitted, level, trend, seasons[:, n_obs:]
+
+
+# Paramètres non contraints theta par série : logit(alpha, beta, gamma),
+# log(niveau initial / échelle), log(tendance initiale), log(saisons initiales).
+def _unpack(theta, scale):
+    smoothing = expit(theta[:, :3])
+    return (smoothing[:, 0], smoothing[:, 1], smoothing[:, 2],
+            np.exp(theta[:, 3]) * scale, np.exp(theta[:, 4]), np.exp(theta[:, 5:]))
+
+
+def _objective(theta, y, scale):
+    """Somme des carrés des erreurs de chaque série, normalisée par son échelle."""
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        fitted = smooth(y, *_unpack(theta, scale))[0]
+        sse = (((y - fitted) / scale[:, None]) ** 2).sum(axis=1)
+    return np.where(np.isfinite(sse), sse, np.inf)
+
+
+def _initial_theta(y, m):
+    """États initiaux heuristiques (moyennes des premières saisons)."""
+    level = y[:, :m].mean(axis=1)
+    trend = (y[:, m:2 * m].mean(axis=1) / level) ** (1 / m)
+    theta = np.zeros((y.shape[0], 5 + m))
+    theta[:, 4] = np.log(trend)
+    theta[:, 5:] = np.log(y[:, :m] / level[:, None])
+    return theta, level
+
+
+def _gradient(objective, theta, step=1e-5):
+    # La somme des carrés d'une série ne dépend que de ses paramètres : une
+    # perturbation de la colonne k pour toutes les séries donne d'un coup la
+    # dérivée partielle k de chacune.
+    gradient = np.empty_like(theta)
+    for k in range(theta.shape[1]):
+        forward, backward = theta.copy(), theta.copy()
+        forward[:, k] += step
+        backward[:, k] -= step
+        gradient[:, k] = (objective(forward) - objective(backward)) / (2 * step)
+    return gradient
+
+
+def _bfgs(objective, theta, maxiter=200, gtol=1e-6, ftol=1e-10):
+    """BFGS par lot ; objective(theta, rows) évalue les lignes rows.
+
+    Chaque série a sa propre approximation de l'inverse du hessien et sa
+    propre recherche linéaire ; les séries convergées sont retirées du calcul.
+    """
+    n_series, n_params = theta.shape
+    identity = np.eye(n_params)
+    theta = theta.copy()
+    values = objective(theta, np.arange(n_series))
+    gradients = _gradient(lambda t: objective(t, np.arange(n_series)), theta)
+    inverse_hessians = np.tile(identity, (n_series, 1, 1))
+    active = np.isfinite(values)
+    iteration = 0
+    for iteration in range(1, maxiter + 1):
+        rows = np.flatnonzero(active)
+        if rows.size == 0:
+            break
+        x, f, g, h = theta[rows], values[rows], gradients[rows], inverse_hessians[rows]
+        direction = -np.einsum("nij,nj->ni", h, g)
+        slope = (g * direction).sum(axis=1)
+        not_descent = slope >= 0
+        direction[not_descent] = -g[not_descent]
+        h[not_descent] = identity
+        slope = (g * direction).sum(axis=1)
+
+        # Recherche linéaire d'Armijo par rebroussement, série par série
+        step = np.ones(rows.size)
+        accepted = np.zeros(rows.size, dtype=bool)
+        new_f = f.copy()
+        for _ in range(30):
+            pending = ~accepted
+            trial = objective(x[pending] + step[pending, None] * direction[pending], rows[pending])
+            ok = trial <= f[pending] + 1e-4 * step[pending] * slope[pending]
+            index = np.flatnonzero(pending)[ok]
+            new_f[index] = trial[ok]
+            accepted[index] = True
+            if accepted.all():
+                break
+            step[~accepted] *= 0.5
+
+        new_x = np.where(accepted[:, None], x + step[:, None] * direction, x)
+        new_g = _gradient(lambda t: objective(t, rows), new_x)
+        s, y = new_x - x, new_g - g
+        sy = (s * y).sum(axis=1)
+        update = accepted & (sy > 1e-12)
+        rho = np.where(update, 1 / np.where(update, sy, 1), 0)
+        a = identity - rho[:, None, None] * np.einsum("ni,nj->nij", s, y)
+        new_h = np.einsum("nij,njk,nlk->nil", a, h, a) + rho[:, None, None] * np.einsum("ni,nj->nij", s, s)
+
+        theta[rows] = new_x
+        values[rows] = np.where(accepted, new_f, f)
+        gradients[rows] = np.where(accepted[:, None], new_g, g)
+        inverse_hessians[rows] = np.where(update[:, None, None], new_h, h)
+        converged = (~accepted | (np.abs(new_g).max(axis=1) < gtol)
+                     | (f - new_f < ftol * np.maximum(1, np.abs(new_f))))
+        active[rows[converged]] = False
+    return theta, values, iteration
+
+
+def fit(values, seasonal_periods=SEASONAL_PERIODS, starts=STARTS, maxiter=200):
+    """Ajuste le modèle sur chaque ligne de values (séries x observations)."""
+    values = np.asarray(values, dtype="float64")
+    n_series = values.shape[0]
+    valid = np.flatnonzero((values > 0).all(axis=1))
+    y = values[valid]
+    theta0, scale = _initial_theta(y, seasonal_periods)
+
+    # Meilleurs points de la grille pour chaque série
+    candidates = np.repeat(theta0[None], len(START_GRID), axis=0)
+    candidates[:, :, :3] = logit(START_GRID)[:, None, :]
+    grid_values = np.stack([_objective(candidate, y, scale) for candidate in candidates])
+    best = np.argsort(grid_values, axis=0)[:starts]
+    theta = candidates[best, np.arange(len(valid))].reshape(-1, theta0.shape[1])
+
+    # Les départs multiples sont optimisés comme des séries supplémentaires
+    tiled_y, tiled_scale = np.tile(y, (starts, 1)), np.tile(scale, starts)
+    theta, sse, iterations = _bfgs(lambda t, rows: _objective(t, tiled_y[rows], tiled_scale[rows]), theta, maxiter)
+    choice = np.argmin(sse.reshape(starts, -1), axis=0)
+    theta = theta.reshape(starts, len(valid), -1)[choice, np.arange(len(valid))]
+
+    alpha, beta, gamma, level, trend, season = _unpack(theta, scale)
+    fitted, level, trend, season = smooth(y, alpha, beta, gamma, level, trend, season)
+
+    def expand(array):
+        result = np.full((n_series,) + array.shape[1:], np.nan)
+        result[valid] = array
+        return result
+
+    return HoltWintersFit(alpha=expand(alpha), beta=expand(beta), gamma=expand(gamma),
+                          level=expand(level), trend=expand(trend), season=expand(season),
+                          sse=expand(((y - fitted) ** 2).sum(axis=1)), iterations=iterations)
+
+
+def predict(hw_fit, steps=forecast.FORECAST_STEPS):
+    """Prévisions (séries x steps) à partir des états finaux ajustés."""
+    m = hw_fit.season.shape[1]
+    horizons = np.arange(1, steps + 1)
+    return (hw_fit.level[:, None] * hw_fit.trend[:, None] ** horizons
+            * hw_fit.season[:, (horizons - 1) % m])
+
+
+def forecast_countries(countries=None, steps=forecast.FORECAST_STEPS):
+    """Prévisions Holt-Winters de plusieurs pays (tous par défaut), une colonne par pays."""
+    series = data.country_series()
+    countries = list(series) if countries is None else list(countries)
+    values = np.vstack([series[country].to_numpy() for country in countries])
+    last_date = series[countries[0]].index[-1]
+    dates = pd.date_range(last_date + pd.DateOffset(years=1), periods=steps, freq="YS")
+    return pd.DataFrame(predict(fit(values), steps).T, index=dates, columns=countries)
@@ -0,0 +1,167 @@
+"""Variantes optimisées des images de ressources/.
+
+Chaque PNG/JPEG de ressources/ est redimensionné aux largeurs d'affichage
+(VARIANT_WIDTHS, sans agrandir) et recompressé en WebP ; le format d'origine
+optimisé est gardé quand il est plus léger. Les variantes sont écrites dans
+static/img/, servi tel quel par Streamlit (server.enableStaticServing) : un
+fichier local passé à st.image serait au contraire relu, décodé et réencodé
+en PNG/JPEG à chaque exécution. Les noms de fichiers contiennent une
+empreinte du contenu et le manifeste static/img/manifest.json associe chaque
+image d'origine à ses variantes :
+
+    python -m rechauffement.images [--force]
+
+resolve(path, width) renvoie l'URL de la plus petite variante couvrant la
+largeur affichée, ou path lui-même si les variantes n'ont pas été générées.
+"""
+import argparse
+import hashlib
+import html
+import io
+import json
+import os
+import re
+import time
+
+from rechauffement import data
+
+ROOT_DIR = os.path.dirname(data.RESSOURCES_DIR)
+STATIC_DIR = os.path.join(ROOT_DIR, "static", "img")
+STATIC_URL = "/app/static/img"
+MANIFEST_PATH = os.path.join(STATIC_DIR, "manifest.json")
+EXTENSIONS = (".png", ".jpg", ".jpeg")
+# Largeurs générées (px) ; la largeur par défaut correspond à une colonne
+# principale de la mise en page large, écran à densité 1,5
+VARIANT_WIDTHS = (320, 640, 960, 1440)
+DEFAULT_WIDTH = 960
+WEBP_QUALITY = 85
+
+
+def _read_manifest():
+    with open(MANIFEST_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def manifest():
+    """Chemin relatif de l'image d'origine -> {"width", "height", "bytes", "variants"}."""
+    try:
+        return data.cached(("images", MANIFEST_PATH), MANIFEST_PATH, _read_manifest)
+    except (OSError, ValueError):
+        return {}
+
+
+def _key(path):
+    return os.path.relpath(os.path.abspath(os.path.join(ROOT_DIR, path)), ROOT_DIR).replace(os.sep, "/")
+
+
+def variant(path, width=DEFAULT_WIDTH):
+    """Variante de path (entrée du manifeste) à utiliser pour une largeur affichée, ou None."""
+    entry = manifest().get(_key(path))
+    if not entry:
+        return None
+    variants = entry["variants"]
+    return next((v for v in variants if v["width"] >= width), variants[-1])
+
+
+def resolve(path, width=DEFAULT_WIDTH):
+    """URL de la variante optimisée de path (chemin d'origine si elle n'existe pas)."""
+    chosen = variant(path, width)
+    return path if chosen is None else f"{STATIC_URL}/{chosen['file']}"
+
+
+def lazy_tag(path, width=DEFAULT_WIDTH):
+    """Balise <img loading="lazy"> de la variante de path, ou None sans variante.
+
+    Le navigateur ne télécharge l'image qu'à son affichage (ouverture d'un
+    popover ou d'un expander).
+    """
+    chosen = variant(path, width)
+    if chosen is None:
+        return None
+    return (f'<img src="{STATIC_URL}/{chosen["file"]}" width="{chosen["width"]}" height="{chosen["height"]}" '
+            f'loading="lazy" decoding="async" alt="{html.escape(os.path.basename(path))}" '
+            f'style="width:100%;height:auto;">')
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == "WEBP":
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=6)
+    elif fmt == "JPEG":
+        image.convert("RGB").save(buffer, "JPEG", quality=WEBP_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def build_image(path):
+    """Génère les variantes d'une image ; renvoie son entrée de manifeste."""
+    from PIL import Image
+
+    with Image.open(path) as source:
+        source.load()
+    original_format = "JPEG" if source.format == "JPEG" else "PNG"
+    image = source.convert("RGBA" if source.mode in ("RGBA", "LA", "P") else "RGB")
+    # Nom utilisable tel quel dans une URL (espaces, accents)
+    name = re.sub(r"[^\w-]", "_", os.path.splitext(os.path.basename(path))[0], flags=re.ASCII)
+    widths = sorted({w for w in VARIANT_WIDTHS if w < image.width} | {image.width})
+    variants = []
+    for width in widths:
+        height = round(image.height * width / image.width)
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        candidates = [(_encode(resized, fmt), fmt) for fmt in ("WEBP", original_format)]
+        if width == image.width:
+            with open(path, "rb") as f:
+                candidates.append((f.read(), original_format))
+        content, fmt = min(candidates, key=lambda item: len(item[0]))
+        extension = {"WEBP": "webp", "JPEG": "jpg", "PNG": "png"}[fmt]
+        file = f"{name}.{width}.{hashlib.sha1(content).hexdigest()[:10]}.{extension}"
+        with open(os.path.join(STATIC_DIR, file), "wb") as f:
+            f.write(content)
+        variants.append({"width": width, "height": height, "file": file, "bytes": len(content)})
+    return {"width": image.width, "height": image.height, "bytes": os.path.getsize(path),
+            "source": data.file_hash(path), "variants": variants}
+
+
+def build(force=False):
+    """Génère les variantes de toutes les images de ressources/ ; renvoie le manifeste."""
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    previous = {} if force else manifest()
+    entries = {}
+    for file in sorted(os.listdir(data.RESSOURCES_DIR)):
+        path = os.path.join(data.RESSOURCES_DIR, file)
+        if not file.lower().endswith(EXTENSIONS) or not os.path.isfile(path):
+            continue
+        key = _key(path)
+        entry = previous.get(key)
+        if entry is None or entry["source"] != data.file_hash(path) or not all(
+                os.path.exists(os.path.join(STATIC_DIR, v["file"])) for v in entry["variants"]):
+            entry = build_image(path)
+        entries[key] = entry
+    # Variantes orphelines (image modifiée ou supprimée)
+    kept = {v["file"] for entry in entries.values() for v in entry["variants"]}
+    for file in os.listdir(STATIC_DIR):
+        if file != os.path.basename(MANIFEST_PATH) and file not in kept:
+            os.remove(os.path.join(STATIC_DIR, file))
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère les variantes optimisées des images de ressources/.")
+    parser.add_argument("--force", action="store_true", help="régénère toutes les variantes")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    entries = build(force=args.force)
+    before = sum(entry["bytes"] for entry in entries.values())
+    after = sum(variant(key)["bytes"] for key in entries)
+    print(f"{len(entries)} images en {time.perf_counter() - start:.1f} s : {STATIC_DIR}")
+    print(f"poids à la largeur par défaut ({DEFAULT_WIDTH} px) : {before / 1e6:.2f} Mo -> {after / 1e6:.2f} Mo "
+          f"({after / before - 1:+.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Exécution des prévisions en arrière-plan.
+
+Les ajustements sont soumis à un pool de threads unique, partagé par toutes
+les sessions Streamlit du serveur : le fil d'exécution du script n'attend
+plus l'optimiseur et peut afficher une progression. Une demande identique
+(même clé de cache) à une prévision déjà en cours reçoit le même Future au
+lieu de relancer le calcul.
+
+Un ajustement en échec est renvoyé tel quel pendant FAILED_TTL secondes
+(au plus MAX_FAILED échecs conservés), puis relancé à la demande suivante.
+
+Un pool de processus n'est pas utilisable ici : Streamlit remplace le module
+__main__ par le script de l'application, que chaque processus lancé en
+mode spawn réexécuterait. Le calcul massif reste le rôle de
+rechauffement.batch.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+
+from rechauffement import data, forecast, timing
+
+_lock = threading.Lock()
+_pool = None
+_inflight = {}
+# Échecs d'ajustement : clé -> (instant de l'échec, Future), du plus ancien au plus récent
+_failed = OrderedDict()
+FAILED_TTL = 300.0
+MAX_FAILED = 256
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="forecast")
+    return _pool
+
+
+def _finished(key, future):
+    with _lock:
+        _inflight.pop(key, None)
+        if not future.cancelled() and future.exception() is not None:
+            _failed[key] = (time.monotonic(), future)
+            _failed.move_to_end(key)
+            while len(_failed) > MAX_FAILED:
+                _failed.popitem(last=False)
+
+
+def _pending(key):
+    """Future en cours ou échec récent pour key (à appeler sous _lock), None sinon."""
+    future = _inflight.get(key)
+    if future is not None:
+        return future
+    failed = _failed.get(key)
+    if failed is None:
+        return None
+    if time.monotonic() - failed[0] > FAILED_TTL:
+        del _failed[key]  # échec expiré : l'ajustement sera relancé
+        return None
+    return failed[1]
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def submit(country, model, steps=forecast.FORECAST_STEPS):
+    """Future de la prévision de model pour country (déjà terminé si elle est en cache)."""
+    with timing.span("prediction.filter", model=model):
+        series = data.country_series()[country]
+        key = forecast.forecast_key(country, model, series, steps)
+    with _lock:
+        future = _pending(key)
+        if future is not None:
+            return future
+    missing = object()
+    cached = forecast.forecast_cache.get(key, missing, record_miss=False)
+    if cached is not missing:
+        return _done(cached)
+    precomputed = forecast.load_precomputed().get(key)
+    if precomputed is not None:
+        forecast.forecast_cache.put(key, precomputed)
+        return _done(precomputed)
+    with _lock:
+        future = _pending(key)
+        if future is not None:
+            return future
+        future = _executor().submit(forecast.forecast, country, model, steps)
+        _inflight[key] = future
+    # Hors du verrou : un Future déjà terminé exécute _finished immédiatement, dans ce thread
+    future.add_done_callback(partial(_finished, key))
+    return future
+
+
+def submit_all(country, steps=forecast.FORECAST_STEPS):
+    """Futures des prévisions de tous les modèles pour country."""
+    return {model: submit(country, model, steps) for model in forecast.MODELS}
+
+
+def inflight():
+    """Nombre de prévisions en cours de calcul."""
+    with _lock:
+        return len(_inflight)
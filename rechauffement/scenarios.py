@@ -0,0 +1,148 @@
+"""Simulation de scénarios d'émissions : anomalies YANOT recalculées quand les émissions changent.
+
+Modèle de substitution linéaire, ajusté sur FIRST_YEAR-LAST_YEAR (période
+des modèles supervisés) : pour chaque pays c,
+
+    YANOT = a_c + somme_k b_ck * z_k        z_k = variable DRIVERS[k] / écart-type
+
+Les pentes b_c sont celles de l'ensemble des pays (régression à effets
+fixes pays, pentes positives), corrigées pour chaque pays par une
+régression ridge rappelée vers ces pentes communes (SHRINKAGE) : les pays à
+série courte ou bruitée gardent une réponse proche de la réponse moyenne.
+Une hausse des émissions ne peut pas refroidir un pays (pentes ramenées à
+0 au besoin). Tous les pays sont ajustés ensemble, par des systèmes K x K
+empilés.
+
+Un scénario multiplie chaque variable par un facteur, pour les pays
+choisis, progressivement à partir d'une année de départ (facteur 1 cette
+année-là, facteur plein en LAST_YEAR). L'effet passe par deux voies :
+  - directe : variables modifiées des pays choisis, par leurs pentes ;
+  - atmosphérique : les émissions supplémentaires (ou évitées) des pays
+    choisis s'accumulent dans l'atmosphère (AIRBORNE_FRACTION des
+    émissions, MT_CO2_PER_PPM Mt d'équivalent CO2 par ppm) et modifient
+    AtmCO2 pour tous les pays. total_ghg comprend déjà co2 et methane :
+    ces curseurs ne sont pas destinés à être combinés.
+
+Le modèle étant linéaire, les deux voies sont des produits matriciels
+pays x années x variables par les pentes. La matrice de conception z, les
+coefficients et la prédiction de référence sont calculés une fois par
+version du dataset : un déplacement de curseur ne coûte que ces produits
+(moins d'une milliseconde pour tous les pays).
+"""
+import numpy as np
+import pandas as pd
+from scipy.optimize import nnls
+
+from rechauffement import data
+
+TARGET = "YANOT"
+DRIVERS = ["co2", "methane", "total_ghg", "AtmCO2"]
+# Variables émises (Mt d'équivalent CO2) et concentration atmosphérique (ppm)
+EMISSIONS = ["co2", "methane", "total_ghg"]
+ATMOSPHERIC = "AtmCO2"
+# Part des émissions restant dans l'atmosphère, et masse de CO2 pour 1 ppm
+AIRBORNE_FRACTION = 0.45
+MT_CO2_PER_PPM = 7782.0
+FIRST_YEAR, LAST_YEAR = 1988, 2022
+# Rappel des pentes de chaque pays vers les pentes communes (en nombre d'observations)
+SHRINKAGE = 10.0
+COLUMNS = ["Name_FR", "Continent_FR", "YEAR", TARGET, *DRIVERS]
+
+
+def _dense(frame, countries, years, column):
+    values = np.full((len(countries), len(years)), np.nan)
+    values[frame["country"], frame["year"]] = frame[column].to_numpy(dtype="float64")
+    return values
+
+
+def fit(design, target, shrinkage=SHRINKAGE):
+    """Ordonnées à l'origine (pays) et pentes (pays x variables) du modèle ; design : pays x années x variables."""
+    valid = ~np.isnan(target) & ~np.isnan(design).any(axis=2)
+    weights = valid.astype("float64")
+    count = np.maximum(weights.sum(axis=1), 1)
+    z = np.where(valid[..., None], design, 0)
+    y = np.where(valid, target, 0)
+    # Écarts aux moyennes de chaque pays (effets fixes)
+    z_mean = z.sum(axis=1) / count[:, None]
+    y_mean = y.sum(axis=1) / count
+    z_centered = (z - z_mean[:, None, :]) * weights[..., None]
+    y_centered = (y - y_mean[:, None]) * weights
+    gram = np.einsum("cyi,cyj->cij", z_centered, z_centered)
+    moment = np.einsum("cyi,cy->ci", z_centered, y_centered)
+    # Pentes communes positives : les variables étant très corrélées, des
+    # moindres carrés libres donnent des signes opposés qui se compensent
+    common, _ = nnls(z_centered.reshape(-1, design.shape[2]), y_centered.ravel())
+    residual = moment - gram @ common
+    correction = np.linalg.solve(gram + shrinkage * np.eye(design.shape[2]), residual[..., None])[..., 0]
+    slopes = np.maximum(common + correction, 0)
+    intercepts = y_mean - np.einsum("ck,ck->c", z_mean, slopes)
+    return intercepts, slopes
+
+
+def _build(path):
+    frame = data.load_dataset(path, COLUMNS)
+    frame = frame[frame["YEAR"].between(FIRST_YEAR, LAST_YEAR)]
+    countries, country = np.unique(frame["Name_FR"].to_numpy(dtype=str), return_inverse=True)
+    years, year = np.unique(frame["YEAR"].to_numpy(), return_inverse=True)
+    indexed = pd.DataFrame({"country": country, "year": year})
+    indexed[DRIVERS + [TARGET]] = frame[DRIVERS + [TARGET]].to_numpy(dtype="float64")
+    raw = np.stack([_dense(indexed, countries, years, column) for column in DRIVERS], axis=2)
+    scale = np.nanstd(raw, axis=(0, 1))
+    design = raw / scale
+    observed = _dense(indexed, countries, years, TARGET)
+    intercepts, slopes = fit(design, observed)
+    baseline = intercepts[:, None] + np.einsum("cyk,ck->cy", design, slopes)
+    continent = frame.groupby("Name_FR", observed=True)["Continent_FR"].first()
+    valid = ~np.isnan(observed) & ~np.isnan(baseline)
+    return {"countries": countries, "years": years, "continents": continent.reindex(countries).to_numpy(dtype=str),
+            "design": design, "scale": scale, "slopes": slopes, "baseline": baseline, "observed": observed,
+            "rmse": float(np.sqrt(np.mean((observed[valid] - baseline[valid]) ** 2)))}
+
+
+def model(path=data.DATASET_PATH):
+    """Matrice de conception, coefficients et prédiction de référence (calculés une fois par version du dataset)."""
+    return data.cached(("scenarios", path), path, lambda: _build(path))
+
+
+def ramp(years, start_year):
+    """Part du facteur appliquée chaque année : 0 jusqu'à start_year, 1 en dernière année."""
+    years = np.asarray(years, dtype="float64")
+    span = max(years[-1] - start_year, 1)
+    return np.clip((years - start_year) / span, 0, 1)
+
+
+def simulate(factors, countries=None, start_year=2000, path=data.DATASET_PATH):
+    """Anomalies (centièmes de °C, pays x années) de référence et du scénario.
+
+    factors : variable de DRIVERS -> facteur multiplicatif (1 : inchangé) ;
+    countries : pays (Name_FR) concernés, tous par défaut.
+    """
+    arrays = model(path)
+    design, slopes, scale = arrays["design"], arrays["slopes"], arrays["scale"]
+    change = np.array([factors.get(driver, 1.0) - 1.0 for driver in DRIVERS])
+    selected = np.ones(len(arrays["countries"]))
+    if countries is not None:
+        selected = np.isin(arrays["countries"], list(countries)).astype("float64")
+    weight = ramp(arrays["years"], start_year)
+    design = np.nan_to_num(design)
+    # Voie directe : (pays x années x variables) . (pays x variables)
+    direct = np.einsum("cyk,ck->cy", design, slopes * change * selected[:, None]) * weight
+    # Voie atmosphérique : émissions modifiées (Mt) cumulées, converties en ppm
+    emitted = np.isin(DRIVERS, EMISSIONS)
+    extra = np.einsum("cyk,k,c->y", design[:, :, emitted], (change * scale)[emitted], selected) * weight
+    atmospheric = AIRBORNE_FRACTION * np.cumsum(extra) / MT_CO2_PER_PPM / scale[DRIVERS.index(ATMOSPHERIC)]
+    indirect = np.outer(slopes[:, DRIVERS.index(ATMOSPHERIC)], atmospheric)
+    return arrays["baseline"], arrays["baseline"] + direct + indirect
+
+
+def countries_of(continents, path=data.DATASET_PATH):
+    """Pays (Name_FR) des continents donnés."""
+    arrays = model(path)
+    return arrays["countries"][np.isin(arrays["continents"], list(continents))].tolist()
+
+
+def region_frame(values, countries=None, path=data.DATASET_PATH):
+    """Moyenne annuelle de values (pays x années) sur countries (tous par défaut), indexée par YEAR."""
+    arrays = model(path)
+    rows = slice(None) if countries is None else np.isin(arrays["countries"], list(countries))
+    return pd.Series(np.nanmean(values[rows], axis=0), index=pd.Index(arrays["years"], name="YEAR"))
@@ -0,0 +1,115 @@
+"""Instantanés colonnaires (Feather / Arrow IPC) des CSV de ressources/.
+
+Un instantané est écrit sans compression pour pouvoir être projeté en
+mémoire (memory map) : seules les colonnes demandées sont lues et les
+colonnes numériques sont exposées sans copie. L'empreinte du CSV source est
+enregistrée dans les métadonnées du fichier ; un instantané dont la source a
+changé est considéré comme périmé et le chargeur retombe sur le CSV.
+
+Construction de tous les instantanés :
+
+    python -m rechauffement.snapshot
+"""
+import argparse
+import json
+import os
+import time
+
+from rechauffement import data
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow est optionnel : on lit alors directement les CSV
+    pa = None
+
+SNAPSHOT_DIR = os.path.join(data.CACHE_DIR, "snapshot")
+METADATA_KEY = b"rechauffement.source"
+
+# CSV convertis par la commande de construction, avec leur fonction de lecture.
+# Les MONDE*.csv n'en font pas partie : ce sont des sorties de
+# rechauffement.world, l'application lit les séries de world.load.
+SOURCES = {
+    data.DATASET_PATH: data.read_dataset_csv,
+}
+
+
+def snapshot_path(csv_path):
+    """Chemin de l'instantané associé à un CSV."""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(SNAPSHOT_DIR, f"{name}.feather")
+
+
+def _source_metadata(csv_path):
+    mtime_ns, size = data.file_signature(csv_path)
+    return {"sha1": data.file_hash(csv_path), "mtime_ns": mtime_ns, "size": size}
+
+
+def is_fresh(csv_path):
+    """Vrai si l'instantané existe et correspond au contenu actuel du CSV."""
+    path = snapshot_path(csv_path)
+    if pa is None or not os.path.exists(path):
+        return False
+    try:
+        with pa.memory_map(path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+    if METADATA_KEY not in metadata:
+        return False
+    recorded = json.loads(metadata[METADATA_KEY])
+    # Signature identique : inutile de relire le CSV pour le hacher
+    if (recorded["mtime_ns"], recorded["size"]) == data.file_signature(csv_path):
+        return True
+    return recorded["sha1"] == data.file_hash(csv_path)
+
+
+def write_snapshot(csv_path, frame):
+    """Écrit l'instantané de frame (lu depuis csv_path) de façon atomique."""
+    if pa is None:
+        return None
+    path = snapshot_path(csv_path)
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    table = pa.Table.from_pandas(frame)
+    metadata = dict(table.schema.metadata or {})
+    metadata[METADATA_KEY] = json.dumps(_source_metadata(csv_path)).encode()
+    table = table.replace_schema_metadata(metadata)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_snapshot(csv_path, columns=None):
+    """Lit l'instantané de csv_path (colonnes choisies), ou None s'il est absent ou périmé."""
+    if not is_fresh(csv_path):
+        return None
+    table = feather.read_table(snapshot_path(csv_path), columns=columns, memory_map=True)
+    # split_blocks évite la consolidation en blocs 2-D, donc la copie des colonnes numériques
+    return table.to_pandas(split_blocks=True)
+
+
+def build_all(force=False):
+    """Construit les instantanés manquants ou périmés ; renvoie les chemins écrits."""
+    written = []
+    for csv_path, reader in SOURCES.items():
+        if force or not is_fresh(csv_path):
+            written.append(write_snapshot(csv_path, reader(csv_path)))
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construit les instantanés Feather des CSV de ressources/.")
+    parser.add_argument("--force", action="store_true", help="reconstruit même les instantanés à jour")
+    args = parser.parse_args(argv)
+    if pa is None:
+        parser.error("pyarrow n'est pas installé")
+    start = time.perf_counter()
+    written = build_all(force=args.force)
+    for path in written:
+        print(f"écrit : {path}")
+    print(f"{len(written)} instantané(s) construit(s) en {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""Ingestion du fichier brut des stations GISS v4 (GHCN-M v4) en températures annuelles par pays.
+
+Le fichier est au format à largeur fixe de GHCN-M v4 (.dat, éventuellement
+compressé en .gz) : une ligne de 115 caractères par station et par année,
+
+    ID (11) YEAR (4) ELEMENT (4) puis 12 x [VALUE (5) DMFLAG QCFLAG DSFLAG]
+
+les valeurs étant en centièmes de °C (-9999 : manquante). Les deux premiers
+caractères de ID sont le code FIPS 10-4 du pays de la station.
+
+Le fichier est lu par blocs de CHUNK_LINES lignes, sans passer par un
+lecteur CSV : chaque bloc est vu comme une matrice d'octets dont on ne
+décode que les colonnes utiles (identifiant, année, élément, valeurs et
+drapeaux de contrôle qualité, soit 17 des 51 champs). Les lignes d'une
+station étant consécutives (fichier trié par ID), la dernière station d'un
+bloc est reportée sur le bloc suivant, ce qui permet d'appliquer le filtre
+d'homogénéisation par station sans tout charger :
+
+  - seules les lignes TAVG sont lues ; une valeur dont le drapeau QCFLAG
+    est renseigné est considérée comme manquante ;
+  - les stations de moins de MIN_YEARS années d'enregistrement sont
+    écartées ;
+  - le code FIPS est converti en code ISO par ressources/fips_iso.csv
+    (plusieurs codes FIPS peuvent être rattachés au même pays).
+
+Les valeurs retenues sont cumulées par (pays, année, mois) ; la moyenne
+mensuelle des stations du pays donne, sur les 12 mois, la température
+annuelle YAVGT (année écartée s'il manque un mois). Ces sommes étant
+additives, le fichier est découpé en tranches alignées sur les stations,
+traitées en parallèle par un pool de processus ; la mémoire utilisée ne
+dépend que de la taille des blocs, pas de celle du fichier.
+
+    python -m rechauffement.stations v4.mean_GISS_homogenized.txt [--workers N] [--since 2023] [--output annees.csv]
+
+Le CSV produit (Code_ISO;YEAR;YAVGT;stations) s'ajoute au dataset par
+python -m rechauffement.features annees.csv. Le débit et la mémoire
+maximale sont affichés et enregistrés dans ressources/cache/stations.json.
+"""
+import argparse
+import gzip
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from rechauffement import data
+
+try:
+    import resource
+except ImportError:  # Windows : mémoire maximale non mesurée
+    resource = None
+
+FIPS_PATH = os.path.join(data.RESSOURCES_DIR, "fips_iso.csv")
+OUTPUT_PATH = os.path.join(data.CACHE_DIR, "stations.csv")
+REPORT_PATH = os.path.join(data.CACHE_DIR, "stations.json")
+
+LINE_LENGTH = 116  # 115 caractères et le saut de ligne
+ID_WIDTH = 11
+YEAR_COLUMNS = np.arange(11, 15)
+ELEMENT_COLUMNS = slice(15, 19)
+ELEMENT = b"TAVG"
+# Positions des 5 caractères de VALUE et du drapeau QCFLAG de chaque mois
+VALUE_COLUMNS = 19 + 8 * np.arange(12)[:, None] + np.arange(5)
+QC_COLUMNS = 19 + 8 * np.arange(12) + 6
+MISSING = -9999
+
+MIN_YEARS = 20
+MIN_MONTHS = 12
+CHUNK_LINES = 100_000
+# Années couvertes par les tableaux de cumul
+FIRST_YEAR, LAST_YEAR = 1700, 2099
+
+
+def read_fips(path=FIPS_PATH):
+    """Correspondance code FIPS -> ISO_2 (« NA » est un code, pas une valeur manquante)."""
+    table = pd.read_csv(path, sep=";", dtype=str, keep_default_na=False)
+    return dict(zip(table["FIPS"], table["ISO_2"]))
+
+
+def _parse_int(lines, columns):
+    """Entiers écrits dans les colonnes columns (..., largeur) de lines, cadrés à droite.
+
+    Un chiffre à la fois sur des entiers 32 bits : la mémoire de travail
+    reste de l'ordre de la taille du bloc.
+    """
+    magnitude = np.zeros((len(lines),) + columns.shape[:-1], dtype="int32")
+    negative = np.zeros(magnitude.shape, dtype=bool)
+    for position in range(columns.shape[-1]):
+        digit = lines[:, columns[..., position]].astype("int32")
+        negative |= digit == ord("-")
+        digit -= ord("0")
+        magnitude *= 10
+        magnitude += np.where((digit >= 0) & (digit <= 9), digit, 0)
+    return np.where(negative, -magnitude, magnitude)
+
+
+def partitions(path, parts):
+    """Tranches (début, fin) en octets de path, alignées sur les lignes et les stations."""
+    size = os.path.getsize(path)
+    if path.endswith(".gz") or parts <= 1 or size < 2 * LINE_LENGTH:
+        return [(0, None)]  # flux compressé : pas d'accès direct, une seule tranche
+    bounds = [0]
+    with open(path, "rb") as f:
+        for k in range(1, parts):
+            offset = max(size * k // parts // LINE_LENGTH * LINE_LENGTH, bounds[-1])
+            f.seek(offset)
+            previous = f.read(ID_WIDTH)
+            # Avance jusqu'à la première ligne d'une autre station
+            while True:
+                offset += LINE_LENGTH
+                f.seek(offset)
+                station = f.read(ID_WIDTH)
+                if station != previous:
+                    break
+            if offset >= size:
+                break
+            bounds.append(offset)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _chunks(path, start, end, chunk_lines):
+    """Blocs d'octets de path entre start et end (end None : jusqu'à la fin du fichier)."""
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            yield from iter(lambda: f.read(chunk_lines * LINE_LENGTH), b"")
+        return
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = (os.path.getsize(path) if end is None else end) - start
+        while remaining > 0:
+            block = f.read(min(chunk_lines * LINE_LENGTH, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def read_blocks(path, start=0, end=None, chunk_lines=CHUNK_LINES):
+    """Lignes TAVG de path par blocs de stations complètes.
+
+    Chaque bloc est un dict : ids (S11, une entrée par ligne), years,
+    values (n x 12, centièmes de °C, NaN si manquante ou rejetée par le
+    contrôle qualité) et rows (lignes lues, tous éléments confondus).
+    """
+    pending = b""
+    last_id = b""
+    # None signale la fin de la tranche : la dernière station est alors complète
+    for chunk in itertools.chain(_chunks(path, start, end, chunk_lines), [None]):
+        buffer = pending + (chunk or b"")
+        if chunk is None and buffer and len(buffer) % LINE_LENGTH == LINE_LENGTH - 1:
+            buffer += b"\n"  # dernière ligne sans saut de ligne
+        complete = len(buffer) - len(buffer) % LINE_LENGTH
+        if chunk is None and complete != len(buffer):
+            raise ValueError(f"{path} : ligne incomplète en fin de fichier")
+        lines = np.frombuffer(buffer, dtype="uint8", count=complete).reshape(-1, LINE_LENGTH)
+        if (lines[:, -1] != ord("\n")).any():
+            raise ValueError(f"{path} : lignes de longueur inattendue (format GHCN-M v4 .dat attendu)")
+        ids = np.ascontiguousarray(lines[:, :ID_WIDTH]).view(f"S{ID_WIDTH}").ravel()
+        cut = len(lines)
+        if chunk is not None and len(lines):
+            # La dernière station peut se poursuivre dans le bloc suivant
+            cut = int(np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])[-1])
+        pending = buffer[cut * LINE_LENGTH:]
+        if cut == 0:
+            continue
+        lines, ids = lines[:cut], ids[:cut]
+        if ids[0] < last_id or (ids[1:] < ids[:-1]).any():
+            raise ValueError(f"{path} : fichier non trié par station")
+        last_id = ids[-1]
+        tavg = (np.ascontiguousarray(lines[:, ELEMENT_COLUMNS]).view("S4").ravel() == ELEMENT)
+        lines = lines[tavg]
+        values = _parse_int(lines, VALUE_COLUMNS).astype("float64")
+        values[(values == MISSING) | (lines[:, QC_COLUMNS] != ord(" "))] = np.nan
+        yield {"ids": ids[tavg], "years": _parse_int(lines, YEAR_COLUMNS), "values": values, "rows": cut}
+
+
+def aggregate(path, start=0, end=None, countries=(), fips=None, min_years=MIN_YEARS, chunk_lines=CHUNK_LINES):
+    """Cumuls par (pays, année, mois) des stations retenues d'une tranche de path.
+
+    countries : codes ISO_2 dans l'ordre des indices de pays ; fips : FIPS -> ISO_2.
+    Renvoie les cumuls non nuls (indices à plat, sommes, effectifs), le
+    nombre de stations par (pays, année) et les compteurs de la tranche.
+    """
+    fips = read_fips() if fips is None else fips
+    country_index = {iso: i for i, iso in enumerate(countries)}
+    fips_index = {code.encode(): country_index.get(iso, -1) for code, iso in fips.items()}
+    years_count = LAST_YEAR - FIRST_YEAR + 1
+    cells = len(countries) * years_count
+    sums, counts = np.zeros((cells, 12)), np.zeros((cells, 12), dtype="int64")
+    stations = np.zeros(cells, dtype="int64")
+    stats = {"rows": 0, "tavg_rows": 0, "stations": 0, "retained": 0, "unmapped": {}}
+
+    for block in read_blocks(path, start, end, chunk_lines):
+        ids, years, values = block["ids"], block["years"], block["values"]
+        stats["rows"] += block["rows"]
+        stats["tavg_rows"] += len(ids)
+        if not len(ids):
+            continue
+        first = np.r_[True, ids[1:] != ids[:-1]]
+        station = np.cumsum(first) - 1
+        valid = ~np.isnan(values)
+        recorded = valid.any(axis=1)
+        # Filtre d'homogénéisation : années d'enregistrement par station
+        retained = np.bincount(station, weights=recorded) >= min_years
+        codes, inverse = np.unique(ids.astype("S2"), return_inverse=True)
+        country = np.array([fips_index.get(code, -1) for code in codes])[inverse]
+        stats["stations"] += int(first.sum())
+        stats["retained"] += int(retained.sum())
+        unmapped = ids[first].astype("S2")[retained & (country[first] < 0)]
+        for code, count in zip(*np.unique(unmapped, return_counts=True)):
+            stats["unmapped"][code.decode()] = stats["unmapped"].get(code.decode(), 0) + int(count)
+
+        keep = retained[station] & recorded & (country >= 0) & (years >= FIRST_YEAR) & (years <= LAST_YEAR)
+        cell = country[keep] * years_count + (years[keep] - FIRST_YEAR)
+        stations += np.bincount(cell, minlength=cells)
+        values, valid = values[keep], valid[keep]
+        for month in range(12):
+            present = valid[:, month]
+            sums[:, month] += np.bincount(cell[present], weights=values[present, month], minlength=cells)
+            counts[:, month] += np.bincount(cell[present], minlength=cells)
+
+    # Indices à plat (pays, année, mois) des cumuls non nuls
+    sums, counts = sums.ravel(), counts.ravel()
+    nonzero = np.flatnonzero(counts)
+    stats["max_rss"] = _max_rss()
+    return {"cells": nonzero, "sums": sums[nonzero], "counts": counts[nonzero],
+            "station_cells": np.flatnonzero(stations), "stations": stations[stations > 0], "stats": stats}
+
+
+def _max_rss():
+    """Mémoire résidente maximale du processus (octets), None si non mesurable."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def country_codes(path=data.DATASET_PATH):
+    """Code_ISO par ISO_2 des pays du dataset."""
+    frame = data.load_dataset(path, ["Code_ISO", "ISO_2"]).drop_duplicates("ISO_2")
+    return dict(zip(frame["ISO_2"].astype(str), frame["Code_ISO"].astype("int64")))
+
+
+def ingest(path, workers=None, min_years=MIN_YEARS, min_months=MIN_MONTHS, chunk_lines=CHUNK_LINES,
+           fips_path=FIPS_PATH, dataset_path=data.DATASET_PATH):
+    """(table Code_ISO, YEAR, YAVGT, stations, rapport) des températures annuelles par pays de path."""
+    start = time.perf_counter()
+    fips = read_fips(fips_path)
+    codes = country_codes(dataset_path)
+    countries = sorted(set(fips.values()))
+    workers = workers or os.cpu_count()
+    # Plus de tranches que de processus : équilibre la charge entre pays de tailles différentes
+    slices = partitions(path, 4 * workers if workers > 1 else 1)
+    years_count = LAST_YEAR - FIRST_YEAR + 1
+    sums = np.zeros(len(countries) * years_count * 12)
+    counts = np.zeros(len(sums), dtype="int64")
+    stations = np.zeros(len(countries) * years_count, dtype="int64")
+    stats = {"rows": 0, "tavg_rows": 0, "stations": 0, "retained": 0, "unmapped": {}}
+    peak = []
+    if len(slices) == 1:
+        results = [aggregate(path, *slices[0], countries, fips, min_years, chunk_lines)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(aggregate, path, begin, end, countries, fips, min_years, chunk_lines)
+                       for begin, end in slices]
+            results = [future.result() for future in futures]
+    for result in results:
+        sums[result["cells"]] += result["sums"]
+        counts[result["cells"]] += result["counts"]
+        stations[result["station_cells"]] += result["stations"]
+        for key in ("rows", "tavg_rows", "stations", "retained"):
+            stats[key] += result["stats"][key]
+        for code, count in result["stats"]["unmapped"].items():
+            stats["unmapped"][code] = stats["unmapped"].get(code, 0) + count
+        peak.append(result["stats"]["max_rss"])
+
+    # Moyenne des stations par mois, puis des 12 mois par année
+    with np.errstate(invalid="ignore"):
+        monthly = (sums / counts).reshape(len(countries), years_count, 12)
+    months = (counts > 0).reshape(len(countries), years_count, 12).sum(axis=2)
+    country, year = np.nonzero(months >= min_months)
+    iso = np.array(countries)[country]
+    known = np.isin(iso, list(codes))
+    table = pd.DataFrame({"Code_ISO": [codes[code] for code in iso[known]],
+                          "YEAR": year[known] + FIRST_YEAR,
+                          "YAVGT": np.nanmean(monthly[country[known], year[known]], axis=1).round(2),
+                          "stations": stations.reshape(len(countries), years_count)[country[known], year[known]]})
+    table = table.sort_values(["Code_ISO", "YEAR"], ignore_index=True)
+
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(path)
+    peak = [value for value in peak if value is not None]
+    report = {"source": os.path.basename(path), "bytes": size, "rows": stats["rows"], "tavg_rows": stats["tavg_rows"],
+              "stations": stats["stations"], "retained_stations": stats["retained"],
+              "unmapped_fips": dict(sorted(stats["unmapped"].items())),
+              "countries_outside_dataset": sorted(set(iso[~known].tolist())),
+              "countries": int(table["Code_ISO"].nunique()), "country_years": len(table),
+              "min_years": min_years, "min_months": min_months, "workers": workers, "slices": len(slices),
+              "seconds": seconds, "rows_per_second": stats["rows"] / seconds, "mb_per_second": size / 1e6 / seconds,
+              "max_rss_mb": max(peak) / 1e6 if peak else None,
+              "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+    return table, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Températures annuelles par pays depuis le fichier des stations GISS v4.")
+    parser.add_argument("source", help="fichier GHCN-M v4 / GISS v4 (.dat ou .txt, éventuellement .gz)")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="CSV écrit (Code_ISO;YEAR;YAVGT;stations)")
+    parser.add_argument("--since", type=int, help="première année écrite (années à ajouter au dataset)")
+    parser.add_argument("--workers", type=int, default=None, help="nombre de processus (défaut : tous les cœurs)")
+    parser.add_argument("--min-years", type=int, default=MIN_YEARS, help="années d'enregistrement minimales par station")
+    parser.add_argument("--min-months", type=int, default=MIN_MONTHS, help="mois renseignés minimaux par année")
+    parser.add_argument("--chunk-lines", type=int, default=CHUNK_LINES, help="lignes lues par bloc")
+    parser.add_argument("--fips", default=FIPS_PATH, help="correspondance FIPS;ISO_2")
+    args = parser.parse_args(argv)
+    if not os.path.isfile(args.source):
+        parser.error(f"fichier introuvable : {args.source}")
+    if not 1 <= args.min_months <= 12:
+        parser.error("--min-months doit être compris entre 1 et 12")
+
+    table, report = ingest(args.source, args.workers, args.min_years, args.min_months, args.chunk_lines, args.fips)
+    if args.since is not None:
+        table = table[table["YEAR"] >= args.since]
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    table.to_csv(args.output, sep=";", index=False, float_format="%.2f")
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"{report['rows']} lignes ({report['bytes'] / 1e6:.0f} Mo) en {report['seconds']:.1f} s "
+          f"({report['workers']} processus, {report['slices']} tranche(s)) : "
+          f"{report['rows_per_second']:.0f} lignes/s, {report['mb_per_second']:.1f} Mo/s")
+    memory = "non mesurée" if report["max_rss_mb"] is None else f"{report['max_rss_mb']:.0f} Mo"
+    print(f"mémoire maximale par processus : {memory}")
+    print(f"stations : {report['stations']}, dont {report['retained_stations']} avec au moins "
+          f"{report['min_years']} années d'enregistrement")
+    if report["unmapped_fips"]:
+        print(f"codes FIPS sans correspondance ISO : {report['unmapped_fips']}")
+    if report["countries_outside_dataset"]:
+        print(f"pays absents du dataset : {', '.join(report['countries_outside_dataset'])}")
+    print(f"{len(table)} années-pays ({table['Code_ISO'].nunique()} pays) écrites : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
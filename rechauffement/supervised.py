@@ -0,0 +1,143 @@
+"""Entraînement des modèles supervisés de la page « Modèles supervisés ».
+
+Reprend la préparation décrite sur la page « Preprocessing » :
+  - période 1988-2022 ;
+  - variables numériques (émissions, population, PIB, CO2 atmosphérique et
+    indices de températures décalés de -5 et -10 ans) transformées par
+    RobustScaler sur l'ensemble de la période, cible YANOT comprise ;
+  - jeu d'entraînement 1988-2015, jeu de test 2016-2022.
+
+Chaque modèle est optimisé par validation croisée (GridSearchCV sur tous les
+cœurs). Les modèles ajustés et leurs métriques sont mis en cache sur disque
+et en mémoire, par empreinte du dataset et de la configuration ; la commande
+suivante les pré-calcule (lancée à la création du Dev Container) pour que la
+page n'ait pas à les entraîner :
+
+    python -m rechauffement.supervised      # entraîne et affiche les métriques
+"""
+import argparse
+import os
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import ElasticNet, Lasso, LinearRegression
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import GridSearchCV, KFold
+from sklearn.preprocessing import RobustScaler
+from sklearn.tree import DecisionTreeRegressor
+
+from rechauffement import data
+from rechauffement.cache import make_key
+
+TARGET = "YANOT"
+FEATURES = ["population", "gdp", "cement_co2", "co2", "coal_co2", "gas_co2", "methane",
+            "nitrous_oxide", "oil_co2", "total_ghg", "total_ghg_excluding_lucf", "AtmCO2",
+            "YAVGT-10", "YANOT-10", "YAVGT-5", "YANOT-5"]
+FIRST_YEAR, SPLIT_YEAR, LAST_YEAR = 1988, 2015, 2022
+CV_FOLDS = 5
+
+# Libellé affiché -> (estimateur, grille d'hyperparamètres)
+MODELS = {
+    "Régression linéaire": (LinearRegression(), {}),
+    "Régression par arbres décisionnels": (DecisionTreeRegressor(random_state=0),
+                                           {"max_depth": [None, 5, 10, 20], "min_samples_leaf": [1, 5, 20]}),
+    "Régression Lasso": (Lasso(max_iter=10000),
+                         {"alpha": [1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0]}),
+    "Régression ElasticNet": (ElasticNet(max_iter=10000),
+                              {"alpha": [1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0], "l1_ratio": [0.1, 0.5, 0.9, 1.0]}),
+}
+
+CACHE_DIR = os.path.join(data.CACHE_DIR, "supervised")
+
+
+def prepare(dataset):
+    """Jeux d'entraînement et de test (X_train, X_test, y_train, y_test) mis à l'échelle."""
+    frame = dataset[(dataset["YEAR"] >= FIRST_YEAR) & (dataset["YEAR"] <= LAST_YEAR)]
+    columns = FEATURES + [TARGET]
+    scaled = pd.DataFrame(RobustScaler().fit_transform(frame[columns].astype("float64")),
+                          columns=columns, index=frame.index)
+    train = (frame["YEAR"] <= SPLIT_YEAR).to_numpy()
+    return (scaled.loc[train, FEATURES], scaled.loc[~train, FEATURES],
+            scaled.loc[train, TARGET], scaled.loc[~train, TARGET])
+
+
+def metrics(y_true, y_pred):
+    return {"RMSE": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+            "MAE": float(mean_absolute_error(y_true, y_pred)),
+            "R2": float(r2_score(y_true, y_pred))}
+
+
+def train(name, X_train, X_test, y_train, y_test, n_jobs=-1):
+    """Optimise et évalue un modèle ; renvoie un dictionnaire de résultats picklable."""
+    estimator, grid = MODELS[name]
+    search = GridSearchCV(estimator, grid, cv=KFold(CV_FOLDS, shuffle=True, random_state=0),
+                          scoring="neg_root_mean_squared_error", n_jobs=n_jobs)
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        # Les plus petits alpha de la grille convergent lentement ; ils restent candidats
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        search.fit(X_train, y_train)
+    model = search.best_estimator_
+    if hasattr(model, "feature_importances_"):
+        weights = model.feature_importances_
+    else:
+        weights = model.coef_
+    return {"model": model,
+            "best_params": search.best_params_,
+            "train": metrics(y_train, model.predict(X_train)),
+            "test": metrics(y_test, model.predict(X_test)),
+            "predictions": pd.DataFrame({"Valeurs réelles": y_test.to_numpy(),
+                                         "Prédictions": model.predict(X_test)}),
+            "weights": pd.Series(weights, index=FEATURES).sort_values(key=np.abs, ascending=False),
+            "seconds": time.perf_counter() - start}
+
+
+def _config_key(path):
+    grids = {name: (type(estimator).__name__, grid) for name, (estimator, grid) in MODELS.items()}
+    return make_key("supervised", data.file_hash(path), FEATURES, TARGET,
+                    FIRST_YEAR, SPLIT_YEAR, LAST_YEAR, CV_FOLDS, grids)
+
+
+def _train_all(path):
+    cache_path = os.path.join(CACHE_DIR, f"{_config_key(path)}.joblib")
+    try:
+        return joblib.load(cache_path)
+    except Exception:  # absent, tronqué ou illisible : modèles réentraînés
+        pass
+    splits = prepare(data.load_dataset(path, ["YEAR", TARGET] + FEATURES))
+    results = {name: train(name, *splits) for name in MODELS}
+    # Écriture atomique : une autre session ne lit jamais un fichier partiel
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        joblib.dump(results, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return results
+
+
+def train_all(path=data.DATASET_PATH):
+    """Résultats de tous les modèles (entraînés une fois par version du dataset)."""
+    return data.cached(("supervised", path), path, lambda: _train_all(path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entraîne les modèles supervisés et affiche leurs métriques.")
+    parser.parse_args(argv)
+    start = time.perf_counter()
+    for name, result in train_all().items():
+        print(f"{name} ({result['seconds']:.1f} s) - meilleurs paramètres : {result['best_params']}")
+        for split in ("train", "test"):
+            values = ", ".join(f"{metric} {value:.4f}" for metric, value in result[split].items())
+            print(f"  {split:<5} {values}")
+    print(f"Durée totale : {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Mesure légère des durées d'exécution (spans).
+
+Une section de code est chronométrée par
+
+    with timing.span("forecast.fit", model="sarimax"):
+        ...
+
+ou, quand un bloc with n'est pas commode, par s = timing.span(...).start()
+puis s.stop(). Chaque span terminé alimente :
+  - l'exécution courante du script Streamlit (begin_run / end_run), dont le
+    détail peut être affiché dans la barre latérale ;
+  - des compteurs cumulés par nom et étiquettes (histogramme des durées),
+    exportables au format texte de Prometheus ;
+  - la liste des derniers spans terminés hors exécution (threads du pool de
+    prévisions, par exemple).
+
+Exports, activés par variables d'environnement :
+  - RECHAUFFEMENT_TIMING_LOG : fichier journal, une ligne JSON par span ;
+  - RECHAUFFEMENT_TIMING_PROM : fichier texte Prometheus, réécrit à la fin
+    de chaque exécution (collecteur textfile de node_exporter, par exemple).
+
+Les étiquettes doivent rester en petit nombre de valeurs (modèle, page,
+table) : chaque combinaison crée une série dans l'export Prometheus.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+LOG_PATH = os.environ.get("RECHAUFFEMENT_TIMING_LOG")
+PROMETHEUS_PATH = os.environ.get("RECHAUFFEMENT_TIMING_PROM")
+METRIC = "rechauffement_span_seconds"
+# Bornes supérieures des classes de l'histogramme (secondes)
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+RECENT = 20
+
+_lock = threading.Lock()
+_local = threading.local()
+_metrics = {}
+_recent = deque(maxlen=RECENT)
+
+logger = logging.getLogger(__name__)
+if LOG_PATH:
+    _handler = logging.FileHandler(LOG_PATH, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class Span:
+    """Section chronométrée ; enregistrée à l'appel de stop() (ou en sortie de bloc with)."""
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.started = None
+        self.seconds = None
+        self.depth = 0
+
+    def start(self):
+        stack = _stack()
+        self.depth = len(stack)
+        stack.append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def stop(self):
+        if self.seconds is not None:
+            return self.seconds
+        self.seconds = time.perf_counter() - self.started
+        stack = _stack()
+        if self in stack:
+            del stack[stack.index(self):]
+        _record(self)
+        return self.seconds
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def span(name, **labels):
+    """Span nommé, à utiliser dans un bloc with ou par start() / stop()."""
+    return Span(name, {key: str(value) for key, value in labels.items()})
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _record(finished):
+    record = {"name": finished.name, "labels": finished.labels, "seconds": finished.seconds,
+              "depth": finished.depth, "started": finished.started, "time": time.time()}
+    run = getattr(_local, "run", None)
+    key = (finished.name, tuple(sorted(finished.labels.items())))
+    with _lock:
+        counts = _metrics.setdefault(key, {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)})
+        counts["count"] += 1
+        counts["sum"] += finished.seconds
+        for index, bound in enumerate(BUCKETS):
+            if finished.seconds <= bound:
+                counts["buckets"][index] += 1
+        if run is None:
+            _recent.append(record)
+    if run is not None:
+        run["spans"].append(record)
+    if LOG_PATH:
+        logger.info(json.dumps({**record, "run": None if run is None else run["id"]}, ensure_ascii=False))
+
+
+def begin_run(name="script"):
+    """Démarre l'exécution courante du thread (spans en cours abandonnés)."""
+    _local.stack = []
+    _local.run = {"id": f"{threading.get_ident():x}-{time.time_ns():x}", "name": name,
+                  "started": time.perf_counter(), "spans": []}
+    return _local.run
+
+
+def end_run():
+    """Termine l'exécution courante ; renvoie {"name", "seconds", "spans"} ou None.
+
+    Les spans sont dans l'ordre de leur fin (un span englobant suit ceux qu'il contient).
+    """
+    run = getattr(_local, "run", None)
+    if run is None:
+        return None
+    _local.run = None
+    run["seconds"] = time.perf_counter() - run["started"]
+    if PROMETHEUS_PATH:
+        try:
+            write_prometheus(PROMETHEUS_PATH)
+        except OSError:
+            logger.warning("export Prometheus impossible : %s", PROMETHEUS_PATH)
+    return run
+
+
+def breakdown(run):
+    """Lignes {"section", "ms", "part"} des spans de run, dans l'ordre de leur début (indentées par niveau)."""
+    rows = []
+    for record in sorted(run["spans"], key=lambda record: record["started"]):
+        labels = ", ".join(record["labels"].values())
+        section = "\u00a0\u00a0" * record["depth"] + record["name"] + (f" ({labels})" if labels else "")
+        rows.append({"section": section, "ms": record["seconds"] * 1000,
+                     "part": record["seconds"] / run["seconds"] if run.get("seconds") else None})
+    return rows
+
+
+def recent():
+    """Derniers spans terminés hors exécution (threads d'arrière-plan), du plus ancien au plus récent."""
+    with _lock:
+        return list(_recent)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels):
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+
+
+def prometheus_text():
+    """Compteurs cumulés au format texte de Prometheus (histogramme par span et étiquettes)."""
+    lines = [f"# HELP {METRIC} Durée des sections chronométrées de l'application.",
+             f"# TYPE {METRIC} histogram"]
+    with _lock:
+        metrics = {key: {**counts, "buckets": list(counts["buckets"])} for key, counts in _metrics.items()}
+    for (name, labels), counts in sorted(metrics.items()):
+        base = _label_text((("span", name),) + labels)
+        for bound, count in zip(BUCKETS, counts["buckets"]):
+            lines.append(f'{METRIC}_bucket{{{base},le="{bound}"}} {count}')
+        lines.append(f'{METRIC}_bucket{{{base},le="+Inf"}} {counts["count"]}')
+        lines.append(f"{METRIC}_sum{{{base}}} {counts['sum']:.6f}")
+        lines.append(f"{METRIC}_count{{{base}}} {counts['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Écrit prometheus_text() dans path (remplacement atomique)."""
+    # Un fichier temporaire par processus et par thread : les exécutions simultanées ne se mélangent pas
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
@@ -0,0 +1,189 @@
+"""Séries mondiales (MONDE*.csv) dérivées de dataset.csv.
+
+MONDE.csv contient la température moyenne annuelle YAVGT_World des pays ;
+MONDE2011.csv et MONDE_12_22.csv en sont les jeux d'entraînement (jusqu'à
+2011) et de test (2012-2022) des modèles de séries temporelles. Les trois
+tables sont produites ensemble, par un seul groupby sur le dataset, et
+mémorisées dans ressources/cache/world/ sous une clé dérivée de l'empreinte
+du dataset, de la pondération et des années de découpage : elles ne peuvent
+pas diverger des données par pays.
+
+La moyenne peut être pondérée par une colonne du dataset (population) ou
+par un poids par pays lu dans un CSV « Code_ISO;weight » (superficie,
+nombre de stations...), ces informations ne figurant pas dans dataset.csv.
+
+    python -m rechauffement.world [--weights population|poids.csv] [--train-end 2011] [--test-start 2012]
+
+La commande réécrit les fichiers de ressources/ qui ne correspondent plus
+au dataset ; --check se contente de signaler les écarts.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from rechauffement import data
+from rechauffement.cache import make_key
+
+CACHE_DIR = os.path.join(data.CACHE_DIR, "world")
+# À incrémenter quand le calcul des séries change (invalide le cache disque)
+WORLD_VERSION = 1
+TRAIN_END = 2011
+TEST_START = 2012
+# Écart toléré avec les fichiers existants (centièmes de °C) : l'ordre de
+# sommation d'origine n'est pas connu, les derniers bits peuvent différer
+TOLERANCE = 1e-9
+
+SOURCE_COLUMNS = ["Code_ISO", "YEAR", "YAVGT", "population"]
+
+
+def read_source(path=data.DATASET_PATH):
+    """Colonnes utiles du dataset (data.load_dataset), en double précision.
+
+    Le dataset typé est en float32 ; les températures du CSV ayant deux
+    décimales, les arrondir à 0,01 redonne exactement les valeurs float64 du
+    fichier, donc les sommes des fichiers MONDE*.csv.
+    """
+    source = data.load_dataset(path, SOURCE_COLUMNS)
+    return pd.DataFrame({"Code_ISO": source["Code_ISO"].to_numpy("float64"),
+                         "YEAR": source["YEAR"].to_numpy("int64"),
+                         "YAVGT": np.round(source["YAVGT"].to_numpy("float64"), 2),
+                         "population": source["population"].to_numpy("float64")})
+
+
+def read_weights(path):
+    """Poids par pays d'un CSV « Code_ISO;weight », indexés par Code_ISO."""
+    weights = pd.read_csv(path, sep=";", dtype={"Code_ISO": "float64", "weight": "float64"})
+    return weights.set_index("Code_ISO")["weight"]
+
+
+def world_series(frame, weights=None):
+    """Température mondiale annuelle : moyenne des pays, pondérée si weights est fourni.
+
+    weights : None, nom d'une colonne de frame ou Series de poids indexée par
+    Code_ISO ; les pays sans poids ou sans température sont ignorés.
+    """
+    if weights is None:
+        return frame.groupby("YEAR")["YAVGT"].mean()
+    w = frame[weights] if isinstance(weights, str) else frame["Code_ISO"].map(weights)
+    w = w.where(frame["YAVGT"].notna()).fillna(0)
+    sums = frame.assign(w=w, wv=w * frame["YAVGT"]).groupby("YEAR")[["wv", "w"]].sum()
+    return sums["wv"] / sums["w"]
+
+
+def to_monde(series):
+    """Table au format des fichiers MONDE*.csv (index date, YAVGT_World, YEAR)."""
+    dates = pd.Index([f"{year}-01-01" for year in series.index], name="date")
+    return pd.DataFrame({"YAVGT_World": series.to_numpy(), "YEAR": dates}, index=dates)
+
+
+def file_names(last_year, train_end=TRAIN_END, test_start=TEST_START):
+    """Noms des fichiers de la série complète et des jeux d'entraînement et de test."""
+    return {"full": "MONDE.csv",
+            "train": f"MONDE{train_end}.csv",
+            "test": f"MONDE_{test_start % 100:02d}_{last_year % 100:02d}.csv"}
+
+
+def build(path=data.DATASET_PATH, weights=None, train_end=TRAIN_END, test_start=TEST_START):
+    """Nom de fichier -> table de la série mondiale et de ses jeux d'entraînement et de test."""
+    if train_end >= test_start:
+        raise ValueError(f"fin de l'entraînement ({train_end}) postérieure au début du test ({test_start})")
+    if isinstance(weights, str) and os.path.isfile(weights):
+        weights = read_weights(weights)
+    series = world_series(read_source(path), weights)
+    names = file_names(series.index[-1], train_end, test_start)
+    return {names["full"]: to_monde(series),
+            names["train"]: to_monde(series[series.index <= train_end]),
+            names["test"]: to_monde(series[series.index >= test_start])}
+
+
+def _key(path, weights, train_end, test_start):
+    if isinstance(weights, str) and os.path.isfile(weights):
+        weights = data.file_hash(weights)
+    return make_key("world", WORLD_VERSION, data.file_hash(path), weights, train_end, test_start)
+
+
+def _load(path, weights, train_end, test_start):
+    directory = os.path.join(CACHE_DIR, _key(path, weights, train_end, test_start))
+    try:
+        return {name: data.read_monde_csv(os.path.join(directory, name)) for name in sorted(os.listdir(directory))}
+    except OSError:
+        pass
+    tables = build(path, weights, train_end, test_start)
+    tmp_directory = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Répertoire propre à cet appel : deux processus peuvent construire la même clé
+        tmp_directory = tempfile.mkdtemp(prefix=".tmp-", dir=CACHE_DIR)
+        for name, table in tables.items():
+            write(table, os.path.join(tmp_directory, name))
+        os.replace(tmp_directory, directory)
+    except OSError:
+        # ressources/ en lecture seule, ou clé écrite entre-temps par un autre
+        # processus : les tables restent en mémoire
+        if tmp_directory is not None:
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+    return tables
+
+
+def load(path=data.DATASET_PATH, weights=None, train_end=TRAIN_END, test_start=TEST_START):
+    """Tables mondiales de build(), calculées une fois par version du dataset et des paramètres."""
+    return data.cached(("world", path, weights, train_end, test_start), path,
+                       lambda: _load(path, weights, train_end, test_start))
+
+
+def monde(path=data.DATASET_PATH):
+    """Série mondiale complète (équivalent de MONDE.csv), indexée par date."""
+    return load(path)["MONDE.csv"]
+
+
+def write(table, path):
+    """Écrit une table au format des fichiers MONDE*.csv."""
+    table.to_csv(path, sep=";")
+
+
+def differs(table, path):
+    """Vrai si le fichier path est absent ou ne correspond pas à table."""
+    try:
+        existing = data.read_monde_csv(path)
+    except (OSError, ValueError):
+        return True
+    return not (existing.index.equals(table.index) and existing["YEAR"].equals(table["YEAR"])
+                and np.allclose(existing["YAVGT_World"], table["YAVGT_World"], rtol=0, atol=TOLERANCE))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère les séries mondiales MONDE*.csv depuis dataset.csv.")
+    parser.add_argument("--dataset", default=data.DATASET_PATH, help="CSV du dataset")
+    parser.add_argument("--weights", help="colonne du dataset (population) ou CSV « Code_ISO;weight »")
+    parser.add_argument("--train-end", type=int, default=TRAIN_END, help="dernière année d'entraînement")
+    parser.add_argument("--test-start", type=int, default=TEST_START, help="première année de test")
+    parser.add_argument("--output-dir", default=data.RESSOURCES_DIR, help="répertoire des fichiers générés")
+    parser.add_argument("--check", action="store_true", help="signale les fichiers périmés sans les réécrire")
+    args = parser.parse_args(argv)
+    if args.train_end >= args.test_start:
+        parser.error("--train-end doit précéder --test-start")
+    if args.weights and not os.path.isfile(args.weights) and args.weights not in SOURCE_COLUMNS:
+        parser.error(f"--weights : ni fichier ni colonne parmi {', '.join(SOURCE_COLUMNS)}")
+    tables = load(args.dataset, args.weights, args.train_end, args.test_start)
+    stale = []
+    for name, table in tables.items():
+        path = os.path.join(args.output_dir, name)
+        if not differs(table, path):
+            print(f"{name} : à jour ({len(table)} années)")
+            continue
+        stale.append(name)
+        if args.check:
+            print(f"{name} : ne correspond pas au dataset")
+        else:
+            os.makedirs(args.output_dir, exist_ok=True)
+            write(table, path)
+            print(f"{name} : réécrit ({len(table)} années)")
+    return 1 if args.check and stale else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
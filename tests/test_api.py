@@ -0,0 +1,104 @@
+"""Réponses de l'API HTTP des prévisions (prévision simulée, requêtes invalides)."""
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rechauffement import api, data, forecast
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = api.make_server(port=0, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def request(url, body=None):
+    """(statut, corps JSON) de la réponse ; POST si body est donné."""
+    method = "GET" if body is None else "POST"
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, body, method=method), timeout=30) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+@pytest.mark.parametrize("body", [
+    b"{invalide",
+    b'["France"]',
+    b'"France"',
+    b'{"countries": "France"}',
+    b'{"countries": [["France"]]}',
+    b'{"countries": [1]}',
+    b'{"countries": ["France"], "models": "sarimax"}',
+    b'{"countries": ["France"], "models": ["inconnu"]}',
+    b'{"countries": ["France"], "steps": [1]}',
+    b'{"countries": ["France"], "steps": 0}',
+    b'{"countries": ["Atlantide"]}',
+    b'{"countries": []}',
+])
+def test_post_malformed_body(base_url, body):
+    status, payload = request(f"{base_url}/forecast", body)
+    assert status == 400
+    assert "error" in payload
+
+
+@pytest.mark.parametrize("query", ["", "country=Atlantide", "country=France&steps=abc", "country=France&model=inconnu"])
+def test_get_invalid_query(base_url, query):
+    status, payload = request(f"{base_url}/forecast?{query}")
+    assert status == 400
+    assert "error" in payload
+
+
+def test_unknown_path(base_url):
+    status, _ = request(f"{base_url}/inconnu")
+    assert status == 404
+
+
+def test_internal_error_is_json(base_url, monkeypatch):
+    def fail():
+        raise RuntimeError("panne")
+
+    monkeypatch.setattr(data, "countries_list", fail)
+    status, payload = request(f"{base_url}/countries")
+    assert status == 500
+    assert "error" in payload
+
+
+def test_forecast(base_url, monkeypatch):
+    def fake_forecast(country, model, steps):
+        dates = pd.date_range("2023-01-01", periods=steps, freq="YS")
+        mean = np.arange(steps, dtype="float64")
+        return pd.DataFrame({"mean": mean, "lower": mean - 1, "upper": [np.nan] + list(mean[1:] + 1)}, index=dates)
+
+    monkeypatch.setattr(forecast, "forecast", fake_forecast)
+    status, payload = request(f"{base_url}/forecast", b'{"countries": ["France"], "steps": 3, "models": ["sarimax"]}')
+    assert status == 200
+    assert payload["steps"] == 3
+    assert payload["models"] == ["sarimax"]
+    result = payload["results"]["France"]
+    assert result["errors"] == {}
+    records = result["forecasts"]["sarimax"]
+    assert [record["date"] for record in records] == ["2023-01-01", "2024-01-01", "2025-01-01"]
+    assert set(records[0]) == {"date", "mean", "lower", "upper"}
+    assert records[0]["upper"] is None  # NaN -> null
+    assert records[2]["mean"] == 2.0
+
+    status, payload = request(f"{base_url}/forecast?country=France&country=Spain&steps=2")
+    assert status == 200
+    assert set(payload["results"]) == {"France", "Spain"}
+    assert set(payload["models"]) == set(forecast.MODELS)
+
+
+def test_countries(base_url):
+    status, payload = request(f"{base_url}/countries")
+    assert status == 200
+    assert "France" in payload["countries"]
@@ -0,0 +1,32 @@
+"""Niveau disque de rechauffement.cache.ForecastCache : plafond et élagage."""
+import os
+
+from rechauffement.cache import ForecastCache, make_key
+
+
+def disk_keys(cache):
+    return {name[:-len(".pkl")] for _, _, names in os.walk(cache.directory) for name in names}
+
+
+def test_prune_keeps_recently_used(tmp_path):
+    cache = ForecastCache(str(tmp_path))
+    keys = [make_key("test", i) for i in range(4)]
+    for i, key in enumerate(keys):
+        cache.put(key, bytes(1000))
+        os.utime(cache._path(key), ns=(i * 10**9, i * 10**9))
+    size = os.path.getsize(cache._path(keys[0]))
+    cache.max_disk_bytes = 2 * size
+    # Lecture sur disque : keys[0] devient le plus récemment utilisé
+    cache.clear_memory()
+    assert cache.get(keys[0]) == bytes(1000)
+
+    assert cache.prune() == 2
+    assert disk_keys(cache) == {keys[0], keys[3]}
+
+
+def test_put_prunes(tmp_path):
+    cache = ForecastCache(str(tmp_path), max_disk_bytes=0)
+    cache.put(make_key("test"), 1)
+    assert disk_keys(cache) == set()
+    # Le niveau mémoire n'est pas concerné
+    assert cache.get(make_key("test")) == 1
@@ -0,0 +1,76 @@
+"""Requêtes du cube (rechauffement.cube) comparées au calcul par groupby sur le dataset."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from rechauffement import cube, data
+
+REFERENCES = [None, (1951, 1980), (1991, 2020), (2010, 2012)]
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    return data.load_dataset(columns=cube.COLUMNS)
+
+
+def anomalies(dataset, reference):
+    """YANOT du dataset, ou anomalies recalculées par rapport à reference."""
+    if reference is None:
+        return dataset
+    period = dataset[dataset["YEAR"].between(*reference)]
+    means = period.groupby("Name_FR", observed=True)["YAVGT"].mean()
+    return dataset.assign(YANOT=dataset["YAVGT"] - dataset["Name_FR"].map(means).astype("float64"))
+
+
+def expected(frame, stat, by):
+    frame = frame.dropna(subset=["YANOT"])
+    if stat == "weighted":
+        frame = frame.dropna(subset=["population"])
+        keys = [frame[column] for column in by]
+        return (frame["YANOT"] * frame["population"]).groupby(keys, observed=True).sum() / \
+            frame["population"].groupby(keys, observed=True).sum()
+    return frame["YANOT"].groupby([frame[column] for column in by], observed=True).agg(stat)
+
+
+def assert_close(result, reference):
+    np.testing.assert_allclose(np.asarray(result, dtype="float64"), np.asarray(reference, dtype="float64"),
+                               rtol=1e-5, atol=1e-3)
+
+
+def test_reference_means(dataset):
+    period = dataset[dataset["YEAR"].between(1961, 1990)]
+    reference = period.groupby("Name_FR", observed=True)["YAVGT"].mean().reindex(cube.load()["countries"])
+    assert_close(cube.reference_means((1961, 1990)), reference)
+
+
+def test_reference_means_invalid_period():
+    with pytest.raises(ValueError):
+        cube.reference_means((1990, 1961))
+
+
+@pytest.mark.parametrize("reference", REFERENCES)
+@pytest.mark.parametrize("stat", cube.STATS)
+def test_total(dataset, stat, reference):
+    result = cube.total("YANOT", stat, reference=reference)
+    assert_close(result, expected(anomalies(dataset, reference), stat, ["YEAR"]).reindex(result.index))
+
+
+@pytest.mark.parametrize("reference", REFERENCES)
+@pytest.mark.parametrize("stat", cube.STATS)
+def test_by_continent(dataset, stat, reference):
+    continents = ["Afrique", "Europe"]
+    frame = anomalies(dataset, reference)
+    frame = frame[frame["Continent_FR"].isin(continents) & frame["YEAR"].between(1980, 2000)]
+    result = cube.by_continent("YANOT", stat, continents, (1980, 2000), reference)
+    reference_frame = expected(frame, stat, ["YEAR", "Continent_FR"]).unstack()
+    assert_close(result, reference_frame.reindex(index=result.index, columns=continents))
+
+
+@pytest.mark.parametrize("reference", REFERENCES)
+def test_by_country(dataset, reference):
+    countries = ["France", "Japon"]
+    frame = anomalies(dataset, reference)
+    pivot = pd.pivot_table(frame[frame["Name_FR"].isin(countries)], index="YEAR", columns="Name_FR",
+                           values="YANOT", observed=True)
+    result = cube.by_country("YANOT", countries, reference=reference)
+    assert_close(result, pivot.reindex(index=result.index, columns=countries))
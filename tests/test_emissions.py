@@ -0,0 +1,100 @@
+"""Complétion des séries (rechauffement.emissions.fill_series) et jointure d'un fichier au format OWID."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from rechauffement import data, emissions
+
+# Première année du CSV NOAA de Mauna Loa
+NOAA_START = 1959
+
+
+def test_fill_interior_gaps():
+    filled = emissions.fill_series([[1.0, np.nan, np.nan, 4.0, 5.0]])
+    np.testing.assert_allclose(filled, [[1, 2, 3, 4, 5]])
+
+
+def test_fill_trailing_gaps_follow_trend():
+    # Série linéaire : le polynôme la prolonge, raccordé à la dernière valeur
+    filled = emissions.fill_series([[1.0, 2.0, 3.0, 4.0, np.nan, np.nan]])
+    np.testing.assert_allclose(filled, [[1, 2, 3, 4, 5, 6]], atol=1e-6)
+    # Courbure : pas de saut à la dernière valeur connue
+    filled = emissions.fill_series([[0.0, 1.0, 4.0, 9.0, 15.0, np.nan]])
+    assert filled[0, 4] == 15.0
+    assert filled[0, 5] > 15.0
+
+
+def test_fill_leading_gaps_with_median():
+    filled = emissions.fill_series([[np.nan, np.nan, 2.0, 4.0, 9.0]])
+    np.testing.assert_allclose(filled, [[4, 4, 2, 4, 9]])
+
+
+def test_fill_rows_independently():
+    values = np.array([[np.nan, 1.0, np.nan, 3.0, np.nan],
+                       [np.nan, np.nan, np.nan, np.nan, np.nan],
+                       [5.0, 5.0, 5.0, 5.0, 5.0]])
+    filled = emissions.fill_series(values)
+    # Fin complétée par la tendance (4), puis début par la médiane de la série complétée
+    np.testing.assert_allclose(filled[0], [2.5, 1, 2, 3, 4], atol=1e-6)
+    # Série entièrement vide : laissée à complete (médiane des pays)
+    assert np.isnan(filled[1]).all()
+    np.testing.assert_array_equal(filled[2], values[2])
+    # Entrée inchangée
+    assert np.isnan(values[0, 0])
+
+
+def test_complete_empty_series_with_yearly_median():
+    temperatures = pd.DataFrame({"Code_ISO": np.repeat([1, 2, 3], 3), "YEAR": np.tile([2000, 2001, 2002], 3)})
+    values = np.full((9, len(emissions.OWID_COLUMNS)), np.nan)
+    values[:3, 0] = [1.0, 2.0, 3.0]
+    values[3:6, 0] = [3.0, 4.0, 5.0]
+    filled = emissions.complete(temperatures, values)
+    np.testing.assert_allclose(filled[6:, 0], [2, 3, 4])
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    return data.read_dataset_csv()
+
+
+@pytest.fixture(scope="module")
+def sources(dataset, tmp_path_factory):
+    """Fichiers OWID et NOAA reconstruits à partir des colonnes livrées dans dataset.csv."""
+    directory = tmp_path_factory.mktemp("emissions")
+    owid = pd.DataFrame({"country": dataset["Name_EN"].astype(str), "year": dataset["YEAR"],
+                         "iso_code": dataset["ISO_3"].astype(str),
+                         **{column: dataset[column].astype("float64") for column in emissions.OWID_COLUMNS}})
+    # Regroupements OWID, sans code ISO ou avec un code OWID_*, à écarter
+    aggregates = owid[owid["iso_code"] == "FRA"].assign(country="World", iso_code="OWID_WRL")
+    regions = owid[owid["iso_code"] == "FRA"].assign(country="Europe", iso_code=np.nan)
+    owid_path = directory / "owid-co2-data.csv"
+    pd.concat([owid, aggregates, regions]).to_csv(owid_path, index=False)
+
+    yearly = dataset.groupby("YEAR")["AtmCO2"].first()
+    yearly = yearly[yearly.index >= NOAA_START]
+    atmospheric_path = directory / "co2_annmean_mlo.csv"
+    with open(atmospheric_path, "w", encoding="utf-8") as f:
+        f.write("# NOAA Mauna Loa\n")
+        pd.DataFrame({"year": yearly.index, "mean": yearly.to_numpy(), "unc": 0.12}).to_csv(f, index=False)
+    return str(owid_path), str(atmospheric_path)
+
+
+def test_build_reproduces_shipped_columns(dataset, sources):
+    owid = emissions.read_owid(sources[0])
+    assert set(owid["iso_code"]) == set(dataset["ISO_3"].astype(str))
+    result = emissions.build(dataset, owid, emissions.read_atmospheric(sources[1]))
+    assert len(result) == len(dataset)
+    for column in emissions.OWID_COLUMNS:
+        np.testing.assert_array_equal(result[column].to_numpy(), dataset[column].to_numpy(), err_msg=column)
+    measured = dataset["YEAR"] >= NOAA_START
+    np.testing.assert_array_equal(result.loc[measured, emissions.ATMOSPHERIC_COLUMN].to_numpy(),
+                                  dataset.loc[measured, emissions.ATMOSPHERIC_COLUMN].to_numpy())
+    assert result[emissions.ATMOSPHERIC_COLUMN].notna().all()
+
+
+def test_build_drops_countries_without_owid_rows(dataset, sources):
+    owid = emissions.read_owid(sources[0])
+    owid = owid[owid["iso_code"] != "FRA"]
+    result = emissions.build(dataset, owid, emissions.read_atmospheric(sources[1]))
+    assert "FRA" not in set(result["ISO_3"].astype(str))
+    assert len(result) == (dataset["ISO_3"] != "FRA").sum()